@@ -44,11 +44,16 @@ config.server = {
     // Array of resolutions the STH component should aggregate values for.
     // Valid resolution values are: 'month', 'day', 'hour', 'minute' and 'second'
     aggregationBy: ['day', 'hour', 'minute'],
-    // Directory where temporary files will be stored, such as the ones generated when CSV files are requested.
-    // Default value: "temp".
+    // Directory where temporary files will be stored. Not used anymore since CSV files are streamed straight from the
+    // database. Default value: "temp".
     temporalDir: 'temp',
     // Max page size returned by a query
-    maxPageSize: '100'
+    maxPageSize: '100',
+    // Flag indicating if the raw data JSON responses should be streamed from the database as the documents are read,
+    // instead of building the whole response in memory. Errors found once the response has started are not reported
+    // to the client, which gets a truncated response. Only the unbounded responses (lastN=0) are streamed, since
+    // paginated (hLimit) and lastN responses are bounded by maxPageSize. Default value: "false".
+    streamRawData: 'false'
 };
 
 // Cors Configuration
@@ -129,6 +134,58 @@ config.database = {
     // Attribute values to one or more blank spaces should be ignored and not processed either as raw data or for
     // the aggregated computations. Default value: "true".
     ignoreBlankSpaces: 'true',
+    // Cache of the collections already resolved, to avoid checking their existence against the database each time a
+    // collection is used.
+    collectionCache: {
+        // Maximum number of collections cached (the least recently used ones are evicted). Set the value to 0 or remove
+        // the property entry to disable the cache. Default value: "0".
+        size: '0',
+        // Time in seconds an existent collection is cached. Collections dropped by the STH are removed from the cache
+        // straight away, but collections dropped by other means will not be recreated until this time expires.
+        // Default value: "60".
+        ttl: '60',
+        // Time in seconds a non existent collection is cached. Default value: "5".
+        negativeTtl: '5'
+    },
+    // Flag indicating if the raw and aggregated data of each notification should be written using one bulk write per
+    // collection instead of one write operation per attribute and resolution. The detection of already registered and
+    // updated data is not affected. Default value: "false".
+    bulkWrite: 'false',
+    // Flag indicating if the aggregated data should be prepopulated and updated using just one update operation per
+    // resolution (an upsert based on an update pipeline) instead of two. It requires MongoDB 4.2 or greater.
+    // Default value: "false".
+    aggregateSingleUpdate: 'false',
+    // Write-behind buffer of aggregated data: the aggregated data of new attribute values is merged in memory per
+    // aggregated point and written with one update per point, which reduces the writes of high-rate attributes.
+    // Buffered data not yet written is lost if the STH does not stop gracefully.
+    aggregationBuffer: {
+        // Maximum time in milliseconds the aggregated data is kept in the buffer before writing it. Set the value to 0
+        // or remove the property entry to disable the buffer. Default value: "0".
+        interval: '0',
+        // Maximum number of aggregated points kept in the buffer before writing them. Default value: "10000".
+        size: '10000'
+    },
+    // Fast insert of raw data: the raw data of new attribute values is inserted optimistically (using an upsert which
+    // only inserts), without checking beforehand if it is already registered. Notifications which cannot be inserted
+    // this way (retransmissions or updates of already registered data) are processed as usual. It does not apply when
+    // bulk writes are enabled.
+    fastInsert: {
+        // Flag indicating if the fast insert of raw data is enabled. Default value: "false".
+        enabled: 'false',
+        // Maximum number of recently inserted raw data keys kept in memory to detect retransmissions without accessing
+        // the database. Set the value to 0 to not keep them. Default value: "10000".
+        recentKeys: '10000'
+    },
+    // Cache of the aggregated data documents (buckets) known to exist, to avoid sending the upsert which prepopulates
+    // them each time an attribute value is aggregated. It does not apply when aggregateSingleUpdate is enabled.
+    bucketCache: {
+        // Maximum number of buckets cached (the least recently used ones are evicted). Set the value to 0 or remove the
+        // property entry to disable the cache. Default value: "0".
+        size: '0',
+        // Time in seconds a bucket is cached. Buckets removed by the STH are removed from the cache straight away, and
+        // entries never outlive the truncation of their buckets. Default value: "3600".
+        ttl: '3600'
+    },
     // Database and collection names have to respect the limitations imposed by MongoDB (see
     // https://docs.mongodb.com/manual/reference/limits/). To it, the STH provides 2 main mechanisms: mappings and
     // encoding which can be configured using the next 2 configuration parameters.
@@ -42,6 +42,7 @@ module.exports = {
         FIWARE_SERVICE: 'fiware-service',
         FIWARE_SERVICE_PATH: 'fiware-servicepath',
         FIWARE_TOTAL_COUNT: 'fiware-total-count',
+        FIWARE_NEXT_TOKEN: 'fiware-next-token',
         X_REAL_IP: 'x-real-ip'
     },
     OPERATION_TYPE_PREFIX: 'OPER_STH_',
@@ -379,6 +380,26 @@ if (!ENV.MAX_PAGE_SIZE && !(config && config.server && config.server.maxPageSize
     sthLogger.info(module.exports.LOGGING_CONTEXT.STARTUP, 'maxPageSize set to value: ' + module.exports.MAX_PAGE_SIZE);
 }
 
+if (ENV.STREAM_RAW_DATA) {
+    module.exports.STREAM_RAW_DATA = ENV.STREAM_RAW_DATA.toLowerCase() === 'true';
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Raw data streaming set to value: ' + module.exports.STREAM_RAW_DATA
+    );
+} else if (config && config.server && config.server.streamRawData) {
+    module.exports.STREAM_RAW_DATA = config.server.streamRawData.toLowerCase() === 'true';
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Raw data streaming set to value: ' + module.exports.STREAM_RAW_DATA
+    );
+} else {
+    module.exports.STREAM_RAW_DATA = false;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured raw data streaming, setting to default value: ' + module.exports.STREAM_RAW_DATA
+    );
+}
+
 const dataModels = [
     module.exports.DATA_MODELS.COLLECTION_PER_ATTRIBUTE,
     module.exports.DATA_MODELS.COLLECTION_PER_ENTITY,
@@ -720,6 +741,303 @@ if (ENV.IGNORE_BLANK_SPACES) {
     );
 }
 
+if (ENV.COLLECTION_CACHE_SIZE && parseInt(ENV.COLLECTION_CACHE_SIZE, 10) >= 0) {
+    module.exports.COLLECTION_CACHE_SIZE = parseInt(ENV.COLLECTION_CACHE_SIZE, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database collection cache size set to value: ' + module.exports.COLLECTION_CACHE_SIZE
+    );
+} else if (
+    // prettier-ignore
+    config && config.database && config.database.collectionCache && config.database.collectionCache.size &&
+        parseInt(config.database.collectionCache.size, 10) >= 0
+) {
+    module.exports.COLLECTION_CACHE_SIZE = parseInt(config.database.collectionCache.size, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database collection cache size set to value: ' + module.exports.COLLECTION_CACHE_SIZE
+    );
+} else {
+    module.exports.COLLECTION_CACHE_SIZE = 0;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database collection cache size, setting to default value: ' +
+            module.exports.COLLECTION_CACHE_SIZE
+    );
+}
+
+if (ENV.COLLECTION_CACHE_TTL && parseInt(ENV.COLLECTION_CACHE_TTL, 10) >= 0) {
+    module.exports.COLLECTION_CACHE_TTL = parseInt(ENV.COLLECTION_CACHE_TTL, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database collection cache time to live set to value: ' + module.exports.COLLECTION_CACHE_TTL
+    );
+} else if (
+    // prettier-ignore
+    config && config.database && config.database.collectionCache && config.database.collectionCache.ttl &&
+        parseInt(config.database.collectionCache.ttl, 10) >= 0
+) {
+    module.exports.COLLECTION_CACHE_TTL = parseInt(config.database.collectionCache.ttl, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database collection cache time to live set to value: ' + module.exports.COLLECTION_CACHE_TTL
+    );
+} else {
+    module.exports.COLLECTION_CACHE_TTL = 60;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database collection cache time to live, setting to default value: ' +
+            module.exports.COLLECTION_CACHE_TTL
+    );
+}
+
+if (ENV.COLLECTION_CACHE_NEGATIVE_TTL && parseInt(ENV.COLLECTION_CACHE_NEGATIVE_TTL, 10) >= 0) {
+    module.exports.COLLECTION_CACHE_NEGATIVE_TTL = parseInt(ENV.COLLECTION_CACHE_NEGATIVE_TTL, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database collection cache negative time to live set to value: ' + module.exports.COLLECTION_CACHE_NEGATIVE_TTL
+    );
+} else if (
+    // prettier-ignore
+    config && config.database && config.database.collectionCache && config.database.collectionCache.negativeTtl &&
+        parseInt(config.database.collectionCache.negativeTtl, 10) >= 0
+) {
+    module.exports.COLLECTION_CACHE_NEGATIVE_TTL = parseInt(config.database.collectionCache.negativeTtl, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database collection cache negative time to live set to value: ' + module.exports.COLLECTION_CACHE_NEGATIVE_TTL
+    );
+} else {
+    module.exports.COLLECTION_CACHE_NEGATIVE_TTL = 5;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database collection cache negative time to live, setting to default value: ' +
+            module.exports.COLLECTION_CACHE_NEGATIVE_TTL
+    );
+}
+
+if (ENV.BULK_WRITE) {
+    module.exports.BULK_WRITE = ENV.BULK_WRITE.toLowerCase() === 'true';
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database bulk write set to value: ' + module.exports.BULK_WRITE
+    );
+} else if (config && config.database && config.database.bulkWrite) {
+    module.exports.BULK_WRITE = config.database.bulkWrite.toLowerCase() === 'true';
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database bulk write set to value: ' + module.exports.BULK_WRITE
+    );
+} else {
+    module.exports.BULK_WRITE = false;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database bulk write, setting to default value: ' + module.exports.BULK_WRITE
+    );
+}
+
+if (ENV.AGGREGATE_SINGLE_UPDATE) {
+    module.exports.AGGREGATE_SINGLE_UPDATE = ENV.AGGREGATE_SINGLE_UPDATE.toLowerCase() === 'true';
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database aggregate single update set to value: ' + module.exports.AGGREGATE_SINGLE_UPDATE
+    );
+} else if (config && config.database && config.database.aggregateSingleUpdate) {
+    module.exports.AGGREGATE_SINGLE_UPDATE = config.database.aggregateSingleUpdate.toLowerCase() === 'true';
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database aggregate single update set to value: ' + module.exports.AGGREGATE_SINGLE_UPDATE
+    );
+} else {
+    module.exports.AGGREGATE_SINGLE_UPDATE = false;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database aggregate single update, setting to default value: ' +
+            module.exports.AGGREGATE_SINGLE_UPDATE
+    );
+}
+
+if (ENV.AGGREGATION_BUFFER_INTERVAL && parseInt(ENV.AGGREGATION_BUFFER_INTERVAL, 10) >= 0) {
+    module.exports.AGGREGATION_BUFFER_INTERVAL = parseInt(ENV.AGGREGATION_BUFFER_INTERVAL, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database aggregation buffer interval set to value: ' + module.exports.AGGREGATION_BUFFER_INTERVAL
+    );
+} else if (
+    // prettier-ignore
+    config && config.database && config.database.aggregationBuffer && config.database.aggregationBuffer.interval &&
+        parseInt(config.database.aggregationBuffer.interval, 10) >= 0
+) {
+    module.exports.AGGREGATION_BUFFER_INTERVAL = parseInt(config.database.aggregationBuffer.interval, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database aggregation buffer interval set to value: ' + module.exports.AGGREGATION_BUFFER_INTERVAL
+    );
+} else {
+    module.exports.AGGREGATION_BUFFER_INTERVAL = 0;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database aggregation buffer interval, setting to default value: ' +
+            module.exports.AGGREGATION_BUFFER_INTERVAL
+    );
+}
+
+if (
+    ENV.AGGREGATION_BUFFER_SIZE &&
+    !isNaN(ENV.AGGREGATION_BUFFER_SIZE) &&
+    parseInt(ENV.AGGREGATION_BUFFER_SIZE, 10) > 0
+) {
+    module.exports.AGGREGATION_BUFFER_SIZE = parseInt(ENV.AGGREGATION_BUFFER_SIZE, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database aggregation buffer size set to value: ' + module.exports.AGGREGATION_BUFFER_SIZE
+    );
+} else if (
+    // prettier-ignore
+    config && config.database && config.database.aggregationBuffer && config.database.aggregationBuffer.size &&
+        !isNaN(config.database.aggregationBuffer.size) && parseInt(config.database.aggregationBuffer.size, 10) > 0
+) {
+    module.exports.AGGREGATION_BUFFER_SIZE = parseInt(config.database.aggregationBuffer.size, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database aggregation buffer size set to value: ' + module.exports.AGGREGATION_BUFFER_SIZE
+    );
+} else {
+    module.exports.AGGREGATION_BUFFER_SIZE = 10000;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database aggregation buffer size, setting to default value: ' +
+            module.exports.AGGREGATION_BUFFER_SIZE
+    );
+}
+
+if (ENV.FAST_INSERT) {
+    module.exports.FAST_INSERT = ENV.FAST_INSERT.toLowerCase() === 'true';
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database fast insert set to value: ' + module.exports.FAST_INSERT
+    );
+} else if (config && config.database && config.database.fastInsert && config.database.fastInsert.enabled) {
+    module.exports.FAST_INSERT = config.database.fastInsert.enabled.toLowerCase() === 'true';
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database fast insert set to value: ' + module.exports.FAST_INSERT
+    );
+} else {
+    module.exports.FAST_INSERT = false;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database fast insert, setting to default value: ' + module.exports.FAST_INSERT
+    );
+}
+
+if (
+    module.exports.FAST_INSERT &&
+    !isNaN(module.exports.WRITE_CONCERN) &&
+    parseInt(module.exports.WRITE_CONCERN, 10) === 0
+) {
+    // Unacknowledged writes do not report if the raw data was inserted, which the fast insert mode relies on
+    module.exports.FAST_INSERT = false;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database fast insert is not supported with the database write concern set to value: ' +
+            module.exports.WRITE_CONCERN +
+            ', setting to value: ' +
+            module.exports.FAST_INSERT
+    );
+}
+
+if (ENV.FAST_INSERT_RECENT_KEYS && parseInt(ENV.FAST_INSERT_RECENT_KEYS, 10) >= 0) {
+    module.exports.FAST_INSERT_RECENT_KEYS = parseInt(ENV.FAST_INSERT_RECENT_KEYS, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database fast insert recent keys set to value: ' + module.exports.FAST_INSERT_RECENT_KEYS
+    );
+} else if (
+    // prettier-ignore
+    config && config.database && config.database.fastInsert && config.database.fastInsert.recentKeys &&
+        parseInt(config.database.fastInsert.recentKeys, 10) >= 0
+) {
+    module.exports.FAST_INSERT_RECENT_KEYS = parseInt(config.database.fastInsert.recentKeys, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database fast insert recent keys set to value: ' + module.exports.FAST_INSERT_RECENT_KEYS
+    );
+} else {
+    module.exports.FAST_INSERT_RECENT_KEYS = 10000;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database fast insert recent keys, setting to default value: ' +
+            module.exports.FAST_INSERT_RECENT_KEYS
+    );
+}
+
+if (ENV.BUCKET_CACHE_SIZE && parseInt(ENV.BUCKET_CACHE_SIZE, 10) >= 0) {
+    module.exports.BUCKET_CACHE_SIZE = parseInt(ENV.BUCKET_CACHE_SIZE, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database bucket cache size set to value: ' + module.exports.BUCKET_CACHE_SIZE
+    );
+} else if (
+    // prettier-ignore
+    config && config.database && config.database.bucketCache && config.database.bucketCache.size &&
+        parseInt(config.database.bucketCache.size, 10) >= 0
+) {
+    module.exports.BUCKET_CACHE_SIZE = parseInt(config.database.bucketCache.size, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database bucket cache size set to value: ' + module.exports.BUCKET_CACHE_SIZE
+    );
+} else {
+    module.exports.BUCKET_CACHE_SIZE = 0;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database bucket cache size, setting to default value: ' +
+            module.exports.BUCKET_CACHE_SIZE
+    );
+}
+
+if (
+    module.exports.BUCKET_CACHE_SIZE > 0 &&
+    !isNaN(module.exports.WRITE_CONCERN) &&
+    parseInt(module.exports.WRITE_CONCERN, 10) === 0
+) {
+    // Unacknowledged writes do not report if the cached buckets were updated, which is needed to detect removed ones
+    module.exports.BUCKET_CACHE_SIZE = 0;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database bucket cache is not supported with the database write concern set to value: ' +
+            module.exports.WRITE_CONCERN +
+            ', setting its size to value: ' +
+            module.exports.BUCKET_CACHE_SIZE
+    );
+}
+
+if (ENV.BUCKET_CACHE_TTL && parseInt(ENV.BUCKET_CACHE_TTL, 10) >= 0) {
+    module.exports.BUCKET_CACHE_TTL = parseInt(ENV.BUCKET_CACHE_TTL, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database bucket cache time to live set to value: ' + module.exports.BUCKET_CACHE_TTL
+    );
+} else if (
+    // prettier-ignore
+    config && config.database && config.database.bucketCache && config.database.bucketCache.ttl &&
+        parseInt(config.database.bucketCache.ttl, 10) >= 0
+) {
+    module.exports.BUCKET_CACHE_TTL = parseInt(config.database.bucketCache.ttl, 10);
+    sthLogger.info(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Database bucket cache time to live set to value: ' + module.exports.BUCKET_CACHE_TTL
+    );
+} else {
+    module.exports.BUCKET_CACHE_TTL = 3600;
+    sthLogger.warn(
+        module.exports.LOGGING_CONTEXT.STARTUP,
+        'Invalid or not configured database bucket cache time to live, setting to default value: ' +
+            module.exports.BUCKET_CACHE_TTL
+    );
+}
+
 let nameMapping;
 if (ENV.NAME_MAPPING) {
     try {
@@ -0,0 +1,68 @@
+/*
+ * Copyright 2026 Telefónica Investigación y Desarrollo, S.A.U
+ *
+ * This file is part of the Short Time Historic (STH) component
+ *
+ * STH is free software: you can redistribute it and/or
+ * modify it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the License,
+ * or (at your option) any later version.
+ *
+ * STH is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+ * See the GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public
+ * License along with STH.
+ * If not, see http://www.gnu.org/licenses/.
+ *
+ * For those usages not covered by the GNU Affero General Public License
+ * please contact with: [german.torodelvalle@telefonica.com]
+ */
+
+
+const ROOT_PATH = require('app-root-path').toString();
+const sthConfig = require(ROOT_PATH + '/lib/configuration/sthConfiguration.js');
+const sthCache = require(ROOT_PATH + '/lib/database/sthCache.js');
+
+/**
+ * The aggregated data documents (buckets) known to exist
+ * @type {object}
+ */
+const cache = sthCache.createCache(function() {
+    return sthConfig.BUCKET_CACHE_SIZE;
+});
+
+/**
+ * Returns true if a bucket is known to exist
+ * @param {string} key The bucket key
+ * @return {boolean} True if the bucket is cached and not expired, false otherwise
+ */
+function has(key) {
+    return cache.get(key) !== undefined;
+}
+
+/**
+ * Caches a bucket known to exist, evicting the least recently used one if the cache is full
+ * @param {string} key The bucket key
+ * @param {number} maxExpires The maximum time the entry may expire at, in milliseconds since the epoch (optional)
+ */
+function set(key, maxExpires) {
+    let expires = Date.now() + sthConfig.BUCKET_CACHE_TTL * 1000;
+    if (maxExpires !== undefined && maxExpires < expires) {
+        expires = maxExpires;
+    }
+    cache.set(key, true, expires);
+}
+
+module.exports = {
+    get size() {
+        return cache.size;
+    },
+    has,
+    set,
+    invalidate: cache.invalidate,
+    invalidatePrefix: cache.invalidatePrefix,
+    clear: cache.clear
+};
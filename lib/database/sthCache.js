@@ -0,0 +1,122 @@
+/*
+ * Copyright 2026 Telefónica Investigación y Desarrollo, S.A.U
+ *
+ * This file is part of the Short Time Historic (STH) component
+ *
+ * STH is free software: you can redistribute it and/or
+ * modify it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the License,
+ * or (at your option) any later version.
+ *
+ * STH is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+ * See the GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public
+ * License along with STH.
+ * If not, see http://www.gnu.org/licenses/.
+ *
+ * For those usages not covered by the GNU Affero General Public License
+ * please contact with: [german.torodelvalle@telefonica.com]
+ */
+
+
+/**
+ * Returns a new cache whose entries expire at certain time and which evicts the least recently used entry when full.
+ *  Since Map objects keep the insertion order, an entry is moved to the end each time it is used and the first one is
+ *  the one evicted
+ * @param {Function} getMaxSize Function returning the maximum number of entries of the cache, which is disabled if 0
+ * @return {object} The cache
+ */
+function createCache(getMaxSize) {
+    const entries = new Map();
+
+    /**
+     * Returns true if the cache is enabled
+     * @return {boolean} True if the cache is enabled, false otherwise
+     */
+    function isEnabled() {
+        return getMaxSize() > 0;
+    }
+
+    /**
+     * Returns the value of a cached entry, if any and not expired
+     * @param {string} key The entry key
+     * @return {*} The value of the entry (undefined if not cached)
+     */
+    function get(key) {
+        if (!isEnabled()) {
+            return undefined;
+        }
+        const entry = entries.get(key);
+        if (!entry) {
+            return undefined;
+        }
+        entries.delete(key);
+        if (entry.expires <= Date.now()) {
+            return undefined;
+        }
+        entries.set(key, entry);
+        return entry.value;
+    }
+
+    /**
+     * Caches an entry, evicting the least recently used one if the cache is full
+     * @param {string} key The entry key
+     * @param {*} value The entry value
+     * @param {number} expires The time the entry expires at, in milliseconds since the epoch
+     */
+    function set(key, value, expires) {
+        if (!isEnabled()) {
+            return;
+        }
+        entries.delete(key);
+        entries.set(key, { value, expires });
+        while (entries.size > getMaxSize()) {
+            entries.delete(entries.keys().next().value);
+        }
+    }
+
+    /**
+     * Removes a cached entry
+     * @param {string} key The entry key
+     */
+    function invalidate(key) {
+        entries.delete(key);
+    }
+
+    /**
+     * Removes all the cached entries which key starts with certain prefix
+     * @param {string} prefix The prefix
+     */
+    function invalidatePrefix(prefix) {
+        for (const key of Array.from(entries.keys())) {
+            if (key.indexOf(prefix) === 0) {
+                entries.delete(key);
+            }
+        }
+    }
+
+    /**
+     * Removes all the cached entries
+     */
+    function clear() {
+        entries.clear();
+    }
+
+    return {
+        get size() {
+            return entries.size;
+        },
+        get,
+        set,
+        invalidate,
+        invalidatePrefix,
+        clear
+    };
+}
+
+module.exports = {
+    createCache
+};
@@ -0,0 +1,110 @@
+/*
+ * Copyright 2026 Telefónica Investigación y Desarrollo, S.A.U
+ *
+ * This file is part of the Short Time Historic (STH) component
+ *
+ * STH is free software: you can redistribute it and/or
+ * modify it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the License,
+ * or (at your option) any later version.
+ *
+ * STH is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+ * See the GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public
+ * License along with STH.
+ * If not, see http://www.gnu.org/licenses/.
+ *
+ * For those usages not covered by the GNU Affero General Public License
+ * please contact with: [german.torodelvalle@telefonica.com]
+ */
+
+
+const ROOT_PATH = require('app-root-path').toString();
+const sthConfig = require(ROOT_PATH + '/lib/configuration/sthConfiguration.js');
+const sthCache = require(ROOT_PATH + '/lib/database/sthCache.js');
+
+/**
+ * The collections known to exist or not to exist
+ * @type {object}
+ */
+const cache = sthCache.createCache(function() {
+    return sthConfig.COLLECTION_CACHE_SIZE;
+});
+
+/**
+ * Returns the cache key for certain database and collection (database names cannot include dots)
+ * @param {string} databaseName The database name
+ * @param {string} collectionName The collection name
+ * @return {string} The cache key
+ */
+function getKey(databaseName, collectionName) {
+    return databaseName + '.' + collectionName;
+}
+
+/**
+ * Returns the cached entry for certain database and collection, if any and not expired
+ * @param {string} databaseName The database name
+ * @param {string} collectionName The collection name
+ * @return {object} The cached entry including the following properties (undefined if not cached):
+ *  - {object} collection The collection, if it exists
+ *  - {object} error The error returned when getting the collection in strict mode, if it does not exist
+ */
+function get(databaseName, collectionName) {
+    return cache.get(getKey(databaseName, collectionName));
+}
+
+/**
+ * Caches an existent collection
+ * @param {string} databaseName The database name
+ * @param {string} collectionName The collection name
+ * @param {object} collection The collection
+ */
+function setCollection(databaseName, collectionName, collection) {
+    cache.set(getKey(databaseName, collectionName), { collection }, Date.now() + sthConfig.COLLECTION_CACHE_TTL * 1000);
+}
+
+/**
+ * Caches a non existent collection
+ * @param {string} databaseName The database name
+ * @param {string} collectionName The collection name
+ * @param {object} error The error returned when getting the collection in strict mode
+ */
+function setMissing(databaseName, collectionName, error) {
+    cache.set(
+        getKey(databaseName, collectionName),
+        { error },
+        Date.now() + sthConfig.COLLECTION_CACHE_NEGATIVE_TTL * 1000
+    );
+}
+
+/**
+ * Removes the cached entry for certain database and collection
+ * @param {string} databaseName The database name
+ * @param {string} collectionName The collection name
+ */
+function invalidate(databaseName, collectionName) {
+    cache.invalidate(getKey(databaseName, collectionName));
+}
+
+/**
+ * Removes all the cached entries for certain database
+ * @param {string} databaseName The database name
+ */
+function invalidateDatabase(databaseName) {
+    cache.invalidatePrefix(databaseName + '.');
+}
+
+module.exports = {
+    get size() {
+        return cache.size;
+    },
+    get,
+    setCollection,
+    setMissing,
+    invalidate,
+    invalidateDatabase,
+    clear: cache.clear
+};
@@ -30,19 +30,24 @@ const sthLogger = require('logops');
 const sthConfig = require(ROOT_PATH + '/lib/configuration/sthConfiguration.js');
 const sthUtils = require(ROOT_PATH + '/lib/utils/sthUtils.js');
 const sthDatabaseNaming = require(ROOT_PATH + '/lib/database/model/sthDatabaseNaming');
+const sthCollectionCache = require(ROOT_PATH + '/lib/database/sthCollectionCache.js');
+const sthBucketCache = require(ROOT_PATH + '/lib/database/sthBucketCache.js');
 const mongoClient = require('mongodb').MongoClient;
+const ObjectID = require('mongodb').ObjectID;
 const boom = require('boom');
 const jsoncsv = require('json-csv');
-const fs = require('fs');
-const path = require('path');
-const mkdirp = require('mkdirp');
+const stream = require('stream');
 const async = require('async');
 const _ = require('lodash');
 
 let db;
 let client;
 let connectionURL;
-let count = 0;
+let aggregationBuffer = new Map();
+let aggregationBufferTimer;
+let aggregationBufferFlushing = false;
+let aggregationBufferPendingCallbacks = null;
+let recentRawData = new Map();
 
 /**
  * Returns the options to use for the CSV file generation
@@ -143,6 +148,9 @@ function closeConnection(callback) {
             } else {
                 sthLogger.info(sthConfig.LOGGING_CONTEXT.DB_CONN_CLOSE, 'Connection to MongoDb succesfully closed');
                 db = null;
+                sthCollectionCache.clear();
+                sthBucketCache.clear();
+                recentRawData = new Map();
             }
             return process.nextTick(callback.bind(null, err));
         });
@@ -198,6 +206,50 @@ function setRawDataUniqueIndex(collection) {
     });
 }
 
+/**
+ * Sets the index used to retrieve the raw data for the raw data collections, which also sorts the raw data pages by
+ *  recvTime and then by _id (see getRawData())
+ * @param {object} collection The raw data collection
+ */
+function setRawDataPaginationIndex(collection) {
+    let paginationIndex;
+    switch (sthConfig.DATA_MODEL) {
+        case sthConfig.DATA_MODELS.COLLECTION_PER_SERVICE_PATH:
+            paginationIndex = {
+                entityId: 1,
+                entityType: 1,
+                attrName: 1,
+                recvTime: 1,
+                _id: 1
+            };
+            break;
+        case sthConfig.DATA_MODELS.COLLECTION_PER_ENTITY:
+            paginationIndex = {
+                attrName: 1,
+                recvTime: 1,
+                _id: 1
+            };
+            break;
+        case sthConfig.DATA_MODELS.COLLECTION_PER_ATTRIBUTE:
+            paginationIndex = {
+                recvTime: 1,
+                _id: 1
+            };
+            break;
+    }
+    collection.ensureIndex(paginationIndex, function(err) {
+        if (err) {
+            sthLogger.error(
+                sthConfig.LOGGING_CONTEXT.DB_LOG,
+                "Error when creating the pagination index for collection '" +
+                    collection.s.namespace.collection +
+                    "': " +
+                    err
+            );
+        }
+    });
+}
+
 /**
  * Returns true is the collection name corresponds to an aggregated data collection. False otherwise.
  * @param collectionName The collection name
@@ -265,6 +317,20 @@ function setTTLPolicy(collection) {
     }
 }
 
+/**
+ * Sets the indexes and the time to live policy of a raw data collection. Since the indexes are created only if they do
+ *  not exist, it can be called for already existent collections
+ * @param {object} collection The raw data collection
+ * @param {boolean} shouldTruncate Flag indicating if the collection should be truncated in time
+ */
+function setRawDataIndexes(collection, shouldTruncate) {
+    setRawDataUniqueIndex(collection);
+    setRawDataPaginationIndex(collection);
+    if (shouldTruncate) {
+        setTTLPolicy(collection);
+    }
+}
+
 /**
  * Returns asynchronously a reference to a collection of the database
  * @param  {object}   params   Params object including the following properties:
@@ -342,37 +408,51 @@ function isConnectionAlive() {
  * @param {function} callback THe callback
  */
 function fetchCollection(databaseName, isAggregated, shouldTruncate, shouldCreate, collectionName, callback) {
+    const notExistsMessage = 'Collection ' + collectionName + ' does not exist. Currently in strict mode.';
+
+    // Avoid the listCollections round trip if the collection (or its absence) is already known
+    const cached = sthCollectionCache.get(databaseName, collectionName);
+    if (cached) {
+        if (cached.collection) {
+            return process.nextTick(callback.bind(null, null, cached.collection));
+        } else if (!shouldCreate) {
+            return process.nextTick(callback.bind(null, cached.error, null));
+        }
+    }
+
     // Switch to the right database
     const connection = client.db(databaseName);
 
+    function fetchCollectionCB(err, collection) {
+        if (!err && collection) {
+            sthCollectionCache.setCollection(databaseName, collectionName, collection);
+        } else if (err && err.message === notExistsMessage) {
+            sthCollectionCache.setMissing(databaseName, collectionName, err);
+        }
+        return callback(err, collection);
+    }
+
     function createCollectionCB(err, collection) {
         if (err) {
             if (err.message === 'collection already exists') {
                 // We have observed that although leaving the strict option to the default value, sometimes
                 //  we get a 'collection already exists' error when executing connection.db#createCollection()
                 connection.collection(collectionName, { strict: true }, function(err, collection) {
-                    return callback(err, collection);
+                    return fetchCollectionCB(err, collection);
                 });
             } else {
-                return callback(err, collection);
+                return fetchCollectionCB(err, collection);
             }
         } else if (collection && !isAggregated) {
-            setRawDataUniqueIndex(collection);
-            if (shouldTruncate) {
-                setTTLPolicy(collection);
-            }
-            return callback(err, collection);
+            setRawDataIndexes(collection, shouldTruncate);
+            return fetchCollectionCB(err, collection);
         } else {
-            return callback(err, collection);
+            return fetchCollectionCB(err, collection);
         }
     }
 
     connection.collection(collectionName, { strict: true }, function(err, collection) {
-        if (
-            err &&
-            err.message === 'Collection ' + collectionName + ' does not exist. Currently in strict mode.' &&
-            shouldCreate
-        ) {
+        if (err && err.message === notExistsMessage && shouldCreate) {
             if (shouldTruncate && !isAggregated) {
                 // Set the size removal policy if required
                 if (sthConfig.TRUNCATION_SIZE > 0) {
@@ -386,49 +466,28 @@ function fetchCollection(databaseName, isAggregated, shouldTruncate, shouldCreat
             }
             connection.createCollection(collectionName, createCollectionCB);
         } else {
-            return callback(err, collection);
+            if (!err && collection && !isAggregated && shouldCreate && sthConfig.COLLECTION_CACHE_SIZE > 0) {
+                // The collection may have been dropped and implicitly recreated (without its indexes) by an insert
+                //  made through a cached handle, so its indexes are set again before caching it
+                setRawDataIndexes(collection, shouldTruncate);
+            }
+            return fetchCollectionCB(err, collection);
         }
     });
 }
 
 /**
- * Saves the contents of a readable stream into a file in the local file system
- * @param {string} attrName The name of the attribute the stream contents refers to
- * @param {object} stream The stream
- * @param {string} fileName The file name where the stream contents should be stored
- * @param {function} callback THe callback
- */
-function save2File(attrName, stream, fileName, callback) {
-    const tempDir = ROOT_PATH + path.sep + sthConfig.TEMPORAL_DIR;
-    if (!fs.existsSync(tempDir) || (fs.existsSync(tempDir) && !fs.statSync(tempDir).isDirectory())) {
-        mkdirp.sync(tempDir);
-    }
-
-    const outputFile = fs.createWriteStream(tempDir + path.sep + fileName, { encoding: 'utf8' });
-    stream
-        .pipe(jsoncsv.csv(getJSONCSVOptions(attrName)))
-        .pipe(outputFile)
-        .on('finish', callback);
-}
-
-/**
- * Generates a CSV file from a stream containing raw data associated to certain attribute
+ * Transforms a stream containing raw data associated to certain attribute into a stream of CSV contents
  * @param {string} attrName The attribute name
- * @param {object} stream The stream
- * @param {function} callback The callback
+ * @param {object} docs The readable stream (in object mode) of raw data documents
+ * @return {object} The readable stream of CSV contents
  */
-function generateCSV(attrName, stream, callback) {
-    if (count === Number.MAX_SAFE_INTEGER) {
-        count = 0;
-    }
-    const fileName = attrName + '-' + Date.now() + '-' + count + '.csv';
-    count++;
-    save2File(
-        attrName,
-        stream,
-        fileName,
-        callback.bind(null, null, ROOT_PATH + path.sep + sthConfig.TEMPORAL_DIR + path.sep + fileName)
-    );
+function getCSVStream(attrName, docs) {
+    return stream.pipeline(docs, jsoncsv.csv(getJSONCSVOptions(attrName)), function(err) {
+        if (err) {
+            sthLogger.error(sthConfig.LOGGING_CONTEXT.DB_LOG, 'Error when generating the CSV contents: ' + err);
+        }
+    });
 }
 
 /**
@@ -441,10 +500,20 @@ function generateCSV(attrName, stream, callback) {
  *  - {number} lastN: Only return the last n matching entries
  *  - {number} hLimit: Maximum number of results to retrieve when paginating
  *  - {number} hOffset: Offset to apply when paginating
+ *  - {object} hToken: Position from which to resume the pagination instead of using an offset, as returned for the
+ *      previous page. It is an object including the recvTime and the _id (as an hexadecimal string) of the last entry
+ *      of the previous page, since the pages are sorted by recvTime and then by _id
  *  - {date} from: The date from which retrieve the aggregated data
  *  - {date} to: The date to which retrieve the aggregated data
  *  - {string} filetype: The file type to return the data in
- * @param {Function} callback Callback to inform about any possible error or results
+ *  - {boolean} shouldStream: Flag indicating if the results should be returned as a readable stream (in object mode)
+ *      of documents instead of an array. CSV contents are always returned as a readable stream, but pages (hLimit)
+ *      are never streamed since the position of the next page is only known once the page is retrieved, nor the last
+ *      n entries (lastN other than 0), which are bounded and retrieved in descending order to be reversed
+ *  - {boolean|string} count: Flag indicating if the total count of matching entries should be returned. If set to
+ *      'estimated', the total count of entries in the collection taken from its metadata is returned instead
+ * @param {Function} callback Callback to inform about any possible error or results, including the total count if
+ *  requested and the position of the next page (to be passed as hToken) if paginating and the page is full
  */
 function getRawData(data, callback) {
     const collection = data.collection;
@@ -454,9 +523,14 @@ function getRawData(data, callback) {
     const lastN = data.lastN;
     const hLimit = data.hLimit;
     const hOffset = data.hOffset;
+    const hToken = data.hToken;
     const from = data.from;
     const to = data.to;
     const filetype = data.filetype;
+    const count = data.count;
+    // CSV contents are always streamed. The results of lastN and pages are bounded by the maximum page size, so they
+    //  are retrieved in memory
+    const shouldStream = filetype === 'csv' || (data.shouldStream && !hLimit && !lastN);
 
     let findCondition;
     switch (sthConfig.DATA_MODEL) {
@@ -496,68 +570,139 @@ function getRawData(data, callback) {
         findCondition.recvTime = recvTimeFilter;
     }
 
-    let cursor;
-    let totalCount = 0;
-    if (lastN || lastN === 0) {
-        cursor = collection
-            .find(findCondition, {
-                _id: 0,
-                attrType: 1,
-                attrValue: 1,
-                recvTime: 1
-            })
-            .sort({ recvTime: -1 });
-        cursor.count(function(err, count) {
-            totalCount = count;
-            cursor = cursor.limit(lastN);
-            if (filetype === 'csv') {
-                generateCSV(attrName, cursor.stream(), callback);
-            } else {
-                cursor.toArray(function(err, results) {
-                    if (!err) {
-                        results.reverse();
-                    }
-                    return process.nextTick(callback.bind(null, err, results, totalCount));
-                });
-            }
+    const projection = {
+        _id: 0,
+        attrType: 1,
+        attrValue: 1,
+        recvTime: 1
+    };
+    // The _id breaks the ties between entries with the same recvTime, so it tells where the next page starts
+    const pageProjection = shouldStream
+        ? projection
+        : {
+              attrType: 1,
+              attrValue: 1,
+              recvTime: 1
+          };
+
+    function getTotalCount(callback) {
+        if (!count) {
+            return process.nextTick(callback);
+        }
+        if (count === 'estimated') {
+            // Taken from the collection metadata, it ignores the find condition
+            return collection.estimatedDocumentCount(callback);
+        }
+        collection.find(findCondition).count(callback);
+    }
+
+    function getNextPage(results) {
+        let nextPage;
+        if (hLimit && results.length === hLimit) {
+            nextPage = {
+                recvTime: results[results.length - 1].recvTime,
+                id: results[results.length - 1]._id.toHexString()
+            };
+        }
+        results.forEach(function(result) {
+            delete result._id;
         });
-    } else if (hOffset || hLimit) {
-        cursor = collection
-            .find(findCondition, {
-                _id: 0,
-                attrType: 1,
-                attrValue: 1,
-                recvTime: 1
-            })
-            .sort({ recvTime: 1 });
-        cursor.count(function(err, count) {
-            totalCount = count;
-            cursor = cursor.skip(hOffset || 0).limit(hLimit || 0);
-            if (filetype === 'csv') {
-                generateCSV(attrName, cursor.stream(), callback);
-            } else {
-                cursor.toArray(function(err, results) {
-                    return process.nextTick(callback.bind(null, err, results, totalCount));
-                });
-            }
+        return nextPage;
+    }
+
+    function returnStream(cursor, err, totalCount) {
+        if (err) {
+            return process.nextTick(callback.bind(null, err));
+        }
+        const docs = cursor.stream();
+        process.nextTick(
+            callback.bind(null, null, filetype === 'csv' ? getCSVStream(attrName, docs) : docs, totalCount)
+        );
+    }
+
+    function returnResults(cursor, fetchResults, isPage) {
+        if (shouldStream) {
+            // The total count has to be known before starting to stream the results
+            return getTotalCount(returnStream.bind(null, cursor));
+        }
+        async.parallel([fetchResults || cursor.toArray.bind(cursor), getTotalCount], function(err, results) {
+            process.nextTick(
+                callback.bind(
+                    null,
+                    err,
+                    results && results[0],
+                    results && results[1],
+                    !err && isPage ? getNextPage(results[0]) : undefined
+                )
+            );
         });
+    }
+
+    if (lastN) {
+        // The last entries are retrieved in descending order and reversed in memory, which is bounded by lastN
+        const cursor = collection
+            .find(findCondition, projection)
+            .sort({ recvTime: -1 })
+            .limit(lastN);
+        const fetchResults = function(callback) {
+            cursor.toArray(function(err, results) {
+                if (!err) {
+                    results.reverse();
+                }
+                callback(err, results);
+            });
+        };
+        if (filetype === 'csv') {
+            return async.parallel([fetchResults, getTotalCount], function(err, results) {
+                process.nextTick(
+                    callback.bind(
+                        null,
+                        err,
+                        err ? undefined : getCSVStream(attrName, stream.Readable.from(results[0])),
+                        results && results[1]
+                    )
+                );
+            });
+        }
+        returnResults(cursor, fetchResults);
+    } else if (lastN === 0) {
+        returnResults(collection.find(findCondition, projection).sort({ recvTime: 1 }));
+    } else if (hToken) {
+        // The page is resumed just after the last entry already returned using the pagination index, so its cost does
+        //  not depend on its position as with hOffset
+        returnResults(
+            collection
+                .find(
+                    {
+                        $and: [
+                            findCondition,
+                            {
+                                $or: [
+                                    { recvTime: { $gt: hToken.recvTime } },
+                                    { recvTime: hToken.recvTime, _id: { $gt: new ObjectID(hToken.id) } }
+                                ]
+                            }
+                        ]
+                    },
+                    pageProjection
+                )
+                .sort({ recvTime: 1, _id: 1 })
+                .limit(hLimit || 0),
+            null,
+            true
+        );
+    } else if (hOffset || hLimit) {
+        returnResults(
+            collection
+                .find(findCondition, pageProjection)
+                .sort({ recvTime: 1, _id: 1 })
+                .skip(hOffset || 0)
+                .limit(hLimit || 0),
+            null,
+            true
+        );
     } else {
-        cursor = collection.find(findCondition, {
-            _id: 0,
-            attrType: 1,
-            attrValue: 1,
-            recvTime: 1
-        });
-        cursor.count(function(err, count) {
-            totalCount = count;
-            if (filetype === 'csv') {
-                generateCSV(attrName, cursor.stream(), callback);
-            } else {
-                cursor.toArray(function(err, results) {
-                    return process.nextTick(callback.bind(null, err, results, totalCount));
-                });
-            }
-        });
+        returnResults(collection.find(findCondition, projection));
     }
 }
 
@@ -792,145 +937,56 @@ function getAggregatedData(data, callback) {
         };
     }
 
-    if (shouldFilter) {
-        const pushAccumulator = {
-            offset: '$points.offset',
-            samples: '$points.samples'
-        };
-        for (let i = 0; i < aggregatedFunctions.length; i++) {
-            pushAccumulator[aggregatedFunctions[i]] = '$points.' + aggregatedFunctions[i];
-        }
-
-        let matchCondition;
-        switch (sthConfig.DATA_MODEL) {
-            case sthConfig.DATA_MODELS.COLLECTION_PER_SERVICE_PATH:
-                matchCondition = {
-                    '_id.entityId': entityId,
-                    '_id.entityType': entityType,
-                    '_id.attrName': attrName,
-                    '_id.resolution': resolution
-                };
-                break;
-            case sthConfig.DATA_MODELS.COLLECTION_PER_ENTITY:
-                matchCondition = {
-                    '_id.attrName': attrName,
-                    '_id.resolution': resolution
-                };
-                break;
-            case sthConfig.DATA_MODELS.COLLECTION_PER_ATTRIBUTE:
-                matchCondition = {
-                    '_id.resolution': resolution
-                };
-                break;
-        }
-        if (originFilter) {
-            matchCondition['_id.origin'] = originFilter;
-        }
-
-        let groupId;
-        switch (sthConfig.DATA_MODEL) {
-            case sthConfig.DATA_MODELS.COLLECTION_PER_SERVICE_PATH:
-                groupId = {
-                    entityId: '$_id.entityId',
-                    entityType: '$_id.entityType',
-                    attrName: '$_id.attrName',
-                    origin: '$_id.origin',
-                    resolution: '$_id.resolution'
-                };
-                break;
-            case sthConfig.DATA_MODELS.COLLECTION_PER_ENTITY:
-                groupId = {
-                    attrName: '$_id.attrName',
-                    origin: '$_id.origin',
-                    resolution: '$_id.resolution'
-                };
-                break;
-            case sthConfig.DATA_MODELS.COLLECTION_PER_ATTRIBUTE:
-                groupId = {
-                    origin: '$_id.origin',
-                    resolution: '$_id.resolution'
-                };
-                break;
-        }
+    // Get the aggregated data from the database
+    // Return the data in ascending order based on the origin
+    let findCondition;
+    switch (sthConfig.DATA_MODEL) {
+        case sthConfig.DATA_MODELS.COLLECTION_PER_SERVICE_PATH:
+            findCondition = {
+                '_id.entityId': entityId,
+                '_id.entityType': entityType,
+                '_id.attrName': attrName,
+                '_id.resolution': resolution
+            };
+            break;
+        case sthConfig.DATA_MODELS.COLLECTION_PER_ENTITY:
+            findCondition = {
+                '_id.attrName': attrName,
+                '_id.resolution': resolution
+            };
+            break;
+        case sthConfig.DATA_MODELS.COLLECTION_PER_ATTRIBUTE:
+            findCondition = {
+                '_id.resolution': resolution
+            };
+            break;
+    }
+    if (originFilter) {
+        findCondition['_id.origin'] = originFilter;
+    }
 
-        collection.aggregate(
-            [
-                {
-                    $match: matchCondition
-                },
-                {
-                    $project: fieldFilter
-                },
-                {
-                    $unwind: '$points'
-                },
-                {
-                    $match: {
-                        'points.samples': {
-                            $gt: 0
-                        }
-                    }
-                },
-                {
-                    $group: {
-                        _id: groupId,
-                        points: {
-                            $push: pushAccumulator
-                        }
-                    }
-                },
-                {
-                    $sort: {
-                        '_id.origin': 1
+    // The points with no samples are filtered out as the documents are read, instead of unwinding and regrouping the
+    //  points of each document in the database
+    const resultsArr = [];
+    collection
+        .find(findCondition, fieldFilter)
+        .sort({ '_id.origin': 1 })
+        .forEach(
+            function(doc) {
+                if (shouldFilter) {
+                    doc.points = (doc.points || []).filter(function(point) {
+                        return point.samples > 0;
+                    });
+                    if (!doc.points.length) {
+                        return;
                     }
                 }
-            ],
-            function(err, cursor) {
-                cursor.toArray(function(err, resultsArr) {
-                    filterResults(resultsArr, {
-                        resolution,
-                        from,
-                        to,
-                        aggregatedFunction,
-                        shouldFilter
-                    });
-                    process.nextTick(callback.bind(null, err, resultsArr));
-                });
-            }
-        );
-    } else {
-        // Get the aggregated data from the database
-        // Return the data in ascending order based on the origin
-        let findCondition;
-        switch (sthConfig.DATA_MODEL) {
-            case sthConfig.DATA_MODELS.COLLECTION_PER_SERVICE_PATH:
-                findCondition = {
-                    '_id.entityId': entityId,
-                    '_id.entityType': entityType,
-                    '_id.attrName': attrName,
-                    '_id.resolution': resolution
-                };
-                break;
-            case sthConfig.DATA_MODELS.COLLECTION_PER_ENTITY:
-                findCondition = {
-                    '_id.attrName': attrName,
-                    '_id.resolution': resolution
-                };
-                break;
-            case sthConfig.DATA_MODELS.COLLECTION_PER_ATTRIBUTE:
-                findCondition = {
-                    '_id.resolution': resolution
-                };
-                break;
-        }
-        if (originFilter) {
-            findCondition['_id.origin'] = originFilter;
-        }
-
-        collection
-            .find(findCondition, fieldFilter)
-            .sort({ '_id.origin': 1 })
-            .toArray(function(err, resultsArr) {
+                resultsArr.push(doc);
+            },
+            function(err) {
+                if (err) {
+                    return process.nextTick(callback.bind(null, err));
+                }
                 filterResults(resultsArr, {
                     resolution,
                     from,
@@ -938,9 +994,9 @@ function getAggregatedData(data, callback) {
                     aggregatedFunction,
                     shouldFilter
                 });
-                process.nextTick(callback.bind(null, err, resultsArr));
-            });
-    }
+                process.nextTick(callback.bind(null, null, resultsArr));
+            }
+        );
 }
 
 /**
@@ -1116,66 +1172,337 @@ function getAggregateUpdate4Update(attrType, attrValue, resolution, recvTime) {
 }
 
 /**
- * Returns the update to be used in the MongoDB update operation for the removal of aggregated data
- * @param {object} data Object including the following properties:
- *  - {string} attrType The type of the attribute to aggregate
- *  - {string} attrValue The value of the attribute to aggregate
- *  - {object} notificationInfo Information about the notification
- *  - {string} resolution The resolution
- *  - {date} recvTime The data reception time
- * @returns {Object} The update operation
+ * Returns the changes an attribute value makes in the aggregated point it belongs to
+ * @param {string} attrValue The value of the attribute to aggregate
+ * @return {object} The point delta including the samples and, depending on the aggregation type, the sum, sum2, min
+ *  and max or the occur (using the escaped values as keys) properties
  */
-function getAggregateUpdate4Removal(data) {
-    const attrType = data.attrType;
-    const attrValue = data.attrValue;
-    const notificationInfo = data.notificationInfo;
-    const resolution = data.resolution;
-    const timestamp = data.timestamp;
-    let aggregateUpdate4Removal;
-    let escapedAttrValue = parseFloat(notificationInfo.updates.attrValue);
-    if (sthUtils.getAggregationType(notificationInfo.updates.attrValue) === sthConfig.AGGREGATIONS.NUMERIC) {
-        aggregateUpdate4Removal = {
-            $inc: {
-                'points.$.samples': -1,
-                'points.$.sum': -escapedAttrValue,
-                'points.$.sum2': -Math.pow(escapedAttrValue, 2)
-            },
-            $set: {
-                attrType,
-                'points.$.min':
-                    notificationInfo.newMinValues && notificationInfo.newMinValues[resolution]
-                        ? Math.min(parseFloat(notificationInfo.newMinValues[resolution]), parseFloat(attrValue))
-                        : parseFloat(attrValue),
-                'points.$.max':
-                    notificationInfo.newMaxValues && notificationInfo.newMaxValues[resolution]
-                        ? Math.max(parseFloat(notificationInfo.newMaxValues[resolution]), parseFloat(attrValue))
-                        : parseFloat(attrValue)
-            }
+function getAggregateDelta(attrValue) {
+    if (sthUtils.getAggregationType(attrValue) === sthConfig.AGGREGATIONS.NUMERIC) {
+        const attrValueAsNumber = parseFloat(attrValue);
+        return {
+            samples: 1,
+            sum: attrValueAsNumber,
+            sum2: Math.pow(attrValueAsNumber, 2),
+            min: attrValueAsNumber,
+            max: attrValueAsNumber
         };
+    }
+    const occur = {};
+    occur[attrValue.replace(/\$/g, '\uFF04').replace(/\./g, '\uFF0E')] = 1;
+    return {
+        samples: 1,
+        occur
+    };
+}
+
+/**
+ * Merges a point delta into another one of the same aggregation type
+ * @param {object} delta The point delta to update
+ * @param {object} other The point delta to merge
+ */
+function mergeAggregateDelta(delta, other) {
+    delta.samples += other.samples;
+    if (other.occur) {
+        Object.keys(other.occur).forEach(function(key) {
+            delta.occur[key] = (delta.occur[key] || 0) + other.occur[key];
+        });
     } else {
-        const offset = sthUtils.getOffset(resolution, timestamp);
-        aggregateUpdate4Removal = {
-            $set: {
-                attrType
-            },
-            $inc: {
-                'points.$.samples': -1
-            }
-        };
-        escapedAttrValue = notificationInfo.updates.attrValue.replace(/\$/g, '\uFF04').replace(/\./g, '\uFF0E');
-        aggregateUpdate4Removal.$inc[
-            'points.' +
-                (offset - (resolution === 'day' || resolution === 'month' || resolution === 'year' ? 1 : 0)) +
-                '.occur.' +
-                escapedAttrValue
-        ] = -1;
+        delta.sum += other.sum;
+        delta.sum2 += other.sum2;
+        delta.min = Math.min(delta.min, other.min);
+        delta.max = Math.max(delta.max, other.max);
     }
-    return aggregateUpdate4Removal;
 }
 
 /**
- * Removes previously aggregated data based on the data included in the received notification
- * @param {object} data The data to be stored. It is an object including the following properties:
+ * Returns the update to be used in the MongoDB update operation for buffered aggregated data
+ * @param {string} attrType The type of the attribute to aggregate
+ * @param {string} resolution The resolution
+ * @param {date} timestamp The timestamp of any of the buffered attribute values
+ * @param {object} delta The point delta to apply (see getAggregateDelta())
+ * @returns {Object} The update operation
+ */
+function getAggregateUpdate4Delta(attrType, resolution, timestamp, delta) {
+    const aggregateUpdate4Delta = {
+        $set: {
+            attrType
+        },
+        $inc: {
+            'points.$.samples': delta.samples
+        }
+    };
+    if (delta.occur) {
+        const offset = sthUtils.getOffset(resolution, timestamp);
+        const index = offset - (resolution === 'day' || resolution === 'month' || resolution === 'year' ? 1 : 0);
+        Object.keys(delta.occur).forEach(function(key) {
+            aggregateUpdate4Delta.$inc['points.' + index + '.occur.' + key] = delta.occur[key];
+        });
+    } else {
+        aggregateUpdate4Delta.$inc['points.$.sum'] = delta.sum;
+        aggregateUpdate4Delta.$inc['points.$.sum2'] = delta.sum2;
+        aggregateUpdate4Delta.$min = { 'points.$.min': delta.min };
+        aggregateUpdate4Delta.$max = { 'points.$.max': delta.max };
+    }
+    return aggregateUpdate4Delta;
+}
+
+/**
+ * Returns the condition to be used in the MongoDB single update operation (upsert) for aggregated data. Unlike the
+ *  one returned by getAggregateUpdateCondition(), it does not include the point offset
+ * @param {object} data Object including the following properties:
+ *  - {string} entityId The entity id
+ *  - {string} entityType The entity type
+ *  - {string} attrName The attribute name
+ *  - {string} resolution The resolution
+ *  - {date} timestamp The attribute value timestamp
+ * @return {object} The update condition
+ */
+function getAggregateUpsertCondition(data) {
+    return _.omit(getAggregateUpdateCondition(data), 'points.offset');
+}
+
+/**
+ * Returns the key identifying an aggregated data document (bucket) in the bucket cache
+ * @param {object} collection The aggregated data collection
+ * @param {object} conditionData Object including the following properties:
+ *  - {string} entityId The entity id
+ *  - {string} entityType The entity type
+ *  - {string} attrName The attribute name
+ *  - {string} resolution The resolution
+ *  - {date} timestamp The attribute value timestamp
+ * @return {string} The bucket key
+ */
+function getAggregatedBucketKey(collection, conditionData) {
+    return collection.namespace + JSON.stringify(getAggregateUpsertCondition(conditionData));
+}
+
+/**
+ * Returns true if the aggregated data document (bucket) is known to exist, so its prepopulation can be skipped. The
+ *  single update operation (see getAggregateUpdate4Upsert()) does not need it
+ * @param {object} collection The aggregated data collection
+ * @param {object} conditionData The bucket data (see getAggregatedBucketKey())
+ * @return {boolean} True if the bucket is known to exist, false otherwise
+ */
+function isKnownAggregatedBucket(collection, conditionData) {
+    return !sthConfig.AGGREGATE_SINGLE_UPDATE && sthBucketCache.has(getAggregatedBucketKey(collection, conditionData));
+}
+
+/**
+ * Remembers that an aggregated data document (bucket) exists once it has been prepopulated
+ * @param {object} collection The aggregated data collection
+ * @param {object} conditionData The bucket data (see getAggregatedBucketKey())
+ */
+function rememberAggregatedBucket(collection, conditionData) {
+    let maxExpires;
+    if (sthConfig.AGGREGATE_SINGLE_UPDATE) {
+        return;
+    }
+    if (sthConfig.TRUNCATION_EXPIRE_AFTER_SECONDS > 0) {
+        // The TTL index removes the bucket once its origin is old enough
+        maxExpires =
+            sthUtils.getOrigin(conditionData.timestamp, conditionData.resolution).getTime() +
+            sthConfig.TRUNCATION_EXPIRE_AFTER_SECONDS * 1000;
+    }
+    sthBucketCache.set(getAggregatedBucketKey(collection, conditionData), maxExpires);
+}
+
+/**
+ * Remembers that the aggregated data documents (buckets) of a new event (attribute value) exist once they have been
+ *  prepopulated for all the resolutions
+ * @param {object} data It is an object including the following properties:
+ *  - {object} collection: The aggregated data collection
+ *  - {date} recvTime The date the event arrived
+ *  - {string} entityId The entity id associated to updated attribute
+ *  - {string} entityType The entity type associated to the updated attribute
+ *  - {object} attribute The updated attribute
+ */
+function rememberAggregatedBuckets(data) {
+    const timestamp = sthUtils.getAttributeTimestamp(data.attribute, data.recvTime);
+    sthConfig.AGGREGATION_BY.forEach(function(resolution) {
+        rememberAggregatedBucket(data.collection, {
+            entityId: data.entityId,
+            entityType: data.entityType,
+            attrName: data.attribute.name,
+            resolution,
+            timestamp
+        });
+    });
+}
+
+/**
+ * Checks that the aggregated data documents (buckets) whose prepopulation was skipped by a bulk write since they were
+ *  known to exist were actually updated, prepopulating again and storing the aggregated data of the ones removed while
+ *  cached (for example, by a TTL index or by the scripts in the resources directory). Since each update operation of
+ *  the bulk write matches or upserts one document unless its bucket has been removed, the buckets are only looked up if
+ *  the number of matched and upserted documents is lower than the number of operations
+ * @param {object} collection The aggregated data collection
+ * @param {Array} knownBuckets The buckets known to exist, each one including the following properties:
+ *  - {object} conditionData The bucket data (see getAggregatedBucketKey())
+ *  - {Function} store Function storing again the aggregated data written to the bucket, receiving a callback
+ * @param {number} operations The number of operations of the bulk write
+ * @param {object} result The result of the bulk write
+ * @param {Function} callback Function to call once the operation completes
+ */
+function restoreRemovedAggregatedBuckets(collection, knownBuckets, operations, result, callback) {
+    if (!knownBuckets.length || !result || result.nMatched + result.nUpserted >= operations) {
+        return process.nextTick(callback);
+    }
+    async.filter(
+        knownBuckets,
+        function(bucket, callback) {
+            collection.findOne(
+                getAggregateUpsertCondition(bucket.conditionData),
+                { projection: { _id: 1 } },
+                function(err, doc) {
+                    callback(err, !doc);
+                }
+            );
+        },
+        function(err, removedBuckets) {
+            if (err) {
+                return process.nextTick(callback.bind(null, err));
+            }
+            sthLogger.debug(
+                sthConfig.LOGGING_CONTEXT.DB_LOG,
+                removedBuckets.length + ' cached aggregated data buckets removed from ' + collection.namespace
+            );
+            async.each(
+                removedBuckets,
+                function(bucket, callback) {
+                    sthBucketCache.invalidate(getAggregatedBucketKey(collection, bucket.conditionData));
+                    bucket.store(callback);
+                },
+                callback
+            );
+        }
+    );
+}
+
+/**
+ * Returns the update pipeline to be used in the MongoDB single update operation (upsert) for aggregated data. It
+ *  prepopulates the points if the document does not exist and updates the point corresponding to the timestamp
+ *  offset, doing in just one operation what getAggregateUpdate4Insert() and getAggregateUpdate4Update() do in two.
+ *  Update pipelines require MongoDB 4.2 or greater
+ * @param {string} attrType The type of the attribute to aggregate
+ * @param {string} attrValue The value of the attribute to aggregate
+ * @param {string} resolution The resolution
+ * @param {date} timestamp The attribute value timestamp
+ * @param {object} delta The point delta to apply (see getAggregateDelta()). Optional, the one of the attribute value is
+ *  applied by default
+ * @return {Array} The update pipeline
+ */
+function getAggregateUpdate4Upsert(attrType, attrValue, resolution, timestamp, delta) {
+    const offset = sthUtils.getOffset(resolution, timestamp);
+    const pointDelta = delta || getAggregateDelta(attrValue);
+    let pointUpdate;
+    if (pointDelta.occur) {
+        const occurUpdate = {};
+        Object.keys(pointDelta.occur).forEach(function(key) {
+            occurUpdate[key] = { $add: [{ $ifNull: ['$$point.occur.' + key, 0] }, pointDelta.occur[key]] };
+        });
+        pointUpdate = {
+            samples: { $add: ['$$point.samples', pointDelta.samples] },
+            occur: { $mergeObjects: ['$$point.occur', occurUpdate] }
+        };
+    } else {
+        pointUpdate = {
+            samples: { $add: ['$$point.samples', pointDelta.samples] },
+            // The points prepopulated for textual values have no sum nor sum2
+            sum: { $add: [{ $ifNull: ['$$point.sum', 0] }, pointDelta.sum] },
+            sum2: { $add: [{ $ifNull: ['$$point.sum2', 0] }, pointDelta.sum2] },
+            min: { $min: ['$$point.min', pointDelta.min] },
+            max: { $max: ['$$point.max', pointDelta.max] }
+        };
+    }
+    return [
+        {
+            $set: {
+                attrType: { $literal: attrType },
+                points: {
+                    $map: {
+                        input: {
+                            $ifNull: [
+                                '$points',
+                                { $literal: getAggregatePrepopulatedData(attrType, attrValue, resolution) }
+                            ]
+                        },
+                        as: 'point',
+                        in: {
+                            $cond: [
+                                { $eq: ['$$point.offset', offset] },
+                                { $mergeObjects: ['$$point', pointUpdate] },
+                                '$$point'
+                            ]
+                        }
+                    }
+                }
+            }
+        }
+    ];
+}
+
+/**
+ * Returns the update to be used in the MongoDB update operation for the removal of aggregated data
+ * @param {object} data Object including the following properties:
+ *  - {string} attrType The type of the attribute to aggregate
+ *  - {string} attrValue The value of the attribute to aggregate
+ *  - {object} notificationInfo Information about the notification
+ *  - {string} resolution The resolution
+ *  - {date} recvTime The data reception time
+ * @returns {Object} The update operation
+ */
+function getAggregateUpdate4Removal(data) {
+    const attrType = data.attrType;
+    const attrValue = data.attrValue;
+    const notificationInfo = data.notificationInfo;
+    const resolution = data.resolution;
+    const timestamp = data.timestamp;
+    let aggregateUpdate4Removal;
+    let escapedAttrValue = parseFloat(notificationInfo.updates.attrValue);
+    if (sthUtils.getAggregationType(notificationInfo.updates.attrValue) === sthConfig.AGGREGATIONS.NUMERIC) {
+        aggregateUpdate4Removal = {
+            $inc: {
+                'points.$.samples': -1,
+                'points.$.sum': -escapedAttrValue,
+                'points.$.sum2': -Math.pow(escapedAttrValue, 2)
+            },
+            $set: {
+                attrType,
+                'points.$.min':
+                    notificationInfo.newMinValues && notificationInfo.newMinValues[resolution]
+                        ? Math.min(parseFloat(notificationInfo.newMinValues[resolution]), parseFloat(attrValue))
+                        : parseFloat(attrValue),
+                'points.$.max':
+                    notificationInfo.newMaxValues && notificationInfo.newMaxValues[resolution]
+                        ? Math.max(parseFloat(notificationInfo.newMaxValues[resolution]), parseFloat(attrValue))
+                        : parseFloat(attrValue)
+            }
+        };
+    } else {
+        const offset = sthUtils.getOffset(resolution, timestamp);
+        aggregateUpdate4Removal = {
+            $set: {
+                attrType
+            },
+            $inc: {
+                'points.$.samples': -1
+            }
+        };
+        escapedAttrValue = notificationInfo.updates.attrValue.replace(/\$/g, '\uFF04').replace(/\./g, '\uFF0E');
+        aggregateUpdate4Removal.$inc[
+            'points.' +
+                (offset - (resolution === 'day' || resolution === 'month' || resolution === 'year' ? 1 : 0)) +
+                '.occur.' +
+                escapedAttrValue
+        ] = -1;
+    }
+    return aggregateUpdate4Removal;
+}
+
+/**
+ * Removes previously aggregated data based on the data included in the received notification
+ * @param {object} data The data to be stored. It is an object including the following properties:
  *  - {object} collection: The collection where the data should be stored
  *  - {string} entityId The entity id
  *  - {string} entityType: The entity type
@@ -1250,7 +1577,57 @@ function updateAggregatedData(data, callback) {
                 w: !isNaN(sthConfig.WRITE_CONCERN) ? parseInt(sthConfig.WRITE_CONCERN, 10) : sthConfig.WRITE_CONCERN
             }
         },
+        function(err, result) {
+            if (err && callback) {
+                return process.nextTick(callback.bind(null, err));
+            }
+            if (data.isKnownBucket && result && result.result && result.result.n === 0) {
+                // The bucket was removed while cached, prepopulate it again
+                sthBucketCache.invalidate(getAggregatedBucketKey(data.collection, data));
+                return storeAggregatedData4Resolution(_.omit(data, 'isKnownBucket'), callback);
+            }
+            removePreviouslyAggregatedData(data, callback);
+        }
+    );
+}
+
+/**
+ * Updates the aggregated data based on the included in the received notification using just one update operation
+ *  (upsert), prepopulating the aggregated data if there is no entry for the concrete origin and resolution
+ * @param {object} data The data to be stored. It is an object including the following properties:
+ *  - {object} collection: The collection where the data should be stored
+ *  - {string} entityId The entity id
+ *  - {string} entityType: The entity type
+ *  - {string} attrName: The attribute name
+ *  - {string} attrType: The attribute type
+ *  - {string} attrValue: The attribute value
+ *  - {string} resolution: The resolution
+ *  - {date} timestamp: The attribute value timestamp
+ *  - {object} notificationInfo: Info about the notification
+ * @param {Function} callback Function to call once the operation completes
+ * @param {boolean} isRetry Flag indicating if the operation is being retried
+ */
+function upsertAggregatedData(data, callback, isRetry) {
+    data.collection.updateOne(
+        getAggregateUpsertCondition({
+            entityId: data.entityId,
+            entityType: data.entityType,
+            attrName: data.attrName,
+            resolution: data.resolution,
+            timestamp: data.timestamp
+        }),
+        getAggregateUpdate4Upsert(data.attrType, data.attrValue, data.resolution, data.timestamp),
+        {
+            upsert: true,
+            writeConcern: {
+                w: !isNaN(sthConfig.WRITE_CONCERN) ? parseInt(sthConfig.WRITE_CONCERN, 10) : sthConfig.WRITE_CONCERN
+            }
+        },
         function(err) {
+            if (err && err.code === 11000 && !isRetry) {
+                // Concurrent upserts of the same new document: the one failing becomes an update when retried
+                return upsertAggregatedData(data, callback, true);
+            }
             if (err && callback) {
                 return process.nextTick(callback.bind(null, err));
             }
@@ -1287,8 +1664,9 @@ function storeAggregatedData4Resolution(data, callback) {
    Currently the MongoDB $ positional update operator cannot be combined with upserts
      (see http://docs.mongodb.org/manual/reference/operator/update/positional/#upsert).
    This issue is known and currently under study: https://jira.mongodb.org/browse/SERVER-3326
-   Once the issue is solved, it will be possible to prepopulate collections or update their docs
-     using just one update operation like this:
+   Update pipelines (available since MongoDB 4.2) make it possible to prepopulate collections or update their docs
+     using just one update operation, which is done by upsertAggregatedData() if the AGGREGATE_SINGLE_UPDATE option is
+     enabled. Once the issue is solved, it would be also possible like this:
      collection.update(
        // Returning all the update operators currently returned by getAggregateUpdate4Insert
        //  and getAggregateUpdate4Update in the same object
@@ -1306,16 +1684,26 @@ function storeAggregatedData4Resolution(data, callback) {
      );
   */
 
+    if (sthConfig.AGGREGATE_SINGLE_UPDATE) {
+        return upsertAggregatedData(data, callback);
+    }
+
+    const conditionData = {
+        entityId,
+        entityType,
+        attrName,
+        resolution,
+        timestamp
+    };
+
+    if (isKnownAggregatedBucket(collection, conditionData)) {
+        return updateAggregatedData(Object.assign({ isKnownBucket: true }, data), callback);
+    }
+
     // Prepopulate the aggregated data collection if there is no entry for the concrete
     //  origin and resolution.
     collection.update(
-        getAggregateUpdateCondition({
-            entityId,
-            entityType,
-            attrName,
-            resolution,
-            timestamp
-        }),
+        getAggregateUpdateCondition(conditionData),
         getAggregateUpdate4Insert(attrType, attrValue, resolution),
         {
             upsert: true,
@@ -1327,6 +1715,9 @@ function storeAggregatedData4Resolution(data, callback) {
             if (err && callback) {
                 return process.nextTick(callback.bind(null, err));
             }
+            if (!err) {
+                rememberAggregatedBucket(collection, conditionData);
+            }
             updateAggregatedData(data, callback);
         }
     );
@@ -1360,24 +1751,388 @@ function storeAggregatedData(data, callback) {
         }
     }
 
-    const timestamp = sthUtils.getAttributeTimestamp(attribute, recvTime);
+    function store() {
+        const timestamp = sthUtils.getAttributeTimestamp(attribute, recvTime);
 
-    sthConfig.AGGREGATION_BY.forEach(function(entry) {
-        storeAggregatedData4Resolution(
-            {
-                collection,
-                entityId,
-                entityType,
-                attrName: attribute.name,
+        sthConfig.AGGREGATION_BY.forEach(function(entry) {
+            storeAggregatedData4Resolution(
+                {
+                    collection,
+                    entityId,
+                    entityType,
+                    attrName: attribute.name,
+                    attrType: attribute.type,
+                    attrValue: attribute.value,
+                    resolution: entry,
+                    timestamp,
+                    notificationInfo
+                },
+                onCompletion
+            );
+        });
+    }
+
+    if (bufferAggregatedData(data)) {
+        return process.nextTick(callback);
+    }
+    if (notificationInfo && notificationInfo.updates && (aggregationBuffer.size || aggregationBufferFlushing)) {
+        // The previously aggregated data to undo may be still buffered
+        return flushAggregatedData(store);
+    }
+    store();
+}
+
+/**
+ * Adds the aggregated data for a new event (attribute value) to the aggregation buffer, if enabled. The buffered data
+ *  is merged per aggregated point and flushed once the configured interval expires or the configured number of
+ *  points is reached. Data updates are never buffered since they have to undo previously aggregated data, and neither
+ *  is the data of new aggregated points if the buffer is full (for example, while the database is not reachable)
+ * @param {object} data The data to be stored. It is an object including the following properties:
+ *  - {object} collection: The collection where the data should be stored in
+ *  - {date} recvTime The date the event arrived
+ *  - {string} entityId The entity id associated to updated attribute
+ *  - {string} entityType The entity type associated to the updated attribute
+ *  - {object} attribute The updated attribute
+ *  - {object} notificationInfo Information about the notification
+ * @return {boolean} True if the data has been buffered, false otherwise
+ */
+function bufferAggregatedData(data) {
+    if (!sthConfig.AGGREGATION_BUFFER_INTERVAL || (data.notificationInfo && data.notificationInfo.updates)) {
+        return false;
+    }
+
+    const attribute = data.attribute;
+    const timestamp = sthUtils.getAttributeTimestamp(attribute, data.recvTime);
+
+    const points = sthConfig.AGGREGATION_BY.map(function(resolution) {
+        const conditionData = {
+            entityId: data.entityId,
+            entityType: data.entityType,
+            attrName: attribute.name,
+            resolution,
+            timestamp
+        };
+        const delta = getAggregateDelta(attribute.value);
+        const key =
+            data.collection.namespace +
+            JSON.stringify(getAggregateUpdateCondition(conditionData)) +
+            (delta.occur ? sthConfig.AGGREGATIONS.TEXTUAL : sthConfig.AGGREGATIONS.NUMERIC);
+        return { key, conditionData, delta };
+    });
+    const newPoints = points.filter(function(point) {
+        return !aggregationBuffer.has(point.key);
+    }).length;
+    if (aggregationBuffer.size + newPoints > sthConfig.AGGREGATION_BUFFER_SIZE) {
+        return false;
+    }
+
+    points.forEach(function(point) {
+        const entry = aggregationBuffer.get(point.key);
+        if (entry) {
+            entry.attrType = attribute.type;
+            mergeAggregateDelta(entry.delta, point.delta);
+        } else {
+            aggregationBuffer.set(point.key, {
+                key: point.key,
+                collection: data.collection,
+                conditionData: point.conditionData,
                 attrType: attribute.type,
                 attrValue: attribute.value,
-                resolution: entry,
-                timestamp,
-                notificationInfo
-            },
-            onCompletion
-        );
+                delta: point.delta
+            });
+        }
     });
+
+    if (newPoints && aggregationBuffer.size >= sthConfig.AGGREGATION_BUFFER_SIZE) {
+        flushAggregatedData();
+    } else {
+        scheduleAggregatedDataFlush();
+    }
+    return true;
+}
+
+/**
+ * Schedules the flush of the aggregation buffer once the configured interval expires, if not already scheduled
+ */
+function scheduleAggregatedDataFlush() {
+    if (!aggregationBufferTimer) {
+        aggregationBufferTimer = setTimeout(flushAggregatedData, sthConfig.AGGREGATION_BUFFER_INTERVAL);
+        aggregationBufferTimer.unref();
+    }
+}
+
+/**
+ * Adds back to the aggregation buffer entries which could not be flushed, merging them with the ones buffered in the
+ *  meantime for the same aggregated points. The entries of other aggregated points are only added while the buffer is
+ *  not full
+ * @param {Array} entries The aggregation buffer entries
+ * @return {number} The number of entries which could not be added back
+ */
+function rebufferAggregatedData(entries) {
+    let lost = 0;
+    entries.forEach(function(entry) {
+        const bufferedEntry = aggregationBuffer.get(entry.key);
+        if (bufferedEntry) {
+            // The buffered entry keeps the attribute type of the most recent value
+            mergeAggregateDelta(bufferedEntry.delta, entry.delta);
+            bufferedEntry.isRetry = bufferedEntry.isRetry || entry.isRetry;
+        } else if (aggregationBuffer.size < sthConfig.AGGREGATION_BUFFER_SIZE) {
+            aggregationBuffer.set(entry.key, entry);
+        } else {
+            lost++;
+        }
+    });
+    scheduleAggregatedDataFlush();
+    return lost;
+}
+
+/**
+ * Returns the buffered aggregated points affected by the write errors of a bulk write flushing them
+ * @param {object} group The flushed entries and operations of a collection, including the entry of each operation
+ * @param {Array} writeErrors The write errors of the bulk write
+ * @param {boolean} ordered Flag indicating if the bulk write was ordered
+ * @return {object} The entries to retry (the ones whose operations were not executed and the ones which failed due to
+ *  concurrent upserts of the same new document) and the entries lost
+ */
+function getFailedBufferedAggregatedData(group, writeErrors, ordered) {
+    const retried = new Set();
+    const lost = new Set();
+    writeErrors.forEach(function(writeError) {
+        const entry = group.operationEntries[writeError.index];
+        if (writeError.code === 11000 && !entry.isRetry) {
+            // Concurrent upserts of the same new document: the one failing becomes an update when retried
+            entry.isRetry = true;
+            retried.add(entry);
+        } else {
+            lost.add(entry);
+        }
+    });
+    if (ordered && writeErrors.length) {
+        // An ordered bulk write stops at the first failing operation
+        group.operationEntries.slice(writeErrors[0].index + 1).forEach(function(entry) {
+            if (!lost.has(entry)) {
+                retried.add(entry);
+            }
+        });
+    }
+    return { retried: Array.from(retried), lost: Array.from(lost) };
+}
+
+/**
+ * Returns the bulk write operations to store a buffered aggregated point. Whether the prepopulation of its bucket is
+ *  skipped since it is known to exist is set in the isKnownBucket property of the entry
+ * @param {object} entry The aggregation buffer entry
+ * @return {Array} The bulk write operations
+ */
+function getBufferedAggregatedDataBulkOperations(entry) {
+    const resolution = entry.conditionData.resolution;
+    const timestamp = entry.conditionData.timestamp;
+    if (sthConfig.AGGREGATE_SINGLE_UPDATE) {
+        return [
+            {
+                updateOne: {
+                    filter: getAggregateUpsertCondition(entry.conditionData),
+                    update: getAggregateUpdate4Upsert(
+                        entry.attrType,
+                        entry.attrValue,
+                        resolution,
+                        timestamp,
+                        entry.delta
+                    ),
+                    upsert: true
+                }
+            }
+        ];
+    }
+    const filter = getAggregateUpdateCondition(entry.conditionData);
+    const operations = [];
+    entry.isKnownBucket = isKnownAggregatedBucket(entry.collection, entry.conditionData);
+    if (!entry.isKnownBucket) {
+        operations.push({
+            updateOne: {
+                filter,
+                update: getAggregateUpdate4Insert(entry.attrType, entry.attrValue, resolution),
+                upsert: true
+            }
+        });
+    }
+    operations.push({
+        updateOne: {
+            filter,
+            update: getAggregateUpdate4Delta(entry.attrType, resolution, timestamp, entry.delta)
+        }
+    });
+    return operations;
+}
+
+/**
+ * Restores the buckets of the buffered aggregated points removed while cached once the points have been flushed (see
+ *  restoreRemovedAggregatedBuckets())
+ * @param {object} group The flushed entries and operations of a collection
+ * @param {object} result The result of the bulk write flushing them
+ * @param {Function} callback Function to call once the operation completes
+ */
+function restoreRemovedBufferedAggregatedData(group, result, callback) {
+    const knownBuckets = group.entries
+        .filter(function(entry) {
+            return entry.isKnownBucket;
+        })
+        .map(function(entry) {
+            return {
+                conditionData: entry.conditionData,
+                store: function(callback) {
+                    bulkWrite(entry.collection, getBufferedAggregatedDataBulkOperations(entry), true, callback);
+                }
+            };
+        });
+    restoreRemovedAggregatedBuckets(group.collection, knownBuckets, group.operations.length, result, callback);
+}
+
+/**
+ * Logs the buffered aggregated points lost when flushing them
+ * @param {string} namespace The namespace of the collection the points belong to
+ * @param {number} lost The number of points lost
+ * @param {object} err The error which caused the loss
+ */
+function logLostAggregatedData(namespace, lost, err) {
+    sthLogger.error(
+        sthConfig.LOGGING_CONTEXT.DB_LOG,
+        'Error when flushing the buffered aggregated data of ' + namespace + ', ' + lost +
+            ' buffered aggregated points may have been lost: ' + err
+    );
+}
+
+/**
+ * Writes the aggregated data buffered so far, using one bulk write per collection. Only one flush is executed at a
+ *  time: if a flush is requested while another one is in progress, it is executed once the current one completes. If
+ *  a bulk write is not executed at all (for example, due to a connection error), its entries are added back to the
+ *  buffer to be retried on the next flush. If it is executed but some of its operations fail, the entries whose
+ *  operations were not executed or failed due to concurrent upserts are retried straight away, and the rest of the
+ *  affected points are reported as lost
+ * @param {Function} callback Function to call once the operation completes (optional)
+ */
+function flushAggregatedData(callback) {
+    if (aggregationBufferFlushing) {
+        aggregationBufferPendingCallbacks = aggregationBufferPendingCallbacks || [];
+        if (callback) {
+            aggregationBufferPendingCallbacks.push(callback);
+        }
+        return;
+    }
+    if (aggregationBufferTimer) {
+        clearTimeout(aggregationBufferTimer);
+        aggregationBufferTimer = null;
+    }
+    const entries = Array.from(aggregationBuffer.values());
+    aggregationBuffer = new Map();
+    if (!entries.length) {
+        if (callback) {
+            return process.nextTick(callback);
+        }
+        return;
+    }
+    aggregationBufferFlushing = true;
+
+    const groups = {};
+    entries.forEach(function(entry) {
+        const namespace = entry.collection.namespace;
+        groups[namespace] = groups[namespace] || {
+            collection: entry.collection,
+            operations: [],
+            operationEntries: [],
+            entries: []
+        };
+        getBufferedAggregatedDataBulkOperations(entry).forEach(function(operation) {
+            groups[namespace].operations.push(operation);
+            groups[namespace].operationEntries.push(entry);
+        });
+        groups[namespace].entries.push(entry);
+    });
+
+    let error;
+    let retry = false;
+    async.each(
+        Object.keys(groups),
+        function(namespace, callback) {
+            const group = groups[namespace];
+            // The prepopulation must precede the update of each point when using two update operations
+            const ordered = !sthConfig.AGGREGATE_SINGLE_UPDATE;
+            bulkWrite(group.collection, group.operations, ordered, function(err, result) {
+                if (!err) {
+                    return restoreRemovedBufferedAggregatedData(group, result, function(err) {
+                        if (err) {
+                            logLostAggregatedData(namespace, group.entries.length, err);
+                            error = error || err;
+                        } else {
+                            group.entries.forEach(function(entry) {
+                                rememberAggregatedBucket(entry.collection, entry.conditionData);
+                            });
+                        }
+                        callback();
+                    });
+                }
+                if (!err.result) {
+                    sthLogger.error(
+                        sthConfig.LOGGING_CONTEXT.DB_LOG,
+                        'Error when flushing the buffered aggregated data of ' + namespace + ', ' +
+                            group.entries.length + ' buffered aggregated points will be retried: ' + err
+                    );
+                    const lost = rebufferAggregatedData(group.entries);
+                    if (lost) {
+                        logLostAggregatedData(namespace, lost, 'the aggregation buffer is full');
+                    }
+                    error = error || err;
+                    return callback();
+                }
+                const writeErrors = err.result.getWriteErrors();
+                // Without write errors, it is a write concern error and the operations may have not been applied
+                const failed = writeErrors.length
+                    ? getFailedBufferedAggregatedData(group, writeErrors, ordered)
+                    : { retried: [], lost: group.entries };
+                if (failed.lost.length) {
+                    logLostAggregatedData(namespace, failed.lost.length, err);
+                    error = error || err;
+                }
+                if (failed.retried.length) {
+                    const lost = rebufferAggregatedData(failed.retried);
+                    if (lost) {
+                        logLostAggregatedData(namespace, lost, 'the aggregation buffer is full');
+                        error = error || err;
+                    }
+                    retry = true;
+                }
+                group.entries.forEach(function(entry) {
+                    if (failed.retried.indexOf(entry) === -1 && failed.lost.indexOf(entry) === -1) {
+                        rememberAggregatedBucket(entry.collection, entry.conditionData);
+                    }
+                });
+                callback();
+            });
+        },
+        function() {
+            sthLogger.debug(
+                sthConfig.LOGGING_CONTEXT.DB_LOG,
+                entries.length + ' buffered aggregated points flushed to ' + Object.keys(groups).length + ' collections'
+            );
+            aggregationBufferFlushing = false;
+            const pendingCallbacks = aggregationBufferPendingCallbacks;
+            aggregationBufferPendingCallbacks = null;
+            if (callback && !retry) {
+                process.nextTick(callback.bind(null, error));
+            }
+            if (retry || pendingCallbacks) {
+                // The retried points are written before reporting the completion of this flush
+                flushAggregatedData(function(err) {
+                    if (callback && retry) {
+                        callback(error || err);
+                    }
+                    (pendingCallbacks || []).forEach(function(pendingCallback) {
+                        pendingCallback(err);
+                    });
+                });
+            }
+        }
+    );
 }
 
 /**
@@ -1427,26 +2182,20 @@ function insertRawData(collection, newRawData, callback) {
 }
 
 /**
- * Stores the raw data for a new event (attribute value)
+ * Returns the raw data document to store for a new event (attribute value) according to the data model
  * @param {object} data The data to be stored. It is an object including the following properties:
- *  - {object} collection: The collection where the data should be stored in
  *  - {date} recvTime The date the event arrived
  *  - {string} entityId The entity id associated to updated attribute
  *  - {string} entityType The entity type associated to the updated attribute
  *  - {object} attribute The updated attribute
- *  - {object} notificationInfo Information about the notification including the following properties:
- *  - {object} updates The database entry the notification updates, if any
- * @param {Function} callback Function to call once the operation completes
+ * @return {object} The raw data document
  */
-function storeRawData(data, callback) {
-    const collection = data.collection;
-    const recvTime = data.recvTime;
+function getNewRawData(data) {
     const entityId = data.entityId;
     const entityType = data.entityType;
     const attribute = data.attribute;
-    const notificationInfo = data.notificationInfo;
 
-    const timestamp = sthUtils.getAttributeTimestamp(attribute, recvTime);
+    const timestamp = sthUtils.getAttributeTimestamp(attribute, data.recvTime);
 
     let newRawData;
     switch (sthConfig.DATA_MODEL) {
@@ -1476,6 +2225,26 @@ function storeRawData(data, callback) {
             };
             break;
     }
+    return newRawData;
+}
+
+/**
+ * Stores the raw data for a new event (attribute value)
+ * @param {object} data The data to be stored. It is an object including the following properties:
+ *  - {object} collection: The collection where the data should be stored in
+ *  - {date} recvTime The date the event arrived
+ *  - {string} entityId The entity id associated to updated attribute
+ *  - {string} entityType The entity type associated to the updated attribute
+ *  - {object} attribute The updated attribute
+ *  - {object} notificationInfo Information about the notification including the following properties:
+ *  - {object} updates The database entry the notification updates, if any
+ * @param {Function} callback Function to call once the operation completes
+ */
+function storeRawData(data, callback) {
+    const collection = data.collection;
+    const notificationInfo = data.notificationInfo;
+
+    const newRawData = getNewRawData(data);
 
     if (notificationInfo && notificationInfo.updates) {
         // The raw data to store is a raw data update
@@ -1485,6 +2254,140 @@ function storeRawData(data, callback) {
     }
 }
 
+/**
+ * Returns the bulk write operation to store the raw data for a new event (attribute value), equivalent to the one
+ *  made by storeRawData()
+ * @param {object} data The data to be stored. It is an object including the following properties:
+ *  - {date} recvTime The date the event arrived
+ *  - {string} entityId The entity id associated to updated attribute
+ *  - {string} entityType The entity type associated to the updated attribute
+ *  - {object} attribute The updated attribute
+ *  - {object} notificationInfo Information about the notification including the following properties:
+ *  - {object} updates The database entry the notification updates, if any
+ * @return {object} The bulk write operation
+ */
+function getRawDataBulkOperation(data) {
+    const notificationInfo = data.notificationInfo;
+    const newRawData = getNewRawData(data);
+
+    if (notificationInfo && notificationInfo.updates) {
+        return { replaceOne: { filter: notificationInfo.updates, replacement: newRawData } };
+    }
+    return { insertOne: { document: newRawData } };
+}
+
+/**
+ * Returns the bulk write operations to store the aggregated data for a new event (attribute value) in all the
+ *  resolutions, equivalent (and in the same order) to the ones made by storeAggregatedData(). The buckets whose
+ *  prepopulation is skipped since they are known to exist are set in the knownBuckets property of the data, to be
+ *  passed to restoreRemovedAggregatedBuckets() once the operations have been executed
+ * @param {object} data The data to be stored. It is an object including the following properties:
+ *  - {object} collection: The collection where the data should be stored in
+ *  - {date} recvTime The date the event arrived
+ *  - {string} entityId The entity id associated to updated attribute
+ *  - {string} entityType The entity type associated to the updated attribute
+ *  - {object} attribute The updated attribute
+ *  - {object} notificationInfo Information about the notification
+ * @return {Array} The bulk write operations
+ */
+function getAggregatedDataBulkOperations(data) {
+    const attribute = data.attribute;
+    const notificationInfo = data.notificationInfo;
+    const timestamp = sthUtils.getAttributeTimestamp(attribute, data.recvTime);
+    const operations = [];
+
+    data.knownBuckets = [];
+    sthConfig.AGGREGATION_BY.forEach(function(resolution) {
+        const conditionData = {
+            entityId: data.entityId,
+            entityType: data.entityType,
+            attrName: attribute.name,
+            resolution,
+            timestamp
+        };
+        const filter = getAggregateUpdateCondition(conditionData);
+        if (sthConfig.AGGREGATE_SINGLE_UPDATE) {
+            operations.push({
+                updateOne: {
+                    filter: getAggregateUpsertCondition(conditionData),
+                    update: getAggregateUpdate4Upsert(attribute.type, attribute.value, resolution, timestamp),
+                    upsert: true
+                }
+            });
+        } else if (isKnownAggregatedBucket(data.collection, conditionData)) {
+            data.knownBuckets.push({
+                conditionData,
+                store: storeAggregatedData4Resolution.bind(null, {
+                    collection: data.collection,
+                    entityId: data.entityId,
+                    entityType: data.entityType,
+                    attrName: attribute.name,
+                    attrType: attribute.type,
+                    attrValue: attribute.value,
+                    resolution,
+                    timestamp,
+                    notificationInfo
+                })
+            });
+        } else {
+            operations.push({
+                updateOne: {
+                    filter,
+                    update: getAggregateUpdate4Insert(attribute.type, attribute.value, resolution),
+                    upsert: true
+                }
+            });
+        }
+        if (!sthConfig.AGGREGATE_SINGLE_UPDATE) {
+            operations.push({
+                updateOne: {
+                    filter,
+                    update: getAggregateUpdate4Update(attribute.type, attribute.value, resolution, timestamp)
+                }
+            });
+        }
+        if (notificationInfo && notificationInfo.updates) {
+            operations.push({
+                updateOne: {
+                    filter,
+                    update: getAggregateUpdate4Removal({
+                        attrType: attribute.type,
+                        attrValue: attribute.value,
+                        notificationInfo,
+                        resolution,
+                        timestamp
+                    })
+                }
+            });
+        }
+    });
+    return operations;
+}
+
+/**
+ * Executes a set of write operations on a collection as a bulk write
+ * @param {object} collection The collection
+ * @param {Array} operations The bulk write operations
+ * @param {boolean} ordered Flag indicating if the operations should be executed in order, stopping at the first error
+ * @param {Function} callback Function to call once the operation completes with the error and the result
+ */
+function bulkWrite(collection, operations, ordered, callback) {
+    collection.bulkWrite(
+        operations,
+        {
+            ordered,
+            writeConcern: {
+                w: !isNaN(sthConfig.WRITE_CONCERN) ? parseInt(sthConfig.WRITE_CONCERN, 10) : sthConfig.WRITE_CONCERN
+            }
+        },
+        function(err, result) {
+            if (callback) {
+                process.nextTick(callback.bind(null, err, result));
+            }
+        }
+    );
+}
+
 /**
  * Returns the find() condition to use to get the new minimum and maximum values after some raw data update
  * @param {object} data The data to be stored. It is an object including the following properties:
@@ -1665,26 +2568,14 @@ function generateNotificationInfo(data, searchResult, callback) {
 }
 
 /**
- * Returns information about the notification such as if the notification aims to insert new data,
- *  update already existent data or if it corresponds to already registered data
- * @param {object} data The data to be stored. It is an object including the following properties:
- *  - {object} collection: The collection where the data should be stored in
- *  - {date} recvTime The date the event arrived
- *  - {string} entityId The entity id associated to the updated attribute
- *  - {string} entityType The entity type associated to the updated attribute
- *  - {object} attribute The updated attribute
- * @param {Function} callback Function to call once the operation completes
+ * Returns the find() condition to use to check if the data included in a notification is already registered
+ * @param {string} entityId The entity id associated to the updated attribute
+ * @param {string} entityType The entity type associated to the updated attribute
+ * @param {object} attribute The updated attribute
+ * @param {Date} timestamp The timestamp associated to the attribute value
+ * @return {object} The find() condition
  */
-function getNotificationInfo(data, callback) {
-    const collection = data.collection;
-    const recvTime = data.recvTime;
-    const entityId = data.entityId;
-    const entityType = data.entityType;
-    const attribute = data.attribute;
-
-    const timestamp = sthUtils.getAttributeTimestamp(attribute, recvTime);
-    data.timestamp = timestamp;
-
+function getNotificationFindCondition(entityId, entityType, attribute, timestamp) {
     let findCondition;
     switch (sthConfig.DATA_MODEL) {
         case sthConfig.DATA_MODELS.COLLECTION_PER_SERVICE_PATH:
@@ -1710,8 +2601,96 @@ function getNotificationInfo(data, callback) {
             };
             break;
     }
+    return findCondition;
+}
+
+/**
+ * Stores the raw data for a new event (attribute value) only if there is no raw data registered for the same
+ *  timestamp, without checking it beforehand (see getNotificationInfo()). Recently stored raw data is remembered so
+ *  replays of it are detected without accessing the database
+ * @param {object} data The data to be stored. It is an object including the following properties:
+ *  - {object} collection: The collection where the data should be stored in
+ *  - {date} recvTime The date the event arrived
+ *  - {string} entityId The entity id associated to updated attribute
+ *  - {string} entityType The entity type associated to the updated attribute
+ *  - {object} attribute The updated attribute
+ * @param {Function} callback Function to call once the operation completes with the error and an object including
+ *  the following properties:
+ *  - {boolean} inserted True if the raw data has been stored. Otherwise, the raw data may be already registered or
+ *      an update of already registered data, which has to be checked using getNotificationInfo()
+ *  - {boolean} exists True if the raw data is known to be already registered
+ */
+function insertRawDataIfAbsent(data, callback) {
+    const collection = data.collection;
+    const attribute = data.attribute;
+    const timestamp = sthUtils.getAttributeTimestamp(attribute, data.recvTime);
+    const findCondition = getNotificationFindCondition(data.entityId, data.entityType, attribute, timestamp);
+    const key = collection.namespace + JSON.stringify(findCondition);
+    const value = JSON.stringify(attribute.value);
+
+    if (recentRawData.has(key)) {
+        const exists = recentRawData.get(key) === value;
+        if (!exists) {
+            // The raw data is updated falling back to the usual processing, so the remembered value is not valid
+            //  anymore
+            recentRawData.delete(key);
+        }
+        return process.nextTick(callback.bind(null, null, { inserted: false, exists }));
+    }
 
-    collection.findOne(findCondition, function(err, result) {
+    // The upsert inserts the find condition fields plus the attribute value, which is the same as getNewRawData()
+    collection.updateOne(
+        findCondition,
+        { $setOnInsert: { attrValue: attribute.value } },
+        {
+            upsert: true,
+            writeConcern: {
+                w: !isNaN(sthConfig.WRITE_CONCERN) ? parseInt(sthConfig.WRITE_CONCERN, 10) : sthConfig.WRITE_CONCERN
+            }
+        },
+        function(err, result) {
+            if (err) {
+                if (err.code === 11000) {
+                    // Concurrently inserted
+                    return process.nextTick(callback.bind(null, null, { inserted: false }));
+                }
+                return process.nextTick(callback.bind(null, err));
+            }
+            // The result is not available if the write is not acknowledged
+            const inserted = !!result && result.upsertedCount === 1;
+            if (inserted && sthConfig.FAST_INSERT_RECENT_KEYS > 0) {
+                recentRawData.set(key, value);
+                if (recentRawData.size > sthConfig.FAST_INSERT_RECENT_KEYS) {
+                    recentRawData.delete(recentRawData.keys().next().value);
+                }
+            }
+            process.nextTick(callback.bind(null, null, { inserted }));
+        }
+    );
+}
+
+/**
+ * Returns information about the notification such as if the notification aims to insert new data,
+ *  update already existent data or if it corresponds to already registered data
+ * @param {object} data The data to be stored. It is an object including the following properties:
+ *  - {object} collection: The collection where the data should be stored in
+ *  - {date} recvTime The date the event arrived
+ *  - {string} entityId The entity id associated to the updated attribute
+ *  - {string} entityType The entity type associated to the updated attribute
+ *  - {object} attribute The updated attribute
+ * @param {Function} callback Function to call once the operation completes
+ */
+function getNotificationInfo(data, callback) {
+    const collection = data.collection;
+    const recvTime = data.recvTime;
+    const entityId = data.entityId;
+    const entityType = data.entityType;
+    const attribute = data.attribute;
+
+    const timestamp = sthUtils.getAttributeTimestamp(attribute, recvTime);
+    data.timestamp = timestamp;
+
+    collection.findOne(getNotificationFindCondition(entityId, entityType, attribute, timestamp), function(err, result) {
         if (err && callback) {
             return process.nextTick(callback.bind(null, err));
         }
@@ -1726,7 +2705,14 @@ function getNotificationInfo(data, callback) {
  * @param {function} callback The callback to call with error or the result of the operation
  */
 function dropCollection(collectionName, service, callback) {
-    client.db(sthDatabaseNaming.getDatabaseName(service)).dropCollection(collectionName, callback);
+    const databaseName = sthDatabaseNaming.getDatabaseName(service);
+    sthCollectionCache.invalidate(databaseName, collectionName);
+    client.db(databaseName).dropCollection(collectionName, function(err, result) {
+        sthCollectionCache.invalidate(databaseName, collectionName);
+        // The bucket keys start with the collection namespace followed by the JSON of the bucket condition
+        sthBucketCache.invalidatePrefix(databaseName + '.' + collectionName + '{');
+        return callback(err, result);
+    });
 }
 
 /**
@@ -1998,7 +2984,13 @@ function removeData(data, callback) {
     } else if (sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.ONLY_AGGREGATED) {
         dataRemovalFunctions.push(async.apply(removeAggregatedData, data));
     }
-    async.parallel(dataRemovalFunctions, callback);
+    async.parallel(dataRemovalFunctions, function(err, result) {
+        sthCollectionCache.invalidateDatabase(sthDatabaseNaming.getDatabaseName(data.service));
+        sthBucketCache.invalidatePrefix(sthDatabaseNaming.getDatabaseName(data.service) + '.');
+        // The removed data may be notified again
+        recentRawData = new Map();
+        return callback(err, result);
+    });
 }
 
 module.exports = {
@@ -2021,10 +3013,20 @@ module.exports = {
     getAggregatedData,
     getAggregateUpdateCondition,
     getAggregatePrepopulatedData,
+    getAggregateUpsertCondition,
+    getAggregateUpdate4Upsert,
     storeAggregatedData,
     storeAggregatedData4Resolution,
+    bufferAggregatedData,
+    flushAggregatedData,
     storeRawData,
+    getRawDataBulkOperation,
+    getAggregatedDataBulkOperations,
+    rememberAggregatedBuckets,
+    restoreRemovedAggregatedBuckets,
+    bulkWrite,
     getNotificationInfo,
+    insertRawDataIfAbsent,
     removeData,
     isAggregated
 };
@@ -30,8 +30,6 @@ const sthServerUtils = require(ROOT_PATH + '/lib/server/utils/sthServerUtils');
 const sthDatabase = require(ROOT_PATH + '/lib/database/sthDatabase');
 const boom = require('boom');
 const stream = require('stream');
-const fs = require('fs');
-const path = require('path');
 const encodeRFC5987 = require('rfc5987-value-chars').encode;
 
 /**
@@ -104,13 +102,16 @@ function getRawData(request, reply) {
                 lastN: request.query.lastN,
                 hLimit: request.query.hLimit,
                 hOffset: request.query.hOffset,
+                hToken: request.sth.hToken,
                 from: request.query.dateFrom,
                 to: request.query.dateTo,
-                filetype: request.query.filetype
+                filetype: request.query.filetype,
+                shouldStream: sthConfig.STREAM_RAW_DATA,
+                count: request.query.count
             };
             sthLogger.debug(request.sth.context, 'Getting the raw data from collection using query %j', rawQuery);
             rawQuery.collection = collection;
-            sthDatabase.getRawData(rawQuery, function(err, result, totalCount) {
+            sthDatabase.getRawData(rawQuery, function(err, result, totalCount, nextPage) {
                 delete rawQuery.collection; // for log purposes
                 if (err) {
                     // Error when getting the raw data
@@ -136,32 +137,37 @@ function getRawData(request, reply) {
                             sthServerUtils.getEmptyResponse()
                         )
                     );
-                } else if (result instanceof stream) {
+                } else if (result instanceof stream && rawQuery.filetype === 'csv') {
+                    // The CSV contents are streamed straight from the database, so the file name is set up front
+                    const fileName = request.params.attrName + '-' + Date.now() + '.csv';
+                    sthLogger.debug(request.sth.context, "Responding with file '" + fileName + "'");
+                    response = reply(result)
+                        .type('text/csv; charset=utf-8')
+                        .header('Content-Disposition', "attachment; filename*= utf-8''" + encodeRFC5987(fileName));
+                } else if (result instanceof stream && rawQuery.shouldStream) {
                     sthLogger.debug(request.sth.context, 'Responding with a stream of docs');
-                    response = reply(new stream.Readable().wrap(result));
-                } else if (typeof result === 'string') {
-                    sthLogger.debug(request.sth.context, "Responding with file '" + result + "'");
-                    fs.readFile(result, function(err, data) {
-                        response = reply(data);
-                        const fileName = result.substring(result.lastIndexOf(path.sep) + 1);
-                        response.header(
-                            'Content-Disposition',
-                            "attachment; filename*= utf-8''" + encodeRFC5987(fileName)
-                        );
-                        response.once('finish', function() {
-                            sthLogger.debug(request.sth.context, "Removing file '" + result + "'");
-                            fs.unlink(result, function(err) {
-                                if (!err) {
-                                    sthLogger.debug(request.sth.context, "File '" + result + "' successfully removed");
-                                } else {
-                                    sthLogger.warn(
+                    response = reply(
+                        sthServerUtils.getNGSIPayloadStream(
+                            request.params.version,
+                            request.params.entityId,
+                            request.params.entityType,
+                            request.params.attrName,
+                            result,
+                            function(err) {
+                                if (err) {
+                                    sthLogger.error(
                                         request.sth.context,
-                                        "Error when removing file '" + result + "': " + err
+                                        'Error %j when streaming raw data with query %j',
+                                        err,
+                                        rawQuery
                                     );
                                 }
-                            });
-                        });
-                    }); // readfile
+                            }
+                        )
+                    ).type('application/json; charset=utf-8');
+                } else if (result instanceof stream) {
+                    sthLogger.debug(request.sth.context, 'Responding with a stream of docs');
+                    response = reply(new stream.Readable().wrap(result));
                 } else {
                     sthLogger.debug(request.sth.context, 'Responding with %s docs', result.length);
                     response = reply(
@@ -179,6 +185,9 @@ function getRawData(request, reply) {
                     sthLogger.debug(request.sth.context, 'totalCount %j', totalCount);
                     sthServerUtils.addFiwareTotalCount(totalCount, response);
                 }
+                if (nextPage) {
+                    sthServerUtils.addFiwareNextToken(sthServerUtils.getPageToken(nextPage), response);
+                }
             });
         }
     });
@@ -329,9 +338,26 @@ function getDataHandler(request, reply) {
         request.query.lastN === 0 ||
         ((request.query.hLimit || request.query.hLimit === 0) &&
             (request.query.hOffset || request.query.hOffset === 0)) ||
+        (request.query.hLimit && request.query.hToken) ||
         (request.query.filetype && request.query.filetype.toLowerCase() === 'csv')
     ) {
         // Raw data is requested
+        if (request.query.hToken) {
+            request.sth.hToken = sthServerUtils.parsePageToken(request.query.hToken);
+            if (!request.sth.hToken) {
+                message = 'hToken is not valid';
+                sthLogger.warn(
+                    request.sth.context,
+                    request.method.toUpperCase() + ' ' + request.url.path + ', error=' + message
+                );
+                error = boom.badRequest(message);
+                error.output.payload.validation = {
+                    source: 'query',
+                    keys: ['hToken']
+                };
+                return reply(error);
+            }
+        }
         // Check & ensure hLimit<=lastN<=config.maxPageSize.
         if (request.query.hLimit || request.query.lastN) {
             if (
@@ -347,7 +373,7 @@ function getDataHandler(request, reply) {
                 error = boom.badRequest(message);
                 error.output.payload.validation = {
                     source: 'query',
-                    keys: ['lastN', 'hLimit', 'hOffset', 'filetype', 'aggrMethod', 'aggrPeriod', 'count']
+                    keys: ['lastN', 'hLimit', 'hOffset', 'hToken', 'filetype', 'aggrMethod', 'aggrPeriod', 'count']
                 };
                 return reply(error);
             }
@@ -367,7 +393,7 @@ function getDataHandler(request, reply) {
         error = boom.badRequest(message);
         error.output.payload.validation = {
             source: 'query',
-            keys: ['lastN', 'hLimit', 'hOffset', 'filetype', 'aggrMethod', 'aggrPeriod', 'count']
+            keys: ['lastN', 'hLimit', 'hOffset', 'hToken', 'filetype', 'aggrMethod', 'aggrPeriod', 'count']
         };
         return reply(error);
     }
@@ -29,6 +29,7 @@ const sthConfig = require(ROOT_PATH + '/lib/configuration/sthConfiguration');
 const sthServerUtils = require(ROOT_PATH + '/lib/server/utils/sthServerUtils');
 const sthDatabase = require(ROOT_PATH + '/lib/database/sthDatabase');
 const boom = require('boom');
+const async = require('async');
 
 /**
  * Returns the total number of attributes to be processed
@@ -293,6 +294,29 @@ function storeAggregatedData(data, reply) {
     );
 }
 
+/**
+ * Checks if the value of an attribute received in a new notification can be aggregated
+ * @param {Object} data Data object including the following properties:
+ *                      - {Object} request   The request received
+ *                      - {Object} attribute The attribute to check
+ * @return {boolean} True if the attribute value can be aggregated, false otherwise
+ */
+function isAggregatable(data) {
+    const attribute = data.attribute;
+    if (
+        !attribute.value ||
+        (typeof attribute.value !== 'string' && typeof attribute.value !== 'number') ||
+        (sthConfig.IGNORE_BLANK_SPACES && typeof attribute.value === 'string' && attribute.value.trim() === '')
+    ) {
+        sthLogger.warn(
+            data.request.sth.context,
+            'Attribute value not aggregatable: ' + JSON.stringify(attribute.value)
+        );
+        return false;
+    }
+    return true;
+}
+
 /**
  * Processes each attribute received in a new notification
  * @param {Object} data Data object including the following properties:
@@ -305,21 +329,24 @@ function storeAggregatedData(data, reply) {
  *                                                between rawAggregatedData() and storeAggregatedData() functions to let
  *                                                them synchronize
  *                      - {number} totalTasks The total number of writings to make
+ *                      - {boolean} isAggregatableValue Flag indicating if the attribute value is aggregatable, if
+ *                                                already known
  * @param {function} hapi's reply function
  */
 function processAttribute(data, reply) {
-    const attribute = data.attribute;
-    let isAggregatableValue = true;
+    if (data.isAggregatableValue === undefined) {
+        // Checked just once, since the attribute may be processed again when falling back from the fast insert mode
+        data.isAggregatableValue = isAggregatable(data);
+    }
+    const isAggregatableValue = data.isAggregatableValue;
+
     if (
-        !attribute.value ||
-        (typeof attribute.value !== 'string' && typeof attribute.value !== 'number') ||
-        (sthConfig.IGNORE_BLANK_SPACES && typeof attribute.value === 'string' && attribute.value.trim() === '')
+        sthConfig.FAST_INSERT &&
+        !data.isFallback &&
+        (sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.ONLY_RAW ||
+            sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.BOTH)
     ) {
-        sthLogger.warn(
-            data.request.sth.context,
-            'Attribute value not aggregatable: ' + JSON.stringify(attribute.value)
-        );
-        isAggregatableValue = false;
+        return fastInsertAttribute(data, reply);
     }
 
     getNotificationInfo(data, function onNotificationInfo(err, result) {
@@ -357,6 +384,365 @@ function processAttribute(data, reply) {
     });
 }
 
+/**
+ * Processes an attribute received in a new notification optimistically inserting its raw data, without checking
+ *  beforehand if it is already registered. If the raw data cannot be inserted (it is already registered or it is an
+ *  update of already registered data), the attribute is processed as usual (see processAttribute())
+ * @param {Object}   data  Data object including the following properties:
+ *                         - {Object} request        The request received
+ *                         - {Object} contextElement The context element included in the received request
+ *                         - {Object} attribute      The attribute to process
+ *                         - {Date}   recvTime       The date and time when the notification was received
+ *                         - {Object} counterObj     Counter object shared by all the attributes of the notification
+ *                         - {Number} totalTasks     The total number of writings to make
+ *                         - {Boolean} isAggregatableValue Flag indicating if the attribute value is aggregatable
+ * @param {Function} reply The reply function provided by the hapi server
+ */
+function fastInsertAttribute(data, reply) {
+    const request = data.request;
+    const contextElement = data.contextElement;
+    const attribute = data.attribute;
+
+    function fallback(err) {
+        if (err) {
+            sthLogger.debug(request.sth.context, 'Error when inserting the raw data, falling back: ' + err);
+        }
+        data.isFallback = true;
+        processAttribute(data, reply);
+    }
+
+    sthDatabase.getCollection(
+        {
+            service: request.headers[sthConfig.HEADER.FIWARE_SERVICE],
+            servicePath: request.headers[sthConfig.HEADER.FIWARE_SERVICE_PATH],
+            entityId: contextElement.id,
+            entityType: contextElement.type,
+            attrName: attribute.name
+        },
+        {
+            isAggregated: false,
+            shouldCreate: true,
+            shouldTruncate: true
+        },
+        function(err, collection) {
+            if (err) {
+                return fallback(err);
+            }
+            sthDatabase.insertRawDataIfAbsent(
+                {
+                    collection,
+                    recvTime: data.recvTime,
+                    entityId: contextElement.id,
+                    entityType: contextElement.type,
+                    attribute
+                },
+                function(err, result) {
+                    if (err || (!result.inserted && !result.exists)) {
+                        return fallback(err);
+                    }
+                    if (result.exists) {
+                        sthLogger.debug(request.sth.context, 'Ignoring the notification since already registered');
+                        data.counterObj.counter += sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.BOTH ? 2 : 1;
+                        if (data.counterObj.counter === data.totalTasks) {
+                            reply();
+                        }
+                        return;
+                    }
+                    sthLogger.debug(request.sth.context, 'Raw data successfully stored');
+                    data.notificationInfo = { inserts: true };
+                    if (++data.counterObj.counter === data.totalTasks) {
+                        return reply();
+                    }
+                    if (sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.BOTH) {
+                        if (data.isAggregatableValue) {
+                            // Store the aggregated data into the database
+                            storeAggregatedData(data, reply);
+                        } else if (++data.counterObj.counter === data.totalTasks) {
+                            reply();
+                        }
+                    }
+                }
+            );
+        }
+    );
+}
+
+/**
+ * Gets the information and the collections needed to store an attribute received in a new notification using bulk
+ *  writes. The result is set in the passed data object
+ * @param {Object}   data     Data object including the following properties:
+ *                            - {Object} request        The request received
+ *                            - {Object} contextElement The context element included in the received request
+ *                            - {Object} attribute      The attribute to process
+ *                            - {Date}   recvTime       The date and time when the notification was received
+ * @param {Function} callback The callback to notify once the attribute has been prepared (it never receives an
+ *                            error, which is set in the data object instead)
+ */
+function prepareAttribute4BulkWrite(data, callback) {
+    const request = data.request;
+    const contextElement = data.contextElement;
+    const service = request.headers[sthConfig.HEADER.FIWARE_SERVICE];
+    const servicePath = request.headers[sthConfig.HEADER.FIWARE_SERVICE_PATH];
+    const shouldStoreRaw =
+        sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.ONLY_RAW ||
+        sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.BOTH;
+    const shouldStoreAggregated =
+        (sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.ONLY_AGGREGATED ||
+            sthConfig.SHOULD_STORE === sthConfig.DATA_TO_STORE.BOTH) &&
+        isAggregatable(data);
+
+    function getCollection(isAggregated, callback) {
+        sthDatabase.getCollection(
+            {
+                service,
+                servicePath,
+                entityId: contextElement.id,
+                entityType: contextElement.type,
+                attrName: data.attribute.name
+            },
+            {
+                isAggregated,
+                shouldCreate: true,
+                shouldTruncate: true
+            },
+            callback
+        );
+    }
+
+    getNotificationInfo(data, function onNotificationInfo(err, result) {
+        if (err) {
+            sthLogger.debug(request.sth.context, 'Error when getting the notification information: ' + err);
+            data.error = err;
+            return process.nextTick(callback);
+        } else if (result.exists) {
+            sthLogger.debug(request.sth.context, 'Ignoring the notification since already registered');
+            return process.nextTick(callback);
+        }
+        data.notificationInfo = result;
+
+        async.parallel(
+            {
+                rawCollection: shouldStoreRaw ? async.apply(getCollection, false) : async.constant(null),
+                aggregatedCollection: shouldStoreAggregated ? async.apply(getCollection, true) : async.constant(null)
+            },
+            function(err, collections) {
+                if (err) {
+                    sthLogger.error(request.sth.context, 'Error when getting the data collections for storing: ' + err);
+                    data.error = err;
+                } else {
+                    data.rawCollection = collections.rawCollection;
+                    data.aggregatedCollection = collections.aggregatedCollection;
+                }
+                process.nextTick(callback);
+            }
+        );
+    });
+}
+
+/**
+ * Executes the bulk write operations of several attributes grouped by collection (one bulk write per collection)
+ * @param {Object}   request        The request received
+ * @param {Array}    attributesData The data objects of the attributes to store
+ * @param {string}   collectionProp The name of the property of the data objects including the collection to use
+ * @param {Function} getOperations  Function returning the bulk write operations of a data object (if any)
+ * @param {boolean}  ordered        Flag indicating if the bulk writes should be ordered
+ * @param {Function} checkResult    Function to check the result of each successful bulk write, receiving the group of
+ *                                  the bulk write (its collection, operations and data objects), its result and a
+ *                                  callback (optional)
+ * @param {Function} callback       The callback to notify once all the bulk writes have completed (it never
+ *                                  receives an error, which is set in the data objects instead)
+ */
+function bulkWrite(request, attributesData, collectionProp, getOperations, ordered, checkResult, callback) {
+    const groups = {};
+    attributesData.forEach(function(data) {
+        const collection = data[collectionProp];
+        if (!collection || data.error || data.duplicated) {
+            return;
+        }
+        const operations = getOperations(data);
+        if (!operations.length) {
+            return;
+        }
+        const group = (groups[collection.collectionName] = groups[collection.collectionName] || {
+            collection,
+            operations: [],
+            owners: []
+        });
+        operations.forEach(function(operation) {
+            group.operations.push(operation);
+            group.owners.push(data);
+        });
+    });
+
+    async.each(
+        Object.keys(groups),
+        function(collectionName, callback) {
+            const group = groups[collectionName];
+            sthDatabase.bulkWrite(group.collection, group.operations, ordered, function(err, result) {
+                if (err) {
+                    const writeErrors = err.result && err.result.getWriteErrors ? err.result.getWriteErrors() : [];
+                    if (writeErrors.length) {
+                        writeErrors.forEach(function(writeError) {
+                            const data = group.owners[writeError.index];
+                            if (writeError.code === 11000) {
+                                sthLogger.debug(
+                                    request.sth.context,
+                                    'Ignoring the notification since already registered'
+                                );
+                                data.duplicated = true;
+                            } else {
+                                sthLogger.error(
+                                    request.sth.context,
+                                    'Error when storing the data: ' + writeError.errmsg
+                                );
+                                data.error = data.error || err;
+                            }
+                        });
+                        if (ordered) {
+                            // The operations after the first error were not executed
+                            group.owners.slice(writeErrors[0].index + 1).forEach(function(data) {
+                                data.error = data.error || err;
+                            });
+                        }
+                    } else {
+                        sthLogger.error(request.sth.context, 'Error when storing the data: ' + err);
+                        group.owners.forEach(function(data) {
+                            data.error = data.error || err;
+                        });
+                    }
+                } else {
+                    sthLogger.debug(
+                        request.sth.context,
+                        group.operations.length + ' write operations successfully executed in ' + collectionName
+                    );
+                    if (checkResult) {
+                        return checkResult(group, result, callback);
+                    }
+                }
+                process.nextTick(callback);
+            });
+        },
+        callback
+    );
+}
+
+/**
+ * Processes and stores the raw and aggregated data associated to the attribute values received in a notification
+ *  request using one bulk write per collection. As in the per attribute processing, already registered data is
+ *  ignored, data updates undo the previously aggregated values and the aggregated data is only stored if the raw data
+ *  was successfully stored
+ * @param {Date}     recvTime The time the request was received
+ * @param {Object}   request  The received request
+ * @param {Function} reply    The reply function provided by the hapi server
+ */
+function processNotificationInBulk(recvTime, request, reply) {
+    const attributesData = [];
+    request.payload.contextResponses.forEach(function(contextResponse) {
+        const contextElement = contextResponse.contextElement;
+        if (contextElement && contextElement.attributes && Array.isArray(contextElement.attributes)) {
+            contextElement.attributes.forEach(function(attribute) {
+                attributesData.push({
+                    request,
+                    contextElement,
+                    attribute,
+                    recvTime
+                });
+            });
+        }
+    });
+
+    function writeAggregatedData() {
+        bulkWrite(
+            request,
+            attributesData,
+            'aggregatedCollection',
+            function(data) {
+                const aggregatedData = {
+                    collection: data.aggregatedCollection,
+                    recvTime,
+                    entityId: data.contextElement.id,
+                    entityType: data.contextElement.type,
+                    attribute: data.attribute,
+                    notificationInfo: data.notificationInfo
+                };
+                if (sthDatabase.bufferAggregatedData(aggregatedData)) {
+                    return [];
+                }
+                data.aggregatedData = aggregatedData;
+                return sthDatabase.getAggregatedDataBulkOperations(aggregatedData);
+            },
+            true,
+            function(group, result, callback) {
+                const owners = group.owners.filter(function(data, index) {
+                    return group.owners.indexOf(data) === index;
+                });
+                const knownBuckets = owners.reduce(function(knownBuckets, data) {
+                    return knownBuckets.concat(data.aggregatedData.knownBuckets);
+                }, []);
+                sthDatabase.restoreRemovedAggregatedBuckets(
+                    group.collection,
+                    knownBuckets,
+                    group.operations.length,
+                    result,
+                    function(err) {
+                        if (err) {
+                            sthLogger.error(request.sth.context, 'Error when restoring the aggregated data: ' + err);
+                            owners.forEach(function(data) {
+                                data.error = data.error || err;
+                            });
+                        }
+                        process.nextTick(callback);
+                    }
+                );
+            },
+            function() {
+                attributesData.forEach(function(data) {
+                    if (data.aggregatedData && !data.error) {
+                        sthDatabase.rememberAggregatedBuckets(data.aggregatedData);
+                    }
+                });
+                const failed = attributesData.find(function(data) {
+                    return data.error;
+                });
+                const response = reply(failed ? failed.error : undefined);
+                sthServerUtils.addFiwareCorrelator(request, response);
+            }
+        );
+    }
+
+    async.each(attributesData, prepareAttribute4BulkWrite, function() {
+        bulkWrite(
+            request,
+            attributesData,
+            'rawCollection',
+            function(data) {
+                return [
+                    sthDatabase.getRawDataBulkOperation({
+                        recvTime,
+                        entityId: data.contextElement.id,
+                        entityType: data.contextElement.type,
+                        attribute: data.attribute,
+                        notificationInfo: data.notificationInfo
+                    })
+                ];
+            },
+            false,
+            null,
+            function() {
+                const hasUpdates = attributesData.some(function(data) {
+                    return data.notificationInfo && data.notificationInfo.updates;
+                });
+                if (hasUpdates) {
+                    // The previously aggregated data to undo may be still buffered
+                    sthDatabase.flushAggregatedData(writeAggregatedData);
+                } else {
+                    writeAggregatedData();
+                }
+            }
+        );
+    });
+}
+
 /**
  * Processes and stores the raw and aggregated data associated to the attribute values received in a
  * notification request
@@ -393,6 +779,10 @@ function processNotification(recvTime, request, reply) {
         return reply(error);
     }
 
+    if (sthConfig.BULK_WRITE) {
+        return processNotificationInBulk(recvTime, request, reply);
+    }
+
     for (let i = 0; i < contextResponses.length; i++) {
         if (
             contextResponses[i].contextElement &&
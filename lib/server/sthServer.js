@@ -27,6 +27,7 @@ const ROOT_PATH = require('app-root-path');
 const sthLogger = require('logops');
 const sthConfig = require(ROOT_PATH + '/lib/configuration/sthConfiguration');
 const sthServerUtils = require(ROOT_PATH + '/lib/server/utils/sthServerUtils');
+const sthDatabase = require(ROOT_PATH + '/lib/database/sthDatabase');
 const sthHeaderValidator = require(ROOT_PATH + '/lib/server/validators/sthHeaderValidator');
 const sthGetDataHandler = require(ROOT_PATH + '/lib/server/handlers/sthGetDataHandler');
 const sthGetDataHandlerV2 = require(ROOT_PATH + '/lib/server/handlers/sthGetDataHandlerV2');
@@ -77,6 +78,7 @@ function doStartServer(host, port, callback) {
                     hLimit: joi.number().integer().greater(-1).optional(),
                     // prettier-ignore
                     hOffset: joi.number().integer().greater(-1).optional(),
+                    hToken: joi.string().optional(),
                     // prettier-ignore
                     aggrMethod: joi.string().regex(aggRegex).optional(),
                     // prettier-ignore
@@ -85,7 +87,8 @@ function doStartServer(host, port, callback) {
                     dateFrom: joi.date().optional(),
                     dateTo: joi.date().optional(),
                     filetype: joi.string().optional(),
-                    count: joi.boolean().optional()
+                    // prettier-ignore
+                    count: joi.alternatives().try(joi.boolean(), joi.string().valid('estimated')).optional()
                 }
             }
         };
@@ -253,7 +256,8 @@ function startServer(host, port, callback) {
 }
 
 /**
- * Stops the server asynchronously
+ * Stops the server asynchronously, flushing the buffered aggregated data (if any) once no more notifications
+ *  can be received
  * @param {Function} callback Callback function to notify the result
  *  of the operation
  */
@@ -263,11 +267,15 @@ function stopServer(callback) {
         server.stop(function(err) {
             // Server successfully stopped
             sthLogger.info(sthConfig.LOGGING_CONTEXT.SERVER_STOP, 'hapi server successfully stopped');
-            return callback(err);
+            sthDatabase.flushAggregatedData(function() {
+                return callback(err);
+            });
         });
     } else {
         sthLogger.info(sthConfig.LOGGING_CONTEXT.SERVER_STOP, 'No hapi server running');
-        return process.nextTick(callback);
+        sthDatabase.flushAggregatedData(function() {
+            return callback();
+        });
     }
 }
 
@@ -23,6 +23,7 @@
 
 const ROOT_PATH = require('app-root-path');
 const uuid = require('uuid');
+const stream = require('stream');
 const sthConfig = require(ROOT_PATH + '/lib/configuration/sthConfiguration');
 
 /**
@@ -58,6 +59,58 @@ function addFiwareTotalCount(totalCount, response) {
     }
 }
 
+/**
+ * Adds the Fiware-Next-Token header into the response object
+ * @param {string} nextToken The token to request the next page
+ * @param {object} response The response
+ */
+function addFiwareNextToken(nextToken, response) {
+    if (response && response.header) {
+        response.header(sthConfig.HEADER.FIWARE_NEXT_TOKEN, nextToken);
+    }
+}
+
+/**
+ * Returns the opaque (and URL safe) token to request the page starting at certain position
+ * @param {object} page The position of the page, including the recvTime and the _id (id, as an hexadecimal string) of
+ *  the last entry of the previous page
+ * @return {string} The token
+ */
+function getPageToken(page) {
+    return Buffer.from(JSON.stringify([page.recvTime.getTime(), page.id]))
+        .toString('base64')
+        .replace(/\+/g, '-')
+        .replace(/\//g, '_')
+        .replace(/=+$/, '');
+}
+
+/**
+ * Returns the position of the page requested by certain token
+ * @param {string} token The token, as returned by getPageToken()
+ * @return {object} The position of the page (see getPageToken()) or undefined if the token is not valid
+ */
+function parsePageToken(token) {
+    let page;
+    try {
+        page = JSON.parse(Buffer.from(token, 'base64').toString());
+    } catch (exception) {
+        return undefined;
+    }
+    if (
+        !Array.isArray(page) ||
+        page.length !== 2 ||
+        !Number.isSafeInteger(page[0]) ||
+        typeof page[1] !== 'string' ||
+        !/^[0-9a-fA-F]{24}$/.test(page[1])
+    ) {
+        return undefined;
+    }
+    return {
+        recvTime: new Date(page[0]),
+        id: page[1]
+    };
+}
+
 /**
  * Generates the transaction identifier to be used for logging
  * @return {string} The generated transaction
@@ -131,6 +184,39 @@ function getNGSIPayload(ngsiVersion, entityId, entityType, attrName, payload) {
     return ngsiResponse;
 }
 
+/**
+ * Transforms a stream of documents into a stream of the NGSI formatted response payload including them, serializing
+ *  the documents as they are read instead of holding all of them in memory. The resulting payload is the same one
+ *  getNGSIPayload() returns for the array of the documents
+ * @param ngsiVersion NGSI version to use. Anything different from 2 (included undefined) means v1
+ * @param entityId The id of the requested entity's data
+ * @param entityType The type of the requested entity's data
+ * @param attrName The id of the requested attribute's data
+ * @param docs The readable stream (in object mode) of the documents to include in the payload
+ * @param callback The callback to notify once the documents have been transformed or an error occurred (if any, the
+ *  payload stream is destroyed)
+ * @return {Object} The readable stream of the payload using NGSI format
+ */
+function getNGSIPayloadStream(ngsiVersion, entityId, entityType, attrName, docs, callback) {
+    // The envelope is split where a unique placeholder value is serialized
+    const placeholder = createTransaction();
+    const envelope = JSON.stringify(getNGSIPayload(ngsiVersion, entityId, entityType, attrName, placeholder)).split(
+        JSON.stringify(placeholder)
+    );
+    let isFirst = true;
+    const payload = new stream.Transform({
+        writableObjectMode: true,
+        transform(doc, encoding, callback) {
+            callback(null, (isFirst ? envelope[0] + '[' : ',') + JSON.stringify(doc));
+            isFirst = false;
+        },
+        flush(callback) {
+            callback(null, (isFirst ? envelope[0] + '[' : '') + ']' + envelope[1]);
+        }
+    });
+    return stream.pipeline(docs, payload, callback);
+}
+
 /**
  * Returns the logging context associated to a request
  * @param {Object} request The request received
@@ -152,8 +238,12 @@ function getContext(request) {
 module.exports = {
     addFiwareCorrelator,
     addFiwareTotalCount,
+    addFiwareNextToken,
     getContext,
     getCorrelator,
     getEmptyResponse,
-    getNGSIPayload
+    getNGSIPayload,
+    getNGSIPayloadStream,
+    getPageToken,
+    parsePageToken
 };
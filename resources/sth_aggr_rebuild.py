@@ -0,0 +1,582 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+# Copyright 2026 Telefonica Investigacion y Desarrollo, S.A.U
+#
+# This file is part of Short Time Historic (STH) component
+#
+# STH is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# STH is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with STH.
+# If not, see http://www.gnu.org/licenses/.
+#
+# For those usages not covered by this license please contact with
+# iot_support at tid dot es
+
+# NOTE: this script rebuilds the aggregated documents from the raw data, so the raw data must cover the whole
+# time range to rebuild (i.e. it should not have been pruned or expired). The --from and --to limits are extended
+# to complete origins of the coarsest resolution to rebuild, so no aggregated document is rebuilt from partial data.
+#
+# The aggregated documents are written in the same shape STH uses (see getAggregatePrepopulatedData() and
+# getAggregateUpdate4Update() in sthDatabase.js), replacing the existing ones.
+
+import re
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from getopt import getopt, GetoptError
+
+import numpy as np
+from bson.son import SON
+from pymongo import MongoClient, ReplaceOne, ASCENDING
+
+# Per resolution: numpy unit of the origin, numpy unit of the offset, number of points and offset of the first point
+# (the same than in getOrigin() and getOffset() in sthUtils.js and getAggregatePrepopulatedData() in sthDatabase.js)
+RESOLUTIONS = {
+    'second': ('m', 's', 60, 0),
+    'minute': ('h', 'm', 60, 0),
+    'hour': ('D', 'h', 24, 0),
+    'day': ('M', 'D', 31, 1),
+    'month': ('Y', 'M', 12, 1)
+}
+
+# From the finest to the coarsest resolution
+RESOLUTIONS_ORDER = [ 'second', 'minute', 'hour', 'day', 'month' ]
+
+# Fields identifying an entity-attribute in the raw collection, per data model
+KEY_FIELDS = {
+    'collection-per-service-path': [ 'entityId', 'entityType', 'attrName' ],
+    'collection-per-entity': [ 'attrName' ],
+    'collection-per-attribute': []
+}
+
+# Number of operations in each bulk write
+BULK_SIZE = 1000
+
+EPOCH = datetime(1970, 1, 1)
+
+# Numeric values as considered by getAggregationType() in sthUtils.js (i.e. strings for which JavaScript isNaN() is false)
+NUMBER_REGEX = re.compile(r'^\s*[+-]?((\d+\.?\d*|\.\d+)([eE][+-]?\d+)?|Infinity)\s*$')
+NON_DECIMAL_REGEX = re.compile(r'^\s*0([xX][0-9a-fA-F]+|[oO][0-7]+|[bB][01]+)\s*$')
+
+
+def usage():
+    """
+    Print usage message
+    """
+
+    print 'Usage: %s --mongoUri <uri> --db <database> --col <collection> --aggrCol <collection> --resolutions <list> --from <date> --to <date> --batchSize <n> --ignoreBlankSpaces <true|false> --dryrun -u' % os.path.basename(__file__)
+    print ''
+    print 'Parameters:'
+    print "  --mongoUri <uri> (optional): mongo URI to connecto to DB. Default is 'mongodb://localhost'"
+    print "  --db <database>: database to use"
+    print "  --col <collection>: raw collection from which the aggregated data is calculated"
+    print "  --aggrCol <collection> (optional): aggregated collection to rebuild. Default is <collection>.aggr"
+    print "  --resolutions <list> (optional): comma-separated list of resolutions to rebuild (second, minute, hour, day and month). Default is 'day,hour,minute'"
+    print "  --from <date> (optional): rebuild from this date (format: YYYY-MM-DDTHH:MM:SS, UTC). It is extended to the origin of the coarsest resolution"
+    print "  --to <date> (optional): rebuild up to this date (format: YYYY-MM-DDTHH:MM:SS, UTC). It is extended to the end of the origin of the coarsest resolution"
+    print "  --batchSize <n> (optional): number of raw documents aggregated in each batch. Default is 10000"
+    print "  --ignoreBlankSpaces <true|false> (optional): skip whitespace-only values, as STH does with its IGNORE_BLANK_SPACES setting. Default is true"
+    print "  --dryrun (optional): if used script does a dry-run pass (i.e. without doing any modification in DB)"
+    print "  -u, print this usage mesage"
+
+
+def usage_and_exit(msg):
+    """
+    Print usage message and exit"
+
+    :param msg: optional error message to print
+    """
+
+    if msg != '':
+        print "ERROR: " + msg
+        print
+
+    usage()
+    sys.exit(1)
+
+
+def get_numeric_value(value):
+    """
+    Get the numeric value STH aggregates for an attribute value (see getAggregationType() in sthUtils.js and the
+    parseFloat() in getAggregateUpdate4Update() in sthDatabase.js)
+
+    :param value: the attribute value
+    :return: the numeric value as float, or None if the value is aggregated as textual
+    """
+
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, long, float)):
+        return float(value)
+    if NUMBER_REGEX.match(value):
+        return float(value.strip())
+    if NON_DECIMAL_REGEX.match(value):
+        # parseFloat() stops at the 'x', 'o' or 'b' character
+        return 0.0
+
+    return None
+
+
+def escape_value(value):
+    """
+    :param value: a textual attribute value
+    :return: the value escaped as STH does in the occur keys (fullwidth '$' and '.' characters)
+    """
+
+    return value.replace(u'$', u'\uff04').replace(u'.', u'\uff0e')
+
+
+def get_data_model(col):
+    """
+    Guess the data model of a raw collection, inspecting the fields of one of its documents
+
+    :param col: the raw collection
+    :return: the data model (one of the KEY_FIELDS keys) or None if the collection is empty
+    """
+
+    doc = col.find_one()
+    if doc is None:
+        return None
+
+    if 'entityId' in doc:
+        return 'collection-per-service-path'
+    elif 'attrName' in doc:
+        return 'collection-per-entity'
+    else:
+        return 'collection-per-attribute'
+
+
+def get_time_range(date_from, date_to, resolutions):
+    """
+    Get the recvTime condition for the raw data to read, extending the limits to complete origins of the coarsest
+    resolution
+
+    :param date_from: the start date (None if no start limit)
+    :param date_to: the end date (None if no end limit)
+    :param resolutions: the resolutions to rebuild
+    :return: the recvTime condition (None if there are no limits)
+    """
+
+    coarsest = max(resolutions, key=RESOLUTIONS_ORDER.index)
+    unit = RESOLUTIONS[coarsest][0]
+
+    condition = {}
+    if date_from is not None:
+        origin = np.datetime64(date_from, 'ms').astype('datetime64[%s]' % unit)
+        condition['$gte'] = ms_to_datetime(origin.astype('datetime64[ms]').astype(np.int64))
+    if date_to is not None:
+        next_origin = np.datetime64(date_to, 'ms').astype('datetime64[%s]' % unit) + 1
+        condition['$lt'] = ms_to_datetime(next_origin.astype('datetime64[ms]').astype(np.int64))
+
+    if len(condition) == 0:
+        return None
+    return condition
+
+
+def ms_to_datetime(ms):
+    """
+    :param ms: milliseconds since epoch
+    :return: the corresponding (naive, UTC) datetime
+    """
+
+    return EPOCH + timedelta(milliseconds=int(ms))
+
+
+class Bucket(object):
+    """
+    Aggregated data of an entity-attribute for a resolution and origin, i.e. the contents of one aggregated document
+    """
+
+    def __init__(self, resolution, numeric):
+        """
+        :param resolution: the resolution
+        :param numeric: True if the bucket is numeric, False if textual. As STH prepopulates the aggregated document
+                        depending on the first value, it is the type of the first value
+        """
+
+        n = RESOLUTIONS[resolution][2]
+        self.resolution = resolution
+        self.numeric = numeric
+        self.attr_type = None
+        self.samples = np.zeros(n, np.int64)
+        self.sum = np.zeros(n)
+        self.sum2 = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        self.has_numeric = np.zeros(n, np.bool_)
+        self.occur = [ None ] * n
+
+    def add(self, index, values, numeric, textual):
+        """
+        Add samples to the bucket
+
+        :param index: numpy array with the point index of each sample
+        :param values: numpy array with the numeric value of each sample (NaN for textual ones)
+        :param numeric: numpy boolean array telling which samples are numeric
+        :param textual: list of (point index, escaped value) pairs for the textual samples
+        """
+
+        np.add.at(self.samples, index, 1)
+
+        if numeric.any():
+            i = index[numeric]
+            v = values[numeric]
+            np.add.at(self.sum, i, v)
+            np.add.at(self.sum2, i, v * v)
+            np.minimum.at(self.min, i, v)
+            np.maximum.at(self.max, i, v)
+            self.has_numeric[i] = True
+
+        for (i, value) in textual:
+            if self.occur[i] is None:
+                self.occur[i] = {}
+            self.occur[i][value] = self.occur[i].get(value, 0) + 1
+
+    def get_points(self):
+        """
+        :return: the points array, in the same shape STH uses
+        """
+
+        first = RESOLUTIONS[self.resolution][3]
+        points = []
+        for i in range(len(self.samples)):
+            point = SON([ ('offset', i + first), ('samples', int(self.samples[i])) ])
+            if self.numeric:
+                point['sum'] = float(self.sum[i])
+                point['sum2'] = float(self.sum2[i])
+                point['min'] = float(self.min[i])
+                point['max'] = float(self.max[i])
+                if self.occur[i] is not None:
+                    point['occur'] = self.occur[i]
+            else:
+                point['occur'] = self.occur[i] or {}
+                if self.has_numeric[i]:
+                    point['sum'] = float(self.sum[i])
+                    point['sum2'] = float(self.sum2[i])
+                    point['min'] = float(self.min[i])
+                    point['max'] = float(self.max[i])
+            points.append(point)
+
+        return points
+
+
+class Aggregator(object):
+    """
+    Calculates the aggregated data from batches of raw documents ordered by recvTime. As raw documents are ordered, an
+    origin is complete once a later origin is found for the same resolution, so completed buckets are passed to a
+    callback and released, keeping memory bounded
+    """
+
+    def __init__(self, data_model, resolutions, on_complete, ignore_blank_spaces=True):
+        """
+        :param data_model: the data model of the raw collection
+        :param resolutions: the resolutions to aggregate
+        :param on_complete: function called with the entity-attribute key, resolution, origin (as datetime) and bucket
+                            of each completed bucket
+        :param ignore_blank_spaces: if True, whitespace-only values are not aggregated (as STH does with its
+                                    IGNORE_BLANK_SPACES setting)
+        """
+
+        self.key_fields = KEY_FIELDS[data_model]
+        self.resolutions = resolutions
+        self.on_complete = on_complete
+        self.ignore_blank_spaces = ignore_blank_spaces
+        # For each resolution: origin (as ms since epoch) -> entity-attribute key -> bucket
+        self.buckets = dict([ (r, {}) for r in resolutions ])
+        self.keys = {}
+        self.key_list = []
+
+    def get_key_id(self, doc):
+        """
+        :param doc: a raw document
+        :return: an integer identifying the entity-attribute of the document
+        """
+
+        key = tuple([ doc.get(f) for f in self.key_fields ])
+        key_id = self.keys.get(key)
+        if key_id is None:
+            key_id = len(self.key_list)
+            self.keys[key] = key_id
+            self.key_list.append(key)
+        return key_id
+
+    def add_batch(self, docs):
+        """
+        Aggregate a batch of raw documents, ordered by recvTime
+
+        :param docs: list of raw documents
+        """
+
+        # Values STH does not aggregate are skipped, with the same rule as isAggregatable() in
+        # sthNotificationHandler.js: falsy values (empty strings, 0 and NaN), non string nor number values and, if
+        # blank spaces are ignored, whitespace-only strings
+        accepted = []
+        numeric_values = []
+        for doc in docs:
+            value = doc.get('attrValue')
+            if isinstance(value, basestring):
+                if value == '' or (self.ignore_blank_spaces and value.strip() == ''):
+                    continue
+            elif isinstance(value, bool) or not isinstance(value, (int, long, float)):
+                continue
+            elif value == 0 or value != value:
+                continue
+            accepted.append(doc)
+            numeric_values.append(get_numeric_value(value))
+
+        if len(accepted) == 0:
+            return
+
+        times = np.array([ doc['recvTime'] for doc in accepted ], dtype='datetime64[ms]')
+        key_ids = np.array([ self.get_key_id(doc) for doc in accepted ], dtype=np.int64)
+        numeric = np.array([ v is not None for v in numeric_values ], dtype=np.bool_)
+        values = np.array([ np.nan if v is None else v for v in numeric_values ], dtype=np.float64)
+
+        for resolution in self.resolutions:
+            (origin_unit, offset_unit, n, first) = RESOLUTIONS[resolution]
+            origins = times.astype('datetime64[%s]' % origin_unit)
+            index = (times.astype('datetime64[%s]' % offset_unit) - origins).astype(np.int64)
+            origins_ms = origins.astype('datetime64[ms]').astype(np.int64)
+
+            # Stable sort, so samples keep their recvTime order inside each entity-attribute and origin
+            order = np.lexsort((origins_ms, key_ids))
+            sorted_keys = key_ids[order]
+            sorted_origins = origins_ms[order]
+            boundaries = np.flatnonzero((np.diff(sorted_keys) != 0) | (np.diff(sorted_origins) != 0)) + 1
+
+            for segment in np.split(order, boundaries):
+                key_id = key_ids[segment[0]]
+                origin = origins_ms[segment[0]]
+
+                by_key = self.buckets[resolution].setdefault(origin, {})
+                bucket = by_key.get(key_id)
+                if bucket is None:
+                    bucket = Bucket(resolution, numeric[segment[0]])
+                    by_key[key_id] = bucket
+
+                textual = [ (index[i], escape_value(accepted[i]['attrValue'])) for i in segment if not numeric[i] ]
+                bucket.add(index[segment], values[segment], numeric[segment], textual)
+                bucket.attr_type = accepted[segment[-1]].get('attrType')
+
+            # All the origins before the one of the last sample are complete
+            self.complete(resolution, origins_ms[-1])
+
+    def complete(self, resolution, limit=None):
+        """
+        Pass the completed buckets of a resolution to the callback and release them
+
+        :param resolution: the resolution
+        :param limit: origins (as ms since epoch) before this one are completed. If None, all origins are completed
+        """
+
+        for origin in sorted(self.buckets[resolution].keys()):
+            if limit is not None and origin >= limit:
+                break
+            for (key_id, bucket) in self.buckets[resolution].pop(origin).items():
+                self.on_complete(self.key_list[key_id], resolution, ms_to_datetime(origin), bucket)
+
+    def finish(self):
+        """
+        Complete all the pending buckets, once all the raw documents have been added
+        """
+
+        for resolution in self.resolutions:
+            self.complete(resolution)
+
+
+def get_aggr_id(key_fields, key, resolution, origin):
+    """
+    Get the _id of an aggregated document, with the same fields and order than the one STH generates in the upsert
+    with the condition returned by getAggregateUpdateCondition() in sthDatabase.js
+
+    :param key_fields: the fields identifying an entity-attribute in the data model
+    :param key: the values of the key fields
+    :param resolution: the resolution
+    :param origin: the origin
+    :return: the _id
+    """
+
+    return SON(zip(key_fields, key) + [ ('origin', origin), ('resolution', resolution) ])
+
+
+def get_aggr_doc(key_fields, key, resolution, origin, bucket):
+    """
+    :return: the aggregated document for a bucket, in the same shape STH uses
+    """
+
+    return SON([
+        ('_id', get_aggr_id(key_fields, key, resolution, origin)),
+        ('attrType', bucket.attr_type),
+        ('points', bucket.get_points())
+    ])
+
+
+def stream_raw_data(col, data_model, time_range, batch_size, on_batch):
+    """
+    Read the raw data in batches, ordered by recvTime
+
+    :param col: the raw collection
+    :param data_model: the data model of the raw collection
+    :param time_range: the recvTime condition (None for the whole collection)
+    :param batch_size: number of documents in each batch
+    :param on_batch: function called with each batch (a list of raw documents)
+    :return: the number of raw documents read
+    """
+
+    condition = {}
+    if time_range is not None:
+        condition['recvTime'] = time_range
+
+    projection = dict([ (f, 1) for f in KEY_FIELDS[data_model] + [ 'recvTime', 'attrType', 'attrValue' ] ])
+    projection['_id'] = 0
+
+    n = 0
+    batch = []
+    for doc in col.find(condition, projection).sort('recvTime', ASCENDING).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) == batch_size:
+            on_batch(batch)
+            n += len(batch)
+            batch = []
+
+    if len(batch) > 0:
+        on_batch(batch)
+        n += len(batch)
+
+    return n
+
+
+def main():
+    # Get CLI arguments
+    try:
+        opts, args = getopt(sys.argv[1:], 'u', ['mongoUri=', 'db=', 'col=', 'aggrCol=', 'resolutions=', 'from=', 'to=', 'batchSize=', 'ignoreBlankSpaces=', 'dryrun'])
+    except GetoptError:
+        usage_and_exit('wrong parameter')
+
+    # Defaults (to be changed by user CLI parameters)
+    mongo_uri = 'mongodb://localhost'
+    db = ''
+    col = ''
+    aggr_col = ''
+    resolutions = [ 'day', 'hour', 'minute' ]
+    date_from = None
+    date_to = None
+    batch_size = 10000
+    ignore_blank_spaces = True
+    dryrun = False
+
+    for opt, arg in opts:
+        if opt == '-u':
+            usage()
+            sys.exit(0)
+        elif opt == '--mongoUri':
+            mongo_uri = arg
+        elif opt == '--db':
+            db = arg
+        elif opt == '--col':
+            col = arg
+        elif opt == '--aggrCol':
+            aggr_col = arg
+        elif opt == '--resolutions':
+            resolutions = arg.split(',')
+            for r in resolutions:
+                if not r in RESOLUTIONS:
+                    usage_and_exit("--resolutions %s is not valid (valid values: 'second', 'minute', 'hour', 'day' and 'month')" % r)
+        elif opt in ['--from', '--to']:
+            try:
+                date = datetime.strptime(arg, '%Y-%m-%dT%H:%M:%S')
+            except ValueError:
+                usage_and_exit('%s value must be a date in YYYY-MM-DDTHH:MM:SS format' % opt)
+            if opt == '--from':
+                date_from = date
+            else:
+                date_to = date
+        elif opt == '--batchSize':
+            try:
+                batch_size = int(arg)
+                if not batch_size > 0:
+                    usage_and_exit('--batchSize value must be an integer greater than 0')
+            except ValueError:
+                usage_and_exit('--batchSize value must be an integer greater than 0')
+        elif opt == '--ignoreBlankSpaces':
+            if arg.lower() not in [ 'true', 'false' ]:
+                usage_and_exit("--ignoreBlankSpaces value must be 'true' or 'false'")
+            ignore_blank_spaces = arg.lower() == 'true'
+        elif opt == '--dryrun':
+            dryrun = True
+        else:
+            usage_and_exit('')
+
+    if db == '':
+        usage_and_exit('--db must be provided')
+    if col == '':
+        usage_and_exit('--col must be provided')
+    if aggr_col == '':
+        aggr_col = col + '.aggr'
+
+    client = MongoClient(mongo_uri)
+    raw = client[db][col]
+    aggr = client[db][aggr_col]
+
+    data_model = get_data_model(raw)
+    if data_model is None:
+        print '- Raw collection is empty, nothing to rebuild'
+        sys.exit(0)
+
+    time_range = get_time_range(date_from, date_to, resolutions)
+
+    print '- Rebuilding %s from %s' % (aggr_col, col)
+    print '  + Data model: %s' % data_model
+    print '  + Resolutions: %s' % ', '.join(resolutions)
+    if time_range is not None:
+        print '  + recvTime range: %s' % time_range
+
+    stats = { 'docs': 0, 'written': 0 }
+    ops = []
+
+    def on_complete(key, resolution, origin, bucket):
+        doc = get_aggr_doc(KEY_FIELDS[data_model], key, resolution, origin, bucket)
+        stats['docs'] += 1
+        if dryrun:
+            return
+        ops.append(ReplaceOne({ '_id': doc['_id'] }, doc, upsert=True))
+        if len(ops) == BULK_SIZE:
+            flush()
+
+    def flush():
+        result = aggr.bulk_write(ops, ordered=False)
+        stats['written'] += result.upserted_count + result.modified_count
+        del ops[:]
+
+    aggregator = Aggregator(data_model, resolutions, on_complete, ignore_blank_spaces)
+
+    start = time.time()
+    n = stream_raw_data(raw, data_model, time_range, batch_size, aggregator.add_batch)
+    aggregator.finish()
+    if len(ops) > 0:
+        flush()
+    elapsed = time.time() - start
+
+    rate = 0
+    if elapsed > 0:
+        rate = n / elapsed
+
+    print '- %d raw docs read in %.2f seconds (%.2f docs/s)' % (n, elapsed, rate)
+    if dryrun:
+        print '- %d aggregated docs would be written' % stats['docs']
+    else:
+        print '- %d aggregated docs calculated, %d written (inserted or modified)' % (stats['docs'], stats['written'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+# Copyright 2026 Telefonica Investigacion y Desarrollo, S.A.U
+#
+# This file is part of Short Time Historic (STH) component
+#
+# STH is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# STH is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with STH.
+# If not, see http://www.gnu.org/licenses/.
+#
+# For those usages not covered by this license please contact with
+# iot_support at tid dot es
+
+# NOTE: this script recalculates the aggregated points from the raw data (using the same calculation than
+# sth_aggr_rebuild.py, so it has to be in the same directory) and compares them with the ones stored in the aggregated
+# collection. Only the origins with raw data are checked, so raw data pruned or expired is not reported as mismatch.
+# Avoid checking (and specially repairing) the current origins while STH is receiving notifications for them: use
+# --to to leave them out.
+
+import sys
+import os
+import time
+from datetime import datetime
+from getopt import getopt, GetoptError
+
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+
+from sth_aggr_rebuild import RESOLUTIONS, KEY_FIELDS, BULK_SIZE, Aggregator, get_aggr_doc, get_data_model, get_time_range, stream_raw_data
+
+# Relative tolerance when comparing sums, as they are accumulated in different order
+TOLERANCE = 1e-9
+
+
+def usage():
+    """
+    Print usage message
+    """
+
+    print 'Usage: %s --mongoUri <uri> --db <database> --col <collection> --aggrCol <collection> --resolutions <list> --from <date> --to <date> --batchSize <n> --ignoreBlankSpaces <true|false> --repair --dryrun -u' % os.path.basename(__file__)
+    print ''
+    print 'Parameters:'
+    print "  --mongoUri <uri> (optional): mongo URI to connecto to DB. Default is 'mongodb://localhost'"
+    print "  --db <database>: database to use"
+    print "  --col <collection>: raw collection from which the aggregated data is recalculated"
+    print "  --aggrCol <collection> (optional): aggregated collection to verify. Default is <collection>.aggr"
+    print "  --resolutions <list> (optional): comma-separated list of resolutions to verify (second, minute, hour, day and month). Default is 'day,hour,minute'"
+    print "  --from <date> (optional): verify from this date (format: YYYY-MM-DDTHH:MM:SS, UTC). It is extended to the origin of the coarsest resolution"
+    print "  --to <date> (optional): verify up to this date (format: YYYY-MM-DDTHH:MM:SS, UTC). It is extended to the end of the origin of the coarsest resolution"
+    print "  --batchSize <n> (optional): number of raw documents recalculated in each batch. Default is 10000"
+    print "  --ignoreBlankSpaces <true|false> (optional): skip whitespace-only values, as STH does with its IGNORE_BLANK_SPACES setting. Default is true"
+    print "  --repair (optional): rewrite the mismatching points (or the whole document if it is missing or malformed)"
+    print "  --dryrun (optional): if used script does a dry-run pass (i.e. without doing any modification in DB), even if --repair is used"
+    print "  -u, print this usage mesage"
+
+
+def usage_and_exit(msg):
+    """
+    Print usage message and exit"
+
+    :param msg: optional error message to print
+    """
+
+    if msg != '':
+        print "ERROR: " + msg
+        print
+
+    usage()
+    sys.exit(1)
+
+
+def same_number(a, b):
+    """
+    :return: True if both numbers are equal (with TOLERANCE relative tolerance), False otherwise
+    """
+
+    if a == b:
+        return True
+    if a is None or b is None:
+        return False
+
+    return abs(a - b) <= TOLERANCE * max(1.0, abs(a), abs(b))
+
+
+def same_occur(a, b):
+    """
+    :return: True if both occur maps are equal, ignoring zero counters (undoing an aggregated value leaves them)
+    """
+
+    a = dict([ (k, v) for (k, v) in (a or {}).items() if v != 0 ])
+    b = dict([ (k, v) for (k, v) in (b or {}).items() if v != 0 ])
+    return a == b
+
+
+def compare_point(expected, stored):
+    """
+    Compare an expected point with the stored one
+
+    :param expected: the expected point, as recalculated from the raw data
+    :param stored: the stored point
+    :return: a list of differences (empty if the points match)
+    """
+
+    diffs = []
+    for field in [ 'offset', 'samples', 'sum', 'sum2' ]:
+        if field in expected and not same_number(expected[field], stored.get(field)):
+            diffs.append('%s expected %s found %s' % (field, expected[field], stored.get(field)))
+
+    # min and max are meaningless (and not restored when undoing an aggregated value) in points without samples
+    if expected['samples'] > 0:
+        for field in [ 'min', 'max' ]:
+            if field in expected and not same_number(expected[field], stored.get(field)):
+                diffs.append('%s expected %s found %s' % (field, expected[field], stored.get(field)))
+
+    if 'occur' in expected and not same_occur(expected['occur'], stored.get('occur')):
+        diffs.append('occur expected %s found %s' % (expected['occur'], stored.get('occur')))
+
+    return diffs
+
+
+class Verifier(object):
+    """
+    Compares the recalculated aggregated documents with the stored ones, in batches of BULK_SIZE documents, optionally
+    repairing the mismatching points
+    """
+
+    def __init__(self, aggr, key_fields, repair):
+        """
+        :param aggr: the aggregated collection
+        :param key_fields: the fields identifying an entity-attribute in the data model
+        :param repair: if True the mismatching points are rewritten
+        """
+
+        self.aggr = aggr
+        self.key_fields = key_fields
+        self.repair = repair
+        self.pending = []
+        self.stats = { 'docs': 0, 'missing': 0, 'mismatching': 0, 'points': 0, 'repaired': 0 }
+
+    def get_id_key(self, _id):
+        """
+        :param _id: the _id of an aggregated document
+        :return: a hashable representation of the _id
+        """
+
+        return tuple([ _id.get(f) for f in self.key_fields + [ 'origin', 'resolution' ] ])
+
+    def on_complete(self, key, resolution, origin, bucket):
+        """
+        Aggregator callback, called with each recalculated bucket
+        """
+
+        self.pending.append(get_aggr_doc(self.key_fields, key, resolution, origin, bucket))
+        if len(self.pending) == BULK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Compare the pending recalculated documents with the stored ones
+        """
+
+        if len(self.pending) == 0:
+            return
+
+        stored = {}
+        for doc in self.aggr.find({ '_id': { '$in': [ doc['_id'] for doc in self.pending ] } }):
+            stored[self.get_id_key(doc['_id'])] = doc
+
+        ops = []
+        for expected in self.pending:
+            self.stats['docs'] += 1
+            _id = expected['_id']
+            doc = stored.get(self.get_id_key(_id))
+
+            if doc is None:
+                print '- %s: missing document' % dict(_id)
+                self.stats['missing'] += 1
+                ops.append(ReplaceOne({ '_id': _id }, expected, upsert=True))
+                continue
+
+            points = doc.get('points', [])
+            if len(points) != len(expected['points']):
+                print '- %s: %d points expected, %d found' % (dict(_id), len(expected['points']), len(points))
+                self.stats['mismatching'] += 1
+                ops.append(ReplaceOne({ '_id': _id }, expected))
+                continue
+
+            updates = {}
+            for i in range(len(points)):
+                diffs = compare_point(expected['points'][i], points[i])
+                if len(diffs) > 0:
+                    print '- %s: offset %d: %s' % (dict(_id), expected['points'][i]['offset'], ', '.join(diffs))
+                    updates['points.%d' % i] = expected['points'][i]
+            if len(updates) > 0:
+                self.stats['mismatching'] += 1
+                self.stats['points'] += len(updates)
+                ops.append(UpdateOne({ '_id': _id }, { '$set': updates }))
+
+        if self.repair and len(ops) > 0:
+            self.aggr.bulk_write(ops, ordered=False)
+            self.stats['repaired'] += len(ops)
+
+        self.pending = []
+
+
+def main():
+    # Get CLI arguments
+    try:
+        opts, args = getopt(sys.argv[1:], 'u', ['mongoUri=', 'db=', 'col=', 'aggrCol=', 'resolutions=', 'from=', 'to=', 'batchSize=', 'ignoreBlankSpaces=', 'repair', 'dryrun'])
+    except GetoptError:
+        usage_and_exit('wrong parameter')
+
+    # Defaults (to be changed by user CLI parameters)
+    mongo_uri = 'mongodb://localhost'
+    db = ''
+    col = ''
+    aggr_col = ''
+    resolutions = [ 'day', 'hour', 'minute' ]
+    date_from = None
+    date_to = None
+    batch_size = 10000
+    ignore_blank_spaces = True
+    repair = False
+    dryrun = False
+
+    for opt, arg in opts:
+        if opt == '-u':
+            usage()
+            sys.exit(0)
+        elif opt == '--mongoUri':
+            mongo_uri = arg
+        elif opt == '--db':
+            db = arg
+        elif opt == '--col':
+            col = arg
+        elif opt == '--aggrCol':
+            aggr_col = arg
+        elif opt == '--resolutions':
+            resolutions = arg.split(',')
+            for r in resolutions:
+                if not r in RESOLUTIONS:
+                    usage_and_exit("--resolutions %s is not valid (valid values: 'second', 'minute', 'hour', 'day' and 'month')" % r)
+        elif opt in ['--from', '--to']:
+            try:
+                date = datetime.strptime(arg, '%Y-%m-%dT%H:%M:%S')
+            except ValueError:
+                usage_and_exit('%s value must be a date in YYYY-MM-DDTHH:MM:SS format' % opt)
+            if opt == '--from':
+                date_from = date
+            else:
+                date_to = date
+        elif opt == '--batchSize':
+            try:
+                batch_size = int(arg)
+                if not batch_size > 0:
+                    usage_and_exit('--batchSize value must be an integer greater than 0')
+            except ValueError:
+                usage_and_exit('--batchSize value must be an integer greater than 0')
+        elif opt == '--ignoreBlankSpaces':
+            if arg.lower() not in [ 'true', 'false' ]:
+                usage_and_exit("--ignoreBlankSpaces value must be 'true' or 'false'")
+            ignore_blank_spaces = arg.lower() == 'true'
+        elif opt == '--repair':
+            repair = True
+        elif opt == '--dryrun':
+            dryrun = True
+        else:
+            usage_and_exit('')
+
+    if db == '':
+        usage_and_exit('--db must be provided')
+    if col == '':
+        usage_and_exit('--col must be provided')
+    if aggr_col == '':
+        aggr_col = col + '.aggr'
+
+    client = MongoClient(mongo_uri)
+    raw = client[db][col]
+    aggr = client[db][aggr_col]
+
+    data_model = get_data_model(raw)
+    if data_model is None:
+        print '- Raw collection is empty, nothing to verify'
+        sys.exit(0)
+
+    verifier = Verifier(aggr, KEY_FIELDS[data_model], repair and not dryrun)
+    aggregator = Aggregator(data_model, resolutions, verifier.on_complete, ignore_blank_spaces)
+
+    start = time.time()
+    n = stream_raw_data(raw, data_model, get_time_range(date_from, date_to, resolutions), batch_size, aggregator.add_batch)
+    aggregator.finish()
+    verifier.flush()
+
+    stats = verifier.stats
+    print '* Summary:'
+    print '  + Raw docs read: %d' % n
+    print '  + Aggregated docs checked: %d' % stats['docs']
+    print '  + Missing docs: %d' % stats['missing']
+    print '  + Mismatching docs: %d (%d points)' % (stats['mismatching'], stats['points'])
+    print '  + Repaired docs: %d' % stats['repaired']
+    print '  + Elapsed: %.2f seconds' % (time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
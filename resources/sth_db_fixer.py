@@ -37,29 +37,224 @@ __author__ = 'fermin'
 import json
 import sys
 import os
+import time
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from multiprocessing.pool import ThreadPool
 from getopt import getopt, GetoptError
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, DeleteOne, DeleteMany, ASCENDING, DESCENDING
 
 def usage():
     """
     Print usage message
     """
 
-    print 'Usage: %s --mongoUri <uri> --db <database> --col <collection> --colType <type> --createIndex --prune <n> --setExpiration <seconds> --dryrun -u' % os.path.basename(__file__)
+    print 'Usage: %s --mongoUri <uri> --db <database> --col <collection> --colType <type> --createIndex --prune <n> --singlePass --batchSize <n> --olderThan <seconds> --pause <ms> --workers <n> --maxOpsPerSecond <n> --maxLag <seconds> --checkpoint <file> --resume --allDatabases --dbPrefix <prefix> --colPrefix <prefix> --parallelCollections <n> --stats <file> --indexAdvisor --fixIndexes --setExpiration <seconds> --dryrun -u' % os.path.basename(__file__)
     print ''
     print 'Parameters:'
     print "  --mongoUri <uri> (optional): mongo URI to connecto to DB. Default is 'mongodb://localhost'"
-    print "  --db <database>: database to use"
-    print "  --col <collection>: collection to use"
-    print "  --colType <type>: collection type (either 'raw' or 'aggr')"
+    print "  --db <database>: database to use (not needed with --allDatabases)"
+    print "  --col <collection>: collection to use (not needed with --allDatabases)"
+    print "  --colType <type>: collection type (either 'raw' or 'aggr', not needed with --allDatabases)"
     print "  --createIndex (optional): create index for optimal performance (the ones described in https://github.com/telefonicaid/fiware-sth-comet/blob/master/resources/README.md)"
     print "  --setExpiration <seconds> (optional): set expiration in raw and agg collections to <seconds> seconds"
     print "  --overrideExpiration (optional): override the value of the expiration index in the case there is already one with a different value of the one specified in --setExpiration"
-    print "  --prune <n> (optional): prune collection so only the last <n> elements per attribute and entity are kept (only for raw collections)"
+    print "  --prune <n> (optional): prune collection so only the last <n> elements per attribute and entity are kept (in aggr collections, the last <n> origins per attribute, entity and resolution)"
+    print "  --singlePass (optional): use with --prune to calculate the documents to remove in just one server-side aggregation and delete them in bulk batches (requires MongoDB 5.0 or above)"
+    print "  --batchSize <n> (optional): number of documents deleted in each bulk operation when --singlePass or --olderThan are used. Default is 1000"
+    print "  --olderThan <seconds> (optional): remove all the samples older than <seconds> seconds (by recvTime in raw collections and by origin in aggr collections), in chunks of --batchSize documents"
+    print "  --pause <ms> (optional): pause in milliseconds between chunks when --olderThan is used. Default is 0"
+    print "  --workers <n> (optional): number of concurrent workers pruning disjoint entity-attribute groups with --prune. Default is 1"
+    print "  --maxOpsPerSecond <n> (optional): global ceiling of DB operations per second, shared by all the workers. Default is 0 (no limit)"
+    print "  --maxLag <seconds> (optional): maximum replication lag of the secondaries. Over it, prune and expiration operations are slowed down and index creations are delayed until the lag recovers. Default is 0 (no replication lag checking)"
+    print "  --checkpoint <file> (optional): file in which the done tasks (pruned entity-attribute groups and created indexes) are recorded"
+    print "  --resume (optional): resume an interrupted run, skipping the tasks already recorded in the --checkpoint file"
+    print "  --allDatabases (optional): process all the collections in all the STH databases, instead of the one in --db and --col. Collection type is guessed from its name"
+    print "  --dbPrefix <prefix> (optional): prefix of the STH databases to process with --allDatabases (it implies --allDatabases). Default is 'sth_'"
+    print "  --colPrefix <prefix> (optional): prefix of the STH collections to process with --allDatabases (it implies --allDatabases). Default is 'sth_'"
+    print "  --parallelCollections <n> (optional): number of collections processed concurrently with --allDatabases. Default is 4"
+    print "  --indexAdvisor (optional): guess the data model of the collection and report missing, redundant and unused indexes (along with their sizes) according to the queries STH does in that data model"
+    print "  --fixIndexes (optional): use with --indexAdvisor to create the missing indexes and drop the redundant ones (unused indexes are only reported)"
+    print "  --stats <file> (optional): write collection statistics (data and index sizes, samples per attribute, time span, etc.) in JSON format to <file>. If --prune is used, it includes an estimation of what it would free"
     print "  --dryrun (optional): if used script does a dry-run pass (i.e. without doing any modification in DB). It can be used to inspect indexes."
     print "  -u, print this usage mesage"
 
 
+class Throttle(object):
+    """
+    Global ceiling of DB operations per second, shared by all the workers. Optionally, the replication lag of the
+    replica set is polled and, when it is over a threshold, the operation rate is halved until the lag recovers.
+    Then the rate is progressively restored
+    """
+
+    # Seconds between replication lag checks
+    LAG_CHECK_INTERVAL = 5
+
+    # Limits of the interval between operations when backing off due to replication lag
+    MIN_BACKOFF_INTERVAL = 0.01
+    MAX_BACKOFF_INTERVAL = 10
+
+    def __init__(self, max_ops, max_lag=0, client=None):
+        """
+        :param max_ops: maximum number of operations per second (0 means no limit)
+        :param max_lag: maximum replication lag in seconds before backing off (0 means no replication lag checking)
+        :param client: the MongoClient to use to check the replication lag
+        """
+
+        self.base_interval = 0
+        if max_ops > 0:
+            self.base_interval = 1.0 / max_ops
+        self.interval = self.base_interval
+        self.max_lag = max_lag
+        self.client = client
+        self.last_check = 0
+        self.next_time = time.time()
+        self.lock = threading.Lock()
+
+    def get_replication_lag(self):
+        """
+        :return: the replication lag in seconds of the most delayed secondary regarding the primary
+        """
+
+        status = self.client.admin.command('replSetGetStatus')
+        primary = None
+        secondaries = []
+        for member in status['members']:
+            if member['stateStr'] == 'PRIMARY':
+                primary = member['optimeDate']
+            elif member['stateStr'] == 'SECONDARY':
+                secondaries.append(member['optimeDate'])
+
+        if primary is None or len(secondaries) == 0:
+            return 0
+
+        return max(0, (primary - min(secondaries)).total_seconds())
+
+    def check_lag(self):
+        """
+        Check the replication lag (no more than once each LAG_CHECK_INTERVAL seconds) and adjust the interval between
+        operations accordingly. It has to be called with the lock acquired.
+
+        :return: True if the replication lag is over the threshold, False otherwise
+        """
+
+        now = time.time()
+        if self.max_lag == 0 or now - self.last_check < self.LAG_CHECK_INTERVAL:
+            return self.interval > self.base_interval
+        self.last_check = now
+
+        try:
+            lag = self.get_replication_lag()
+        except Exception as e:
+            sys.stderr.write('WARNING: replication lag cannot be checked (%s), --maxLag is ignored\n' % str(e))
+            self.max_lag = 0
+            self.interval = self.base_interval
+            return False
+
+        if lag > self.max_lag:
+            self.interval = min(max(self.interval * 2, self.MIN_BACKOFF_INTERVAL), self.MAX_BACKOFF_INTERVAL)
+            sys.stderr.write('WARNING: replication lag %.1f seconds, slowing down to %.2f ops/s\n' % (lag, 1 / self.interval))
+            return True
+
+        if self.interval > self.base_interval:
+            self.interval /= 2
+            if self.interval < max(self.base_interval, self.MIN_BACKOFF_INTERVAL):
+                self.interval = self.base_interval
+
+        return False
+
+    def wait(self):
+        """
+        Block the caller until a new operation can be done without exceeding the ceiling
+        """
+
+        if self.base_interval == 0 and self.max_lag == 0:
+            return
+
+        with self.lock:
+            self.check_lag()
+            if self.interval == 0:
+                return
+            now = time.time()
+            if self.next_time < now:
+                self.next_time = now
+            delay = self.next_time - now
+            self.next_time += self.interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def wait_for_lag(self):
+        """
+        Block the caller until the replication lag is under the threshold. It is used before operations which cannot be
+        split in smaller ones, such as index creation
+        """
+
+        while True:
+            with self.lock:
+                self.last_check = 0
+                lagging = self.check_lag()
+            if not lagging:
+                return
+            time.sleep(self.LAG_CHECK_INTERVAL)
+
+
+class Checkpoint(object):
+    """
+    Checkpoint file recording the tasks already done (one JSON line per task), so an interrupted run can be resumed
+    skipping them
+    """
+
+    def __init__(self, path, resume):
+        """
+        :param path: path of the checkpoint file (None to disable checkpointing)
+        :param resume: if True the tasks in the existing file are loaded as done and new ones are appended to it, if
+                       False the file is truncated
+        """
+
+        self.done = set()
+        self.lock = threading.Lock()
+        self.f = None
+
+        if path is None:
+            return
+
+        if resume and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    # An incomplete last line (e.g. the process was killed while writing it) just doesn't match any task
+                    self.done.add(line.strip())
+
+        if resume:
+            self.f = open(path, 'a')
+        else:
+            self.f = open(path, 'w')
+
+    def is_done(self, *task):
+        """
+        :param task: the task identification (e.g. database, collection, operation, entity id, entity type, attribute)
+        :return: True if the task is recorded as done, False otherwise
+        """
+
+        return json.dumps(task) in self.done
+
+    def mark_done(self, *task):
+        """
+        Record a task as done, ensuring it is written to disk before returning
+
+        :param task: the task identification (e.g. database, collection, operation, entity id, entity type, attribute)
+        """
+
+        if self.f is None:
+            return
+
+        with self.lock:
+            self.f.write(json.dumps(task) + '\n')
+            self.f.flush()
+            os.fsync(self.f.fileno())
+
+
 def usage_and_exit(msg):
     """
     Print usage message and exit"
@@ -75,10 +270,11 @@ def usage_and_exit(msg):
     sys.exit(1)
 
 
-def get_info(entityId, entityType, attrName):
+def get_info(col, entityId, entityType, attrName):
     """
     Get info related with the entity and attribute provided as argument
 
+    :param col: the collection to use
     :param entityId: the entity id
     :param entityType: the entity type
     :param attrName: the attribute name
@@ -86,7 +282,8 @@ def get_info(entityId, entityType, attrName):
             (ordered by increasing recvTime)
     """
 
-    cursor = client[DB][COL].find({'entityId': entityId, 'entityType': entityType, 'attrName': attrName}).sort('recvTime', DESCENDING)
+    THROTTLE.wait()
+    cursor = col.find({'entityId': entityId, 'entityType': entityType, 'attrName': attrName}).sort('recvTime', DESCENDING)
 
     total = cursor.count()
     first = cursor[0]
@@ -98,10 +295,11 @@ def get_info(entityId, entityType, attrName):
     return (total, first['recvTime'], last['recvTime'])
 
 
-def prune(entityId, entityType, attrName, last_time):
+def prune(col, entityId, entityType, attrName, last_time):
     """
     Remove all samples associated to a given entity and attribute except the N first one (ordered by recvTime)
 
+    :param col: the collection to use
     :param entityId: the entity id
     :param entityType: the entity type
     :param attrName: the attribute name
@@ -110,33 +308,319 @@ def prune(entityId, entityType, attrName, last_time):
     """
 
     # First pass, removes the most of the documents
-    result = client[DB][COL].delete_many({'entityId': entityId, 'entityType': entityType, 'attrName': attrName, 'recvTime': {'$lt': last_time}})
+    THROTTLE.wait()
+    result = col.delete_many({'entityId': entityId, 'entityType': entityType, 'attrName': attrName, 'recvTime': {'$lt': last_time}})
     deleted = result.deleted_count
 
     # Some times there are "ties" and the $lt filter doesn't removes all the documents. Thus, we need to do a second pass to ensure only N remain
-    for doc in client[DB][COL].find({'entityId': entityId, 'entityType': entityType, 'attrName': attrName}).sort('recvTime', DESCENDING).skip(N):
-        client[DB][COL].remove(doc)
+    THROTTLE.wait()
+    for doc in col.find({'entityId': entityId, 'entityType': entityType, 'attrName': attrName}).sort('recvTime', DESCENDING).skip(N):
+        THROTTLE.wait()
+        col.remove(doc)
         deleted += 1
 
     return deleted
 
 
-def getRelevantIndexesRaw():
+def get_prune_pipeline(col_type):
+    """
+    Get the aggregation pipeline which returns the documents to remove, i.e. all except the N first ones (ordered by
+    decreasing recvTime) for each entity and attribute in raw collections or all except the N first ones (ordered by
+    decreasing origin) for each entity, attribute and resolution in aggr collections
+
+    :param col_type: collection type (either 'raw' or 'aggr')
+    :return: the aggregation pipeline
+    """
+
+    if col_type == 'raw':
+        partition = { 'entityId': '$entityId', 'entityType': '$entityType', 'attrName': '$attrName' }
+        sort = { 'recvTime': -1 }
+    else:
+        partition = { 'entityId': '$_id.entityId', 'entityType': '$_id.entityType', 'attrName': '$_id.attrName', 'resolution': '$_id.resolution' }
+        sort = { '_id.origin': -1 }
+
+    return [
+        {
+            '$setWindowFields': {
+                'partitionBy': partition,
+                'sortBy': sort,
+                'output': { 'position': { '$documentNumber': {} } }
+            }
+        },
+        { '$match': { 'position': { '$gt': N } } },
+        { '$project': { '_id': 1 } }
+    ]
+
+
+def delete_batch(col, ids):
+    """
+    Remove the documents with the given ids in just one bulk operation
+
+    :param col: the collection to use
+    :param ids: list of document ids to remove
+    :return: the number of deleted documents
+    """
+
+    THROTTLE.wait()
+    result = col.bulk_write([DeleteOne({'_id': id}) for id in ids], ordered=False)
+    return result.deleted_count
+
+
+def prune_single_pass(col, col_type):
+    """
+    Remove all samples except the N first ones (ordered by recvTime) for all the entities and attributes in the
+    collection (or all origins except the N first ones for all the entities, attributes and resolutions in aggr
+    collections). The documents to remove are calculated in the DB server in just one aggregation and they are deleted
+    in bulk operations of BATCH_SIZE documents. In dryrun mode no document is deleted.
+
+    :param col: the collection to use
+    :param col_type: collection type (either 'raw' or 'aggr')
+    :return: a triple with number of documents to remove, number of deleted documents and elapsed time in seconds
+    """
+
+    start = time.time()
+    candidates = 0
+    deleted = 0
+    batch = []
+    for doc in col.aggregate(get_prune_pipeline(col_type), allowDiskUse=True):
+        candidates += 1
+        if DRYRUN:
+            continue
+
+        batch.append(doc['_id'])
+        if len(batch) == BATCH_SIZE:
+            deleted += delete_batch(col, batch)
+            batch = []
+
+    if len(batch) > 0:
+        deleted += delete_batch(col, batch)
+
+    return (candidates, deleted, time.time() - start)
+
+
+def get_aggr_cutoff(col, doc):
+    """
+    Get the cut-off origin for an entity, attribute and resolution in aggr collection, i.e. the origin of the N-th
+    document (ordered by decreasing origin). It uses the {_id.entityId: 1, _id.entityType: 1, _id.attrName: 1,
+    _id.resolution: 1, _id.origin: 1} index.
+
+    :param col: the collection to use
+    :param doc: a document resulting of the $group aggregation in the aggr collection
+    :return: a 4-uple with the $group document, the find condition of the group, the cut-off origin (None if the group
+             is under limit or it was already done in a previous run) and a flag telling if the group was already done
+             in a previous run
+    """
+
+    g = doc['_id']
+    condition = {
+        '_id.entityId': g.get('entityId'),
+        '_id.entityType': g.get('entityType'),
+        '_id.attrName': g.get('attrName'),
+        '_id.resolution': g.get('resolution')
+    }
+
+    if CHECKPOINT.is_done(col.database.name, col.name, 'prune', g.get('entityId'), g.get('entityType'), g.get('attrName'), g.get('resolution')):
+        return (doc, condition, None, True)
+
+    cutoff = None
+    if doc['count'] > N:
+        THROTTLE.wait()
+        for d in col.find(condition, {'_id.origin': 1}).sort('_id.origin', DESCENDING).skip(N - 1).limit(1):
+            cutoff = d['_id']['origin']
+
+    return (doc, condition, cutoff, False)
+
+
+def delete_aggr_batch(col, batch):
+    """
+    Remove the documents older than the cut-off origin of several entity-attribute-resolution groups in just one
+    bulk operation, recording the groups as done in the checkpoint
+
+    :param col: the collection to use
+    :param batch: list of pairs with the find condition of a group and its cut-off origin
+    :return: the number of deleted documents
+    """
+
+    ops = []
+    for (condition, cutoff) in batch:
+        ops.append(DeleteMany(dict(condition, **{ '_id.origin': { '$lt': cutoff } })))
+
+    THROTTLE.wait()
+    result = col.bulk_write(ops, ordered=False)
+
+    for (condition, cutoff) in batch:
+        CHECKPOINT.mark_done(col.database.name, col.name, 'prune', condition['_id.entityId'], condition['_id.entityType'], condition['_id.attrName'], condition['_id.resolution'])
+
+    return result.deleted_count
+
+
+def prune_aggr(col, out):
+    """
+    Remove all origins except the N first ones (ordered by decreasing origin) for all the entities, attributes and
+    resolutions in aggr collection. As origins are unique in each group, the documents to remove in each group are
+    the ones older than its cut-off origin. Deletions of BATCH_SIZE groups are sent in just one bulk operation. In
+    dryrun mode no document is deleted.
+
+    :param col: the collection to use
+    :param out: function to call with each line of the processing report
+    :return: the number of deleted documents
+    """
+
+    pipeline = [
+        {
+            '$group' : {
+                '_id' : { 'entityId': '$_id.entityId', 'entityType': '$_id.entityType', 'attrName': '$_id.attrName', 'resolution': '$_id.resolution' },
+                'count': { '$sum': 1 }
+            }
+        },
+        { '$sort' : { 'count': -1 } }
+    ]
+
+    THROTTLE.wait()
+    groups = col.aggregate(pipeline, allowDiskUse=True)
+
+    pool = None
+    if WORKERS > 1:
+        # Each group is processed by only one worker, so workers calculate cut-offs of disjoint sets of documents
+        pool = ThreadPool(WORKERS)
+        results = pool.imap_unordered(partial(get_aggr_cutoff, col), groups)
+    else:
+        results = (get_aggr_cutoff(col, doc) for doc in groups)
+
+    deleted = 0
+    batch = []
+    for (doc, condition, cutoff, done) in results:
+        g = doc['_id']
+        header = '- %s:%s - %s - %s (%d)' % (g.get('entityId'), g.get('entityType'), g.get('attrName'), g.get('resolution'), doc['count'])
+        if done:
+            out('%s: already done in a previous run' % header)
+        elif cutoff is None:
+            out('%s: under limit' % header)
+        elif DRYRUN:
+            out('%s: cut-off origin=%s, %d docs would be removed' % (header, cutoff, doc['count'] - N))
+        else:
+            out('%s: cut-off origin=%s, %d docs to remove' % (header, cutoff, doc['count'] - N))
+            batch.append((condition, cutoff))
+            if len(batch) == BATCH_SIZE:
+                deleted += delete_aggr_batch(col, batch)
+                batch = []
+
+    if len(batch) > 0:
+        deleted += delete_aggr_batch(col, batch)
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    return deleted
+
+
+def remove_older_than(col, col_type, out):
+    """
+    Remove all samples older than OLDER_THAN seconds, in chunks of BATCH_SIZE documents pausing PAUSE seconds between
+    chunks, so the oplog is not flooded and the secondaries are not stalled. Each chunk is selected using the
+    expiration index ({recvTime: 1} in raw collections, {_id.origin: 1} in aggr collections). Note that in aggr
+    collections the cut-off applies to the origin, so a document is removed only if its origin is older than the limit.
+    In dryrun mode no document is deleted.
+
+    :param col: the collection to use
+    :param col_type: collection type (either 'raw' or 'aggr')
+    :param out: function to call with each line of the processing report
+    :return: the number of deleted documents (or the number of documents to remove in dryrun mode)
+    """
+
+    if col_type == 'raw':
+        field = 'recvTime'
+    else:
+        field = '_id.origin'
+
+    limit = datetime.utcnow() - timedelta(seconds=OLDER_THAN)
+    condition = { field: { '$lt': limit } }
+
+    if DRYRUN:
+        THROTTLE.wait()
+        candidates = col.count(condition)
+        out('- %d docs older than %s would be removed' % (candidates, limit))
+        return candidates
+
+    start = time.time()
+    deleted = 0
+    while True:
+        THROTTLE.wait()
+        ids = [ doc['_id'] for doc in col.find(condition, {'_id': 1}).sort(field, ASCENDING).limit(BATCH_SIZE) ]
+        if len(ids) == 0:
+            break
+
+        n = delete_batch(col, ids)
+        deleted += n
+
+        elapsed = time.time() - start
+        rate = 0
+        if elapsed > 0:
+            rate = deleted / elapsed
+        out('  + %d docs older than %s removed so far (%.2f docs/s)' % (deleted, limit, rate))
+
+        if len(ids) < BATCH_SIZE:
+            break
+        if PAUSE > 0:
+            time.sleep(PAUSE)
+
+    out('- %d docs older than %s removed in %.2f seconds' % (deleted, limit, time.time() - start))
+    return deleted
+
+
+def process_group(col, doc):
+    """
+    Process (i.e. prune or inspect in dryrun mode) the samples associated to a given entity and attribute
+
+    :param col: the collection to use
+    :param doc: a document resulting of the $group aggregation in the raw collection
+    :return: a pair with a text line with the processing result and the number of deleted documents
+    """
+
+    entityId = doc['_id']['entityId']
+    entityType = doc['_id']['entityType']
+    attrName =  doc['_id']['attrName']
+
+    if CHECKPOINT.is_done(col.database.name, col.name, 'prune', entityId, entityType, attrName):
+        return ('- %s:%s - %s: already done in a previous run' % (entityId, entityType, attrName), 0)
+
+    (total, first_time, last_time) = get_info(col, entityId, entityType, attrName)
+
+    if DRYRUN:
+        return ('- %s:%s - %s (%d): first=%s, last=%s' % (entityId, entityType, attrName, total, first_time, last_time), 0)
+
+    deleted = 0
+    if total > N:
+        deleted = prune(col, entityId, entityType, attrName, last_time)
+        info = '%d docs removed' % deleted
+    else:
+        info = 'under limit'
+
+    CHECKPOINT.mark_done(col.database.name, col.name, 'prune', entityId, entityType, attrName)
+
+    return ('- %s:%s - %s (%d): first=%s, last=%s - %s' % (entityId, entityType, attrName, total, first_time, last_time, info), deleted)
+
+
+def getRelevantIndexesRaw(col):
     """
     Get relevant indexes in raw collection
 
+    :param col: the collection to use
     :return: a 3-uple with: total number of indexes found, optimization index (None if not found), expiration index (None if not found)
     """
 
     index0 = None
     index1 = None
     n = 0
-    for index in client[DB][COL].list_indexes():
+    for index in col.list_indexes():
         n += 1
         keys = index['key'].keys()
         
-        if (len(keys) == 4 and keys[0] == 'entityId' and keys[1] == 'entityType' and keys[2] == 'attrName' and keys[3] == 'recvTime' and
-           index['key']['entityId'] == 1 and index['key']['entityType'] == 1 and index['key']['attrName'] == 1 and index['key']['recvTime'] == 1):
+        # The index may include the _id after the recvTime, which sorts the raw data pages with the same recvTime
+        if (len(keys) >= 4 and keys[0] == 'entityId' and keys[1] == 'entityType' and keys[2] == 'attrName' and keys[3] == 'recvTime' and
+           index['key']['entityId'] == 1 and index['key']['entityType'] == 1 and index['key']['attrName'] == 1 and index['key']['recvTime'] == 1 and
+           (len(keys) == 4 or (len(keys) == 5 and keys[4] == '_id' and index['key']['_id'] == 1))):
             index0 = index
        
         if len(keys) == 1 and keys[0] == 'recvTime' and index['key']['recvTime'] == 1:
@@ -145,17 +629,18 @@ def getRelevantIndexesRaw():
     return (n, index0, index1)
 
 
-def getRelevantIndexesAggr():
+def getRelevantIndexesAggr(col):
     """
     Get relevant indexes in aggrs collection
 
+    :param col: the collection to use
     :return: a list of two elements (first the one for optimal queries, second the one for expiration). An element of the list can be None if the index is not found.
     """
 
     index0 = None
     index1 = None
     n = 0
-    for index in client[DB][COL].list_indexes():
+    for index in col.list_indexes():
         n += 1
         keys = index['key'].keys()
         
@@ -169,54 +654,70 @@ def getRelevantIndexesAggr():
     return (n, index0, index1)
 
 
-def createIndexRaw():
+def createIndexRaw(col, out):
     """
     Create index in raw collection
+
+    :param col: the collection to use
+    :param out: function to call with each line of the processing report
     """
 
-    index = [ ('entityId', ASCENDING), ('entityType', ASCENDING), ('attrName', ASCENDING), ('recvTime', ASCENDING) ]
-    print '- Creating index in raw collection: %s. Please wait, this operation may take a while...' % index_as_json_text(index)
-    client[DB][COL].create_index(index, background=True)
+    index = [ ('entityId', ASCENDING), ('entityType', ASCENDING), ('attrName', ASCENDING), ('recvTime', ASCENDING), ('_id', ASCENDING) ]
+    out('- Creating index in raw collection: %s. Please wait, this operation may take a while...' % index_as_json_text(index))
+    THROTTLE.wait_for_lag()
+    col.create_index(index, background=True)
 
 
-def createIndexAggr():
+def createIndexAggr(col, out):
     """
     Create index in aggr collection
+
+    :param col: the collection to use
+    :param out: function to call with each line of the processing report
     """
     
     index = [ ('_id.entityId', ASCENDING), ('_id.entityType', ASCENDING), ('_id.attrName', ASCENDING), ('_id.resolution', ASCENDING), ('_id.origin', ASCENDING) ]
-    print '- Creating index in aggr collection: %s. Please wait, this operation may take a while...' % index_as_json_text(index)
-    client[DB][COL].create_index(index, background=True)
+    out('- Creating index in aggr collection: %s. Please wait, this operation may take a while...' % index_as_json_text(index))
+    THROTTLE.wait_for_lag()
+    col.create_index(index, background=True)
 
 
-def setExpirationRaw(remove):
+def setExpirationRaw(col, remove, out):
     """
     Set expiration index for raw collection"
 
+    :param col: the collection to use
     :param remove: if True remove previous index, if False don't remove
+    :param out: function to call with each line of the processing report
     """
 
     index = [ ('recvTime', ASCENDING) ]
     if remove:
-        print '- Remove index in raw collection: %s' % index_as_json_text(index)
-        client[DB][COL].drop_index(index)
-    print '- Creating index in raw collection: %s with expireAfterSeconds %d. Please wait, this operation may take a while...' % (index_as_json_text(index), EXPIRATION)
-    client[DB][COL].create_index(index, background=True, expireAfterSeconds=EXPIRATION)
+        out('- Remove index in raw collection: %s' % index_as_json_text(index))
+        THROTTLE.wait()
+        col.drop_index(index)
+    out('- Creating index in raw collection: %s with expireAfterSeconds %d. Please wait, this operation may take a while...' % (index_as_json_text(index), EXPIRATION))
+    THROTTLE.wait_for_lag()
+    col.create_index(index, background=True, expireAfterSeconds=EXPIRATION)
 
 
-def setExpirationAggr(remove):
+def setExpirationAggr(col, remove, out):
     """
     Set expiration index for aggr collection
     
+    :param col: the collection to use
     :param remove: if True remove previous index, if False don't remove
+    :param out: function to call with each line of the processing report
     """
 
     index = [ ('_id.origin', ASCENDING) ]
     if remove:
-        print '- Remove index in aggr collection: %s' % index_as_json_text(index)
-        client[DB][COL].drop_index(index)
-    print '- Creating index in aggr collection: %s with expireAfterSeconds %d. Please wait, this operation may take a while...' % (index_as_json_text(index), EXPIRATION)
-    client[DB][COL].create_index(index, background=True, expireAfterSeconds=EXPIRATION)
+        out('- Remove index in aggr collection: %s' % index_as_json_text(index))
+        THROTTLE.wait()
+        col.drop_index(index)
+    out('- Creating index in aggr collection: %s with expireAfterSeconds %d. Please wait, this operation may take a while...' % (index_as_json_text(index), EXPIRATION))
+    THROTTLE.wait_for_lag()
+    col.create_index(index, background=True, expireAfterSeconds=EXPIRATION)
 
 
 def odict_as_json_text(od):
@@ -266,9 +767,461 @@ def index_as_json_text(ix):
     return s
 
 
+def get_samples_histogram(counts):
+    """
+    Get the histogram of samples per group, using power of ten buckets (i.e. '1-9', '10-99', '100-999', etc.)
+
+    :param counts: list with the number of samples of each group
+    :return: a dict with the number of groups in each bucket
+    """
+
+    histogram = {}
+    for c in counts:
+        digits = len(str(c))
+        bucket = '%d-%d' % (10 ** (digits - 1), 10 ** digits - 1)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    return histogram
+
+
+def get_stats(col, col_type):
+    """
+    Get statistics of a collection. Data and index sizes are taken from collStats and per group information
+    (entity-attribute in raw collections, entity-attribute-resolution in aggr collections) is calculated in just one
+    streamed aggregation.
+
+    :param col: the collection to use
+    :param col_type: collection type (either 'raw' or 'aggr')
+    :return: a dict with the statistics, ready to be serialized as JSON
+    """
+
+    THROTTLE.wait()
+    coll_stats = col.database.command('collStats', col.name)
+
+    if col_type == 'raw':
+        group_id = { 'entityId': '$entityId', 'entityType': '$entityType', 'attrName': '$attrName' }
+        time_field = '$recvTime'
+    else:
+        group_id = { 'entityId': '$_id.entityId', 'entityType': '$_id.entityType', 'attrName': '$_id.attrName', 'resolution': '$_id.resolution' }
+        time_field = '$_id.origin'
+
+    group = {
+        '_id': group_id,
+        'count': { '$sum': 1 },
+        'first': { '$min': time_field },
+        'last': { '$max': time_field }
+    }
+    if col_type == 'aggr':
+        group['samples'] = { '$sum': { '$sum': '$points.samples' } }
+
+    avg_obj_size = coll_stats.get('avgObjSize', 0)
+    groups = []
+    counts = []
+    first = None
+    last = None
+    prunable = 0
+
+    THROTTLE.wait()
+    for doc in col.aggregate([ { '$group': group } ], allowDiskUse=True):
+        g = dict(doc['_id'])
+        g['count'] = doc['count']
+        # Groups whose recvTime (or _id.origin) is null or missing have no time span
+        has_time = isinstance(doc['first'], datetime) and isinstance(doc['last'], datetime)
+        g['first'] = doc['first'].isoformat() if has_time else None
+        g['last'] = doc['last'].isoformat() if has_time else None
+        if col_type == 'raw':
+            g['avgInterval'] = None
+            if has_time and doc['count'] > 1:
+                g['avgInterval'] = (doc['last'] - doc['first']).total_seconds() / (doc['count'] - 1)
+        else:
+            g['samples'] = doc['samples']
+        groups.append(g)
+
+        counts.append(doc['count'])
+        if has_time and (first is None or doc['first'] < first):
+            first = doc['first']
+        if has_time and (last is None or doc['last'] > last):
+            last = doc['last']
+        if N > 0 and doc['count'] > N:
+            prunable += doc['count'] - N
+
+    stats = {
+        'database': col.database.name,
+        'collection': col.name,
+        'type': col_type,
+        'count': coll_stats.get('count', 0),
+        'size': coll_stats.get('size', 0),
+        'storageSize': coll_stats.get('storageSize', 0),
+        'avgObjSize': avg_obj_size,
+        'totalIndexSize': coll_stats.get('totalIndexSize', 0),
+        'indexSizes': coll_stats.get('indexSizes', {}),
+        'first': None,
+        'last': None,
+        'groups': groups,
+        'histogram': get_samples_histogram(counts)
+    }
+    if first is not None:
+        stats['first'] = first.isoformat()
+        stats['last'] = last.isoformat()
+    if N > 0:
+        stats['pruneEstimation'] = {
+            'prune': N,
+            'docs': prunable,
+            'bytes': prunable * avg_obj_size
+        }
+
+    return stats
+
+
+def get_data_model(col, col_type):
+    """
+    Guess the data model of a collection, inspecting the fields of one of its documents
+
+    :param col: the collection to use
+    :param col_type: collection type (either 'raw' or 'aggr')
+    :return: the data model (one of the DATA_MODELS values) or None if the collection is empty
+    """
+
+    THROTTLE.wait()
+    doc = col.find_one()
+    if doc is None:
+        return None
+
+    if col_type == 'aggr':
+        doc = doc['_id']
+
+    if 'entityId' in doc:
+        return 'collection-per-service-path'
+    elif 'attrName' in doc:
+        return 'collection-per-entity'
+    else:
+        return 'collection-per-attribute'
+
+
+def get_recommended_indexes(data_model, col_type):
+    """
+    Get the indexes needed by the queries STH does in a collection with the given data model and type. They are the
+    same used in the find conditions of sthDatabase.js (getRawData(), getNotificationInfo() and getAggregatedData())
+
+    :param data_model: the data model (one of the DATA_MODELS values)
+    :param col_type: collection type (either 'raw' or 'aggr')
+    :return: a list of triples with the index keys, a flag telling if the index has to be unique and the query it serves
+    """
+
+    if col_type == 'raw':
+        fields = { 'collection-per-service-path': [ 'entityId', 'entityType', 'attrName' ],
+                   'collection-per-entity': [ 'attrName' ],
+                   'collection-per-attribute': [] }[data_model]
+        # The _id sorts the raw data pages with the same recvTime
+        query = [ (f, ASCENDING) for f in fields + [ 'recvTime', '_id' ] ]
+        unique_fields = [ 'recvTime' ] + fields + [ 'attrType', 'attrValue' ]
+        unique = [ (f, ASCENDING) for f in unique_fields ]
+        return [ (query, False, 'raw data retrieval'), (unique, True, 'duplicated notification detection') ]
+    else:
+        fields = { 'collection-per-service-path': [ 'entityId', 'entityType', 'attrName' ],
+                   'collection-per-entity': [ 'attrName' ],
+                   'collection-per-attribute': [] }[data_model]
+        query = [ ('_id.' + f, ASCENDING) for f in fields + [ 'resolution', 'origin' ] ]
+        return [ (query, False, 'aggregated data retrieval and update') ]
+
+
+def get_index_keys(index):
+    """
+    :param index: index as returned by list_indexes()
+    :return: the index keys as a list of (field, direction) pairs, in index order
+    """
+
+    keys = []
+    for (k, v) in index['key'].items():
+        if isinstance(v, float):
+            v = int(v)
+        keys.append((k, v))
+
+    return keys
+
+
+def is_prefix(keys1, keys2):
+    """
+    :return: True if the index keys keys1 are a prefix of (or equal to) keys2, so keys2 can serve keys1 queries
+    """
+
+    return len(keys1) <= len(keys2) and keys2[:len(keys1)] == keys1
+
+
+def advise_indexes(col, col_type, out):
+    """
+    Report missing, redundant and unused indexes in a collection (along with their sizes), according to the queries
+    STH does in its data model. Usage information is taken from $indexStats (note that its counters are reset on
+    mongod restart). If --fixIndexes is used (and not in dryrun mode) missing indexes are created and redundant ones
+    are dropped.
+
+    :param col: the collection to use
+    :param col_type: collection type (either 'raw' or 'aggr')
+    :param out: function to call with each line of the processing report
+    """
+
+    data_model = get_data_model(col, col_type)
+    if data_model is None:
+        out('- Index advisor: empty collection, data model cannot be guessed')
+        return
+
+    THROTTLE.wait()
+    sizes = col.database.command('collStats', col.name).get('indexSizes', {})
+    THROTTLE.wait()
+    usage = {}
+    for doc in col.aggregate([ { '$indexStats': {} } ]):
+        usage[doc['name']] = doc['accesses']
+
+    indexes = list(col.list_indexes())
+
+    out('- Index advisor (data model: %s):' % data_model)
+
+    missing = []
+    needed = {}
+    for (keys, unique, query) in get_recommended_indexes(data_model, col_type):
+        found = False
+        for index in indexes:
+            if unique:
+                found = get_index_keys(index) == keys and index.get('unique', False)
+            else:
+                found = is_prefix(keys, get_index_keys(index))
+            if found:
+                needed[index['name']] = query
+                break
+        if not found:
+            out('  + Missing: %s%s (needed by %s)' % (index_as_json_text(keys), ' unique' if unique else '', query))
+            missing.append((keys, unique))
+
+    redundant = []
+    for index in indexes:
+        name = index['name']
+        keys = get_index_keys(index)
+        size = sizes.get(name, 0)
+        # _id, unique and TTL indexes have purposes other than queries, so they are never redundant nor unused
+        if name == '_id_' or index.get('unique', False) or 'expireAfterSeconds' in index:
+            out('  + Required: %s %s (%d bytes)' % (name, index_as_json_text(keys), size))
+            continue
+
+        covering = None
+        for other in indexes:
+            if other['name'] != name and is_prefix(keys, get_index_keys(other)):
+                covering = other['name']
+                break
+
+        if covering is not None:
+            out('  + Redundant: %s %s (%d bytes), covered by %s' % (name, index_as_json_text(keys), size, covering))
+            redundant.append(name)
+        elif name in needed:
+            out('  + Required: %s %s (%d bytes), needed by %s' % (name, index_as_json_text(keys), size, needed[name]))
+        elif name in usage and usage[name]['ops'] == 0:
+            out('  + Unused: %s %s (%d bytes), no ops since %s' % (name, index_as_json_text(keys), size, usage[name]['since']))
+        else:
+            out('  + Used: %s %s (%d bytes)' % (name, index_as_json_text(keys), size))
+
+    if DRYRUN or not FIX_INDEXES:
+        return
+
+    for (keys, unique) in missing:
+        out('- Creating index: %s. Please wait, this operation may take a while...' % index_as_json_text(keys))
+        THROTTLE.wait_for_lag()
+        try:
+            col.create_index(keys, background=True, unique=unique)
+        except Exception as e:
+            out('- ERROR creating index %s: %s' % (index_as_json_text(keys), str(e)))
+
+    for name in redundant:
+        out('- Removing redundant index: %s' % name)
+        THROTTLE.wait()
+        col.drop_index(name)
+
+
+def print_line(line):
+    """
+    Print a line of the processing report
+
+    :param line: the line to print
+    """
+
+    print line
+
+
+def process_collection(col, col_type, out):
+    """
+    Process a collection (analysis, index creation, expiration setting and pruning) according to CLI parameters
+
+    :param col: the collection to process
+    :param col_type: collection type (either 'raw' or 'aggr')
+    :param out: function to call with each line of the processing report
+    :return: a pair with the number of documents in the collection (before any removal) and the number of deleted documents
+    """
+
+    db_name = col.database.name
+    col_name = col.name
+
+    if col_type == 'raw':
+        (nIndexes, optIndex, expIndex) = getRelevantIndexesRaw(col)
+    else:
+        (nIndexes, optIndex, expIndex) = getRelevantIndexesAggr(col)
+
+    opt_string = 'None'
+    if not optIndex is None:
+        opt_string = odict_as_json_text(optIndex['key'])
+
+    exp_string = 'None'
+    if not expIndex is None:
+        exp_string = odict_as_json_text(expIndex['key'])
+        if 'expireAfterSeconds' in expIndex.keys():
+            exp_string += ' - expireAfterSeconds: %d' % expIndex['expireAfterSeconds']
+
+    count = col.count()
+
+    out("- Collection analysis:")
+    out("  + Count: %d" % count)
+    out("  + Indexes: %d" % nIndexes)
+    out("  + Optimization index: %s" % opt_string)
+    out("  + Expiration index:   %s" % exp_string)
+
+    if INDEX_ADVISOR:
+        advise_indexes(col, col_type, out)
+
+    if STATS_FILE is not None:
+        # Statistics are taken before any modification, so the prune estimation makes sense
+        STATS.append(get_stats(col, col_type))
+
+    if not DRYRUN and INDEX_CREATE:
+        if CHECKPOINT.is_done(db_name, col_name, 'createIndex'):
+            out('- Optimization index already created in a previous run, --createIndex is ignored')
+        elif optIndex is None:
+            if col_type == 'raw':
+                createIndexRaw(col, out)
+            else:
+                createIndexAggr(col, out)
+            CHECKPOINT.mark_done(db_name, col_name, 'createIndex')
+        else:
+            out('- Optimization index already exists, --createIndex is ignored')
+
+    if not DRYRUN and EXPIRATION > 0:
+        if expIndex is None:
+            if col_type == 'raw':
+                setExpirationRaw(col, False, out)
+            else:
+                setExpirationAggr(col, False, out)
+        else:
+            if OVERRIDE:
+                if col_type == 'raw':
+                    setExpirationRaw(col, True, out)
+                else:
+                    setExpirationAggr(col, True, out)
+            else:
+                out('- Expiration index already exists, --setExpiration is ignored. Use --overrideExpiration if you cant to override existing value')
+
+    removed = 0
+    if OLDER_THAN > 0:
+        removed = remove_older_than(col, col_type, out)
+        if DRYRUN:
+            removed = 0
+
+    # Early return
+    if N == 0:
+        return (count, removed)
+
+    if SINGLE_PASS:
+        if CHECKPOINT.is_done(db_name, col_name, 'prune'):
+            out('- Collection already pruned in a previous run, --prune is ignored')
+            return (count, removed)
+        (candidates, deleted, elapsed) = prune_single_pass(col, col_type)
+        if DRYRUN:
+            out('- %d docs would be removed (calculated in %.2f seconds)' % (candidates, elapsed))
+        else:
+            rate = 0
+            if elapsed > 0:
+                rate = deleted / elapsed
+            out('- %d docs removed in %.2f seconds (%.2f docs/s)' % (deleted, elapsed, rate))
+            CHECKPOINT.mark_done(db_name, col_name, 'prune')
+        return (count, removed + deleted)
+
+    if col_type == 'aggr':
+        start = time.time()
+        deleted = prune_aggr(col, out)
+        if not DRYRUN:
+            out('- %d docs removed in %.2f seconds' % (deleted, time.time() - start))
+        return (count, removed + deleted)
+
+    pipeline = [
+        {
+            '$group' : {
+                '_id' : { 'entityId': '$entityId', 'entityType': '$entityType', 'attrName': '$attrName'},
+                'count': { '$sum': 1 }
+            }
+        },
+        { '$sort' : { 'count': -1 } }
+    ]
+
+    THROTTLE.wait()
+    groups = col.aggregate(pipeline)
+
+    deleted = 0
+    if WORKERS > 1:
+        # Each group is processed by only one worker, so workers prune disjoint sets of documents
+        pool = ThreadPool(WORKERS)
+        for (line, n) in pool.imap_unordered(partial(process_group, col), groups):
+            out(line)
+            deleted += n
+        pool.close()
+        pool.join()
+    else:
+        for doc in groups:
+            (line, n) = process_group(col, doc)
+            out(line)
+            deleted += n
+
+    return (count, removed + deleted)
+
+
+def discover_collections():
+    """
+    Get all the collections which name starts with COL_PREFIX in the databases which name starts with DB_PREFIX,
+    guessing their type from their names
+
+    :return: a list of triples with database name, collection name and collection type (either 'raw' or 'aggr')
+    """
+
+    collections = []
+    for db_name in sorted(client.database_names()):
+        if not db_name.startswith(DB_PREFIX):
+            continue
+        for col_name in sorted(client[db_name].collection_names(include_system_collections=False)):
+            if not col_name.startswith(COL_PREFIX):
+                continue
+            if col_name.endswith('.aggr'):
+                collections.append((db_name, col_name, 'aggr'))
+            else:
+                collections.append((db_name, col_name, 'raw'))
+
+    return collections
+
+
+def process_fleet_collection(task):
+    """
+    Process a collection in --allDatabases mode, buffering its report so it can be printed as a whole
+
+    :param task: a triple with database name, collection name and collection type
+    :return: a 4-uple with the task, the report lines, the pair returned by process_collection() (None in case
+             of error) and the error message (None if no error)
+    """
+
+    (db_name, col_name, col_type) = task
+    lines = []
+    try:
+        result = process_collection(client[db_name][col_name], col_type, lines.append)
+        return (task, lines, result, None)
+    except Exception as e:
+        return (task, lines, None, str(e))
+
+
 # Get CLI arguments
 try:
-    opts, args = getopt(sys.argv[1:], 'u', ['mongoUri=', 'db=', 'col=', 'colType=', 'createIndex', 'prune=', 'setExpiration=', 'overrideExpiration', 'dryrun'])
+    opts, args = getopt(sys.argv[1:], 'u', ['mongoUri=', 'db=', 'col=', 'colType=', 'createIndex', 'prune=', 'singlePass', 'batchSize=', 'olderThan=', 'pause=', 'workers=', 'maxOpsPerSecond=', 'maxLag=', 'checkpoint=', 'resume', 'allDatabases', 'dbPrefix=', 'colPrefix=', 'parallelCollections=', 'stats=', 'indexAdvisor', 'fixIndexes', 'setExpiration=', 'overrideExpiration', 'dryrun'])
 except GetoptError:
     usage_and_exit('wrong parameter')
 
@@ -278,6 +1231,22 @@ DB = ''
 COL = ''
 COL_TYPE = ''
 N = 0
+SINGLE_PASS = False
+BATCH_SIZE = 1000
+OLDER_THAN = 0
+PAUSE = 0
+WORKERS = 1
+MAX_OPS = 0
+MAX_LAG = 0
+CHECKPOINT_FILE = None
+RESUME = False
+ALL_DATABASES = False
+DB_PREFIX = 'sth_'
+COL_PREFIX = 'sth_'
+PARALLEL_COLLECTIONS = 4
+STATS_FILE = None
+INDEX_ADVISOR = False
+FIX_INDEXES = False
 EXPIRATION = 0
 OVERRIDE = False
 INDEX_CREATE = False
@@ -302,6 +1271,75 @@ for opt, arg in opts:
                 usage_and_exit('--prune value must be an integer greater than 0')
         except ValueError:
             usage_and_exit('--prune value must be an integer greater than 0')
+    elif opt == '--singlePass':
+        SINGLE_PASS = True
+    elif opt == '--batchSize':
+        try:
+            BATCH_SIZE = int(arg)
+            if not BATCH_SIZE > 0:
+                usage_and_exit('--batchSize value must be an integer greater than 0')
+        except ValueError:
+            usage_and_exit('--batchSize value must be an integer greater than 0')
+    elif opt == '--olderThan':
+        try:
+            OLDER_THAN = int(arg)
+            if not OLDER_THAN > 0:
+                usage_and_exit('--olderThan value must be an integer greater than 0')
+        except ValueError:
+            usage_and_exit('--olderThan value must be an integer greater than 0')
+    elif opt == '--pause':
+        try:
+            PAUSE = int(arg) / 1000.0
+            if not PAUSE >= 0:
+                usage_and_exit('--pause value must be an integer greater than or equal to 0')
+        except ValueError:
+            usage_and_exit('--pause value must be an integer greater than or equal to 0')
+    elif opt == '--workers':
+        try:
+            WORKERS = int(arg)
+            if not WORKERS > 0:
+                usage_and_exit('--workers value must be an integer greater than 0')
+        except ValueError:
+            usage_and_exit('--workers value must be an integer greater than 0')
+    elif opt == '--maxOpsPerSecond':
+        try:
+            MAX_OPS = int(arg)
+            if not MAX_OPS > 0:
+                usage_and_exit('--maxOpsPerSecond value must be an integer greater than 0')
+        except ValueError:
+            usage_and_exit('--maxOpsPerSecond value must be an integer greater than 0')
+    elif opt == '--maxLag':
+        try:
+            MAX_LAG = int(arg)
+            if not MAX_LAG > 0:
+                usage_and_exit('--maxLag value must be an integer greater than 0')
+        except ValueError:
+            usage_and_exit('--maxLag value must be an integer greater than 0')
+    elif opt == '--checkpoint':
+        CHECKPOINT_FILE = arg
+    elif opt == '--resume':
+        RESUME = True
+    elif opt == '--allDatabases':
+        ALL_DATABASES = True
+    elif opt == '--dbPrefix':
+        ALL_DATABASES = True
+        DB_PREFIX = arg
+    elif opt == '--colPrefix':
+        ALL_DATABASES = True
+        COL_PREFIX = arg
+    elif opt == '--parallelCollections':
+        try:
+            PARALLEL_COLLECTIONS = int(arg)
+            if not PARALLEL_COLLECTIONS > 0:
+                usage_and_exit('--parallelCollections value must be an integer greater than 0')
+        except ValueError:
+            usage_and_exit('--parallelCollections value must be an integer greater than 0')
+    elif opt == '--stats':
+        STATS_FILE = arg
+    elif opt == '--indexAdvisor':
+        INDEX_ADVISOR = True
+    elif opt == '--fixIndexes':
+        FIX_INDEXES = True
     elif opt == '--setExpiration':
         try:
             EXPIRATION = int(arg)
@@ -318,95 +1356,85 @@ for opt, arg in opts:
     else:
         usage_and_exit()
 
-if DB == '':
-    usage_and_exit('--db must be provided')
-if COL == '':
-    usage_and_exit('--col must be provided')
-if COL_TYPE == '':
-    usage_and_exit("--colType must be provided (valid values: 'raw' and 'aggr')")
-if not COL_TYPE in ['raw', 'aggr']:
-    usage_and_exit("--colType %s is not valid (valid values: 'raw' and 'aggr')" % COL_TYPE)
-if N > 0 and COL_TYPE == 'aggr':
-    usage_and_exit('--prune cannot be used in aggregated collection in the current version of this script')
-
-client = MongoClient(MONGO_URI)
-
-if COL_TYPE == 'raw':
-    (nIndexes, optIndex, expIndex) = getRelevantIndexesRaw()
+if ALL_DATABASES:
+    if DB != '' or COL != '' or COL_TYPE != '':
+        usage_and_exit('--db, --col and --colType cannot be used with --allDatabases')
 else:
-    (nIndexes, optIndex, expIndex) = getRelevantIndexesAggr()
-
-opt_string = 'None'
-if not optIndex is None:
-    opt_string = odict_as_json_text(optIndex['key'])
-
-exp_string = 'None'
-if not expIndex is None:
-    exp_string = odict_as_json_text(expIndex['key'])
-    if 'expireAfterSeconds' in expIndex.keys():
-        exp_string += ' - expireAfterSeconds: %d' % expIndex['expireAfterSeconds']
-
-count = client[DB][COL].count() 
-
-print "- Collection analysis:"
-print "  + Count: %d" % count
-print "  + Indexes: %d" % nIndexes
-print "  + Optimization index: %s" % opt_string
-print "  + Expiration index:   %s" % exp_string
-
-if not DRYRUN and INDEX_CREATE:
-    if optIndex is None:
-        if COL_TYPE == 'raw':
-            createIndexRaw()
-        else:
-            createIndexAggr()
-    else:
-        print '- Optimization index already exists, --createIndex is ignored'
+    if DB == '':
+        usage_and_exit('--db must be provided')
+    if COL == '':
+        usage_and_exit('--col must be provided')
+    if COL_TYPE == '':
+        usage_and_exit("--colType must be provided (valid values: 'raw' and 'aggr')")
+    if not COL_TYPE in ['raw', 'aggr']:
+        usage_and_exit("--colType %s is not valid (valid values: 'raw' and 'aggr')" % COL_TYPE)
+if SINGLE_PASS and N == 0:
+    usage_and_exit('--singlePass can only be used with --prune')
+if FIX_INDEXES and not INDEX_ADVISOR:
+    usage_and_exit('--fixIndexes can only be used with --indexAdvisor')
+if RESUME and CHECKPOINT_FILE is None:
+    usage_and_exit('--resume can only be used with --checkpoint')
+
+# All the workers share the same client (and so its connection pool)
+client = MongoClient(MONGO_URI, maxPoolSize=max(100, WORKERS * PARALLEL_COLLECTIONS))
+THROTTLE = Throttle(MAX_OPS, MAX_LAG, client)
+
+# Checkpointing is meaningless in dryrun mode, as nothing is actually done
+if DRYRUN:
+    CHECKPOINT = Checkpoint(None, False)
+else:
+    CHECKPOINT = Checkpoint(CHECKPOINT_FILE, RESUME)
 
-if not DRYRUN and EXPIRATION > 0:
-    if expIndex is None:
-        if COL_TYPE == 'raw':
-            setExpirationRaw(False)
-        else:
-            setExpirationAggr(False)
-    else:
-        if OVERRIDE:
-            if COL_TYPE == 'raw':
-                setExpirationRaw(True)
-            else:
-                setExpirationAggr(True)
-        else:
-            print '- Expiration index already exists, --setExpiration is ignored. Use --overrideExpiration if you cant to override existing value'
- 
+# Statistics of the processed collections (if --stats is used)
+STATS = []
 
-# Early return
-if N == 0:
+if not ALL_DATABASES:
+    process_collection(client[DB][COL], COL_TYPE, print_line)
+    if STATS_FILE is not None:
+        with open(STATS_FILE, 'w') as f:
+            json.dump(STATS[0], f, indent=2)
     sys.exit(0)
 
-pipeline = [
-    {
-        '$group' : {
-            '_id' : { 'entityId': '$entityId', 'entityType': '$entityType', 'attrName': '$attrName'},
-            'count': { '$sum': 1 }
-        }
-    },
-    { '$sort' : { 'count': -1 } }
-]
-
-for doc in client[DB][COL].aggregate(pipeline):
-    entityId = doc['_id']['entityId']
-    entityType = doc['_id']['entityType']
-    attrName =  doc['_id']['attrName']
-
-    (total, first_time, last_time) = get_info(entityId, entityType, attrName)
-
-    if DRYRUN:
-        print '- %s:%s - %s (%d): first=%s, last=%s' % (entityId, entityType, attrName, total, first_time, last_time)
-    else:
-        if total > N:
-            deleted = prune(entityId, entityType, attrName, last_time)
-            info = '%d docs removed' % deleted
+start = time.time()
+tasks = discover_collections()
+n_raw = 0
+n_aggr = 0
+total_count = 0
+total_deleted = 0
+errors = 0
+
+# Each collection is processed by only one worker, which buffers its report lines so the output is not interleaved
+pool = ThreadPool(PARALLEL_COLLECTIONS)
+for (task, lines, result, error) in pool.imap_unordered(process_fleet_collection, tasks):
+    (db_name, col_name, col_type) = task
+    print '* Database %s collection %s (%s)' % (db_name, col_name, col_type)
+    for line in lines:
+        print line
+    if error is None:
+        (count, deleted) = result
+        total_count += count
+        total_deleted += deleted
+        if col_type == 'raw':
+            n_raw += 1
         else:
-            info = 'under limit'
-
-        print '- %s:%s - %s (%d): first=%s, last=%s - %s' % (entityId, entityType, attrName, total, first_time, last_time, info)
+            n_aggr += 1
+    else:
+        print '- ERROR: %s' % error
+        errors += 1
+    print
+pool.close()
+pool.join()
+
+print '* Summary:'
+print '  + Databases prefix: %s' % DB_PREFIX
+print '  + Collections prefix: %s' % COL_PREFIX
+print '  + Raw collections: %d' % n_raw
+print '  + Aggr collections: %d' % n_aggr
+print '  + Errors: %d' % errors
+print '  + Total count: %d' % total_count
+print '  + Docs removed: %d' % total_deleted
+print '  + Elapsed: %.2f seconds' % (time.time() - start)
+
+if STATS_FILE is not None:
+    with open(STATS_FILE, 'w') as f:
+        json.dump(STATS, f, indent=2)
@@ -46,24 +46,6 @@ fi
 
 MONGO_URI=$BASE_MONGO_URI/$RPL_SET_OPTION
 
-for db in $(echo 'show dbs' | mongo --quiet $MONGO_URI | awk -F ' ' '{print $1}' | grep sth_)
-do
-  MONGO_URI_DB=$BASE_MONGO_URI/$db$RPL_SET_OPTION
-
-  # For raw collections
-  for col in $(echo "show collections" | mongo --quiet $MONGO_URI_DB | grep sth_ | grep -v '.aggr')
-  do
-    echo "* Running script in database $db collection $col"
-    python sth_db_fixer.py --mongoUri $MONGO_URI --db $db --col $col --colType raw --dryrun --createIndex --setExpiration 1209600
-    echo
-  done
-
-  # For aggr collections
-  for col in $(echo "show collections" | mongo --quiet $MONGO_URI_DB | grep sth_ | grep '.aggr')
-  do
-    echo "* Running script in database $db collection $col"
-    python sth_db_fixer.py --mongoUri $MONGO_URI --db $db --col $col --colType aggr --dryrun --createIndex --setExpiration 1209600
-    echo
-  done
-done
-
+# All the sth_* collections of the sth_* databases are discovered and processed by sth_db_fixer.py itself, using just one
+# connection to the DB. Collection type (raw or aggr) is guessed from the collection name
+python sth_db_fixer.py --mongoUri $MONGO_URI --allDatabases --dbPrefix sth_ --colPrefix sth_ --parallelCollections 4 --dryrun --createIndex --setExpiration 1209600
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+# -*- coding: latin-1 -*-
+# Copyright 2026 Telefonica Investigacion y Desarrollo, S.A.U
+#
+# This file is part of Short Time Historic (STH) component
+#
+# STH is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# STH is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with STH.
+# If not, see http://www.gnu.org/licenses/.
+#
+# For those usages not covered by this license please contact with
+# iot_support at tid dot es
+
+# NOTE: this script checks the result of a notifications performance test run against STH. All the checks are done
+# with one server-side aggregation per collection, so only a summary of each entity-attribute goes through the network.
+# --maxGap requires MongoDB 5.0 or newer ($setWindowFields)
+
+import sys
+import os
+import time
+from getopt import getopt, GetoptError
+from multiprocessing.pool import ThreadPool
+
+from pymongo import MongoClient
+
+KEY_FIELDS = [ 'entityId', 'entityType', 'attrName' ]
+
+
+def usage():
+    """
+    Print usage message
+    """
+
+    print 'Usage: %s --mongoUri <uri> --dbPrefix <prefix> --db <database> --expected <n> --maxGap <seconds> --parallelCollections <n> --verbose -u' % os.path.basename(__file__)
+    print ''
+    print 'Parameters:'
+    print "  --mongoUri <uri> (optional): mongo URI to connecto to DB. Default is 'mongodb://localhost'"
+    print "  --dbPrefix <prefix> (optional): check all the databases which name starts with this prefix. Default is 'sth_'"
+    print "  --db <database> (optional): check only this database"
+    print "  --expected <n> (optional): number of samples expected for each entity-attribute"
+    print "  --maxGap <seconds> (optional): report the entity-attributes with consecutive samples separated more than this"
+    print "  --parallelCollections <n> (optional): number of collections checked concurrently. Default is 16"
+    print "  --verbose (optional): print the result of every entity-attribute, not only the failed ones"
+    print "  -u, print this usage mesage"
+
+
+def usage_and_exit(msg):
+    """
+    Print usage message and exit"
+
+    :param msg: optional error message to print
+    """
+
+    if msg != '':
+        print "ERROR: " + msg
+        print
+
+    usage()
+    sys.exit(1)
+
+
+def get_key(doc):
+    """
+    :param doc: a document which _id includes the KEY_FIELDS (missing ones depend on data model)
+    :return: a tuple with the entity-attribute identification
+    """
+
+    # _id may be null when none of the KEY_FIELDS is in the collection
+    return tuple([ (doc['_id'] or {}).get(f) for f in KEY_FIELDS ])
+
+
+def format_key(key):
+    """
+    :return: an human readable representation of the entity-attribute key
+    """
+
+    return ', '.join([ '%s=%s' % (f, v) for (f, v) in zip(KEY_FIELDS, key) if v is not None ])
+
+
+def get_raw_pipeline(max_gap):
+    """
+    Get the pipeline to summarize the raw samples of each entity-attribute
+
+    :param max_gap: maximum gap (in seconds) between consecutive samples, None to not check gaps
+    :return: the pipeline
+    """
+
+    group_id = dict([ (f, '$' + f) for f in KEY_FIELDS ])
+    group = { '_id': group_id, 'count': { '$sum': 1 }, 'first': { '$min': '$recvTime' }, 'last': { '$max': '$recvTime' } }
+    if max_gap is None:
+        return [ { '$group': group } ]
+
+    group['maxGap'] = { '$max': '$gap' }
+    group['gaps'] = { '$sum': { '$cond': [ { '$gt': [ '$gap', max_gap * 1000 ] }, 1, 0 ] } }
+    return [
+        { '$setWindowFields': {
+            'partitionBy': group_id,
+            'sortBy': { 'recvTime': 1 },
+            'output': { 'prev': { '$shift': { 'output': '$recvTime', 'by': -1 } } }
+        } },
+        { '$project': dict([ (f, 1) for f in KEY_FIELDS ] + [ ('recvTime', 1), ('gap', { '$subtract': [ '$recvTime', '$prev' ] }) ]) },
+        { '$group': group }
+    ]
+
+
+def get_aggr_pipeline():
+    """
+    Get the pipeline to sum the samples of each entity-attribute and resolution, without unwinding the points
+
+    :return: the pipeline
+    """
+
+    group_id = dict([ (f, '$_id.' + f) for f in KEY_FIELDS ] + [ ('resolution', '$_id.resolution') ])
+    return [
+        { '$project': { '_id': 1, 'samples': { '$sum': '$points.samples' } } },
+        { '$group': { '_id': group_id, 'samples': { '$sum': '$samples' } } }
+    ]
+
+
+def check_collection(task):
+    """
+    Check a raw collection (and its aggregated one, if any)
+
+    :param task: a triple with database name, raw collection name (None if only the aggregated exists) and aggregated
+                 collection name (None if it does not exist)
+    :return: a 4-uple with the task, the number of checked entity-attributes, the list of (ok, message) results and
+             the error message (None if no error)
+    """
+
+    (db_name, raw_name, aggr_name) = task
+    results = []
+    try:
+        raw = {}
+        if raw_name is not None:
+            for doc in client[db_name][raw_name].aggregate(get_raw_pipeline(MAX_GAP), allowDiskUse=True):
+                raw[get_key(doc)] = doc
+
+        for key in sorted(raw):
+            doc = raw[key]
+            msg = '%s: %d samples from %s to %s' % (format_key(key), doc['count'], doc['first'], doc['last'])
+            ok = True
+            if EXPECTED is not None and doc['count'] != EXPECTED:
+                ok = False
+                msg += ' (expected %d, %.2f%%)' % (EXPECTED, doc['count'] * 100.0 / EXPECTED)
+            if MAX_GAP is not None and doc['gaps'] > 0:
+                ok = False
+                msg += ' (%d gaps, max gap %.3f seconds)' % (doc['gaps'], doc['maxGap'] / 1000.0)
+            results.append((ok, msg))
+
+        aggr = {}
+        if aggr_name is not None:
+            for doc in client[db_name][aggr_name].aggregate(get_aggr_pipeline(), allowDiskUse=True):
+                aggr.setdefault(get_key(doc), {})[(doc['_id'] or {}).get('resolution')] = doc['samples']
+
+        for key in sorted(aggr):
+            if key in raw:
+                expected = raw[key]['count']
+            elif EXPECTED is not None:
+                expected = EXPECTED
+            else:
+                continue
+            for resolution in sorted(aggr[key]):
+                samples = aggr[key][resolution]
+                msg = '%s: %d samples in %s resolution' % (format_key(key), samples, resolution)
+                if samples != expected:
+                    results.append((False, msg + ' (expected %d)' % expected))
+                else:
+                    results.append((True, msg))
+
+        for key in sorted(set(raw) - set(aggr)):
+            if aggr_name is not None:
+                results.append((False, '%s: no aggregated data' % format_key(key)))
+
+        return (task, len(set(raw) | set(aggr)), results, None)
+    except Exception as e:
+        return (task, 0, results, str(e))
+
+
+def get_tasks():
+    """
+    Get the collections to check, pairing each raw collection with its aggregated one
+
+    :return: a list of triples with database name, raw collection name and aggregated collection name
+    """
+
+    tasks = []
+    for db_name in sorted(client.database_names()):
+        if DB != '' and db_name != DB or DB == '' and not db_name.startswith(DB_PREFIX):
+            continue
+        names = set(client[db_name].collection_names(include_system_collections=False))
+        for col_name in sorted(names):
+            if col_name.endswith('.aggr'):
+                if not col_name[:-len('.aggr')] in names:
+                    tasks.append((db_name, None, col_name))
+            else:
+                tasks.append((db_name, col_name, col_name + '.aggr' if col_name + '.aggr' in names else None))
+
+    return tasks
+
+
+# Get CLI arguments
+try:
+    opts, args = getopt(sys.argv[1:], 'u', ['mongoUri=', 'dbPrefix=', 'db=', 'expected=', 'maxGap=', 'parallelCollections=', 'verbose'])
+except GetoptError:
+    usage_and_exit('wrong parameter')
+
+# Defaults (to be changed by user CLI parameters)
+MONGO_URI = 'mongodb://localhost'
+DB_PREFIX = 'sth_'
+DB = ''
+EXPECTED = None
+MAX_GAP = None
+PARALLEL_COLLECTIONS = 16
+VERBOSE = False
+
+for opt, arg in opts:
+    if opt == '-u':
+        usage()
+        sys.exit(0)
+    elif opt == '--mongoUri':
+        MONGO_URI = arg
+    elif opt == '--dbPrefix':
+        DB_PREFIX = arg
+    elif opt == '--db':
+        DB = arg
+    elif opt == '--expected':
+        try:
+            EXPECTED = int(arg)
+            if not EXPECTED > 0:
+                usage_and_exit('--expected value must be an integer greater than 0')
+        except ValueError:
+            usage_and_exit('--expected value must be an integer greater than 0')
+    elif opt == '--maxGap':
+        try:
+            MAX_GAP = float(arg)
+            if not MAX_GAP > 0:
+                usage_and_exit('--maxGap value must be a number greater than 0')
+        except ValueError:
+            usage_and_exit('--maxGap value must be a number greater than 0')
+    elif opt == '--parallelCollections':
+        try:
+            PARALLEL_COLLECTIONS = int(arg)
+            if not PARALLEL_COLLECTIONS > 0:
+                usage_and_exit('--parallelCollections value must be an integer greater than 0')
+        except ValueError:
+            usage_and_exit('--parallelCollections value must be an integer greater than 0')
+    elif opt == '--verbose':
+        VERBOSE = True
+    else:
+        usage_and_exit('')
+
+client = MongoClient(MONGO_URI, maxPoolSize=max(100, PARALLEL_COLLECTIONS))
+
+start = time.time()
+tasks = get_tasks()
+print '* Checking %d collections (%d in parallel)...' % (len(tasks), PARALLEL_COLLECTIONS)
+
+checked = 0
+passed = 0
+failed = 0
+errors = 0
+pool = ThreadPool(PARALLEL_COLLECTIONS)
+for (task, n, results, error) in pool.imap_unordered(check_collection, tasks):
+    (db_name, raw_name, aggr_name) = task
+    checked += n
+    bad = [ msg for (ok, msg) in results if not ok ]
+    passed += len(results) - len(bad)
+    failed += len(bad)
+    if error is not None:
+        errors += 1
+        print '- %s.%s: ERROR %s' % (db_name, raw_name or aggr_name, error)
+    if VERBOSE:
+        print '- %s.%s' % (db_name, raw_name or aggr_name)
+        for (ok, msg) in results:
+            print '  + %s %s' % ('PERFECT' if ok else 'ERROR', msg)
+    elif len(bad) > 0:
+        print '- %s.%s' % (db_name, raw_name or aggr_name)
+        for msg in bad:
+            print '  + ERROR %s' % msg
+pool.close()
+pool.join()
+
+print ''
+print 'SUMMARY:'
+print '  - Collections: %d' % len(tasks)
+print '  - Entity-attributes: %d' % checked
+print '  - Passed checks: %d' % passed
+print '  - Failed checks: %d' % failed
+print '  - Collection errors: %d' % errors
+print '  - Elapsed: %.2f seconds' % (time.time() - start)
+
+if failed > 0 or errors > 0:
+    sys.exit(1)
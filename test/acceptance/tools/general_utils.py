@@ -65,7 +65,7 @@ def convert_str_to_dict (body, content):
             return xmltodict.parse(body)
         else:
             return json.loads(body)
-    except Exception, e:
+    except Exception as e:
         assert False,  " ERROR - converting string to %s dictionary: \n%s \Exception error:\n%s" % (str(content), str(body), str(e))
 
 def convert_dict_to_str (body, content):
@@ -80,7 +80,7 @@ def convert_dict_to_str (body, content):
             return xmltodict.unparse(body)
         else:
             return json.dumps(body)
-    except Exception, e:
+    except Exception as e:
         assert False,  " ERROR - converting %s dictionary to string: \n%s \Exception error:\n%s" % (str(content), str(body), str(e))
 
 def convert_str_to_list (text, separator):
@@ -92,7 +92,7 @@ def convert_str_to_list (text, separator):
     """
     try:
         return text.split(separator)
-    except Exception, e:
+    except Exception as e:
         assert False,  " ERROR - converting %s string to list with separator: %s \nException error:%s" % (str(text), str(separator), str(e))
 
 def convert_list_to_string (list, separator):
@@ -104,7 +104,7 @@ def convert_list_to_string (list, separator):
     """
     try:
         return separator.join(list)
-    except Exception, e:
+    except Exception as e:
         assert False,  " ERROR - converting list to string with separator: %s \nException error:%s" % (str(separator), str(e))
 
 def show_times (init_value):
@@ -112,10 +112,10 @@ def show_times (init_value):
     shows the time duration of the entire test
     :param initValue: initial time
     """
-    print "**************************************************************"
-    print "Initial (date & time): " + str(init_value)
-    print "Final   (date & time): " + str(time.strftime("%c"))
-    print "**************************************************************"
+    print("**************************************************************")
+    print("Initial (date & time): " + str(init_value))
+    print("Final   (date & time): " + str(time.strftime("%c")))
+    print("**************************************************************")
 
 def generate_timestamp(date=EMPTY, format="%Y-%m-%dT%H:%M:%S.%fZ"):
     """
@@ -161,5 +161,5 @@ def is_an_integer_value(value):
         if dec_v == 0:
             return True
         return False
-    except Exception, e:
+    except Exception as e:
        assert False, " Error - %s is not numeric... \n %s" % (str(value), str(e))
@@ -73,13 +73,13 @@ def print_request(method, url, headers, body):
     :param headers: header used
     :param body: body used
     """
-    print "------------------------------ Request ----------------------------------------------"
-    print "url: " + str(method) + "  " + str(url)+"\n"
+    print("------------------------------ Request ----------------------------------------------")
+    print("url: " + str(method) + "  " + str(url)+"\n")
     if headers is not None:
-        print "Header: " + str(headers) + "\n"
+        print("Header: " + str(headers) + "\n")
     if body != EMPTY:
-        print "Body: "  + str(body) + "\n\n\n"
-    print "----------------------------- End request ---------------------------------------------\n\n\n\n"
+        print("Body: "  + str(body) + "\n\n\n")
+    print("----------------------------- End request ---------------------------------------------\n\n\n\n")
 
 def print_response(response):
     """
@@ -88,13 +88,13 @@ def print_response(response):
     """
     body = response.text
     headers = response.headers
-    print "---------------------------------- Response ----------------------------------------------"
-    print "status code: " + str(response.status_code) + "\n"
+    print("---------------------------------- Response ----------------------------------------------")
+    print("status code: " + str(response.status_code) + "\n")
     if headers is not None:
-        print "Header: " + str(headers) + "\n"
+        print("Header: " + str(headers) + "\n")
     if body != EMPTY:
-        print "Body: " + str(body) + "\n\n\n"
-    print "--------------------------------- End Response --------------------------------------------"
+        print("Body: " + str(body) + "\n\n\n")
+    print("--------------------------------- End Response --------------------------------------------")
 def request (method, **kwargs):
     """
     launch a request
@@ -121,7 +121,7 @@ def request (method, **kwargs):
         resp = requests.request(method, url, headers=headers, data=body, params=parameters, allow_redirects= redirect, verify=verify_SSL)
         #print_response(resp)
         return resp
-    except Exception, e:
+    except Exception as e:
         assert not True,  " ERROR IN REQUEST: %s  \nurl    : %s \nheaders: %s \npayload: %s" % (str(e), url, str(headers), body)
 
 def assert_status_code (expected, resp, Error_msg):
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026 Telefonica Investigación y Desarrollo, S.A.U
+#
+# This file is part of Short Term Historic (FI-WARE project).
+#
+# iot-sth is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# iot-sth is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with iot-sth. If not, see
+# http://www.gnu.org/licenses/.
+#
+# For those usages not covered by the GNU Affero General Public License please contact:
+# iot_support at tid.es
+#
+"""
+Notifications load generator for STH.
+
+Drives the /notify endpoint at a target rate (open loop) over a set of services, service paths and entities, using
+the payload builders of the acceptance tools (test/acceptance/tools/notification_utils.py) and asyncio keep-alive
+connections, and reports the throughput and the p50/p95/p99 latencies. Latencies are measured from the time each
+notification was scheduled, so a server which cannot keep the pace is not hidden by the generator waiting for it.
+
+Requires Python 3 and the acceptance tools dependencies (see test/acceptance/requirements.txt).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'acceptance'))
+
+from tools import notification_utils  # noqa: E402
+from tools.notification_utils import Notifications  # noqa: E402
+
+NOTIFY_PATH = '/notify'
+PERCENTILES = [50, 95, 99]
+
+
+def parse_args():
+    """
+    Parse the command line arguments
+    :return: arguments namespace
+    """
+    parser = argparse.ArgumentParser(description='STH notifications load generator')
+    parser.add_argument('--host', default='127.0.0.1', help='STH host (127.0.0.1 by default)')
+    parser.add_argument('--port', type=int, default=8666, help='STH port (8666 by default)')
+    parser.add_argument('--rate', type=float, default=100,
+                        help='target notifications per second, 0 to send as fast as possible (100 by default)')
+    parser.add_argument('--duration', type=float, default=10, help='duration of the test in seconds (10 by default)')
+    parser.add_argument('--concurrency', type=int, default=20,
+                        help='number of concurrent keep-alive connections (20 by default)')
+    parser.add_argument('--services', type=int, default=1, help='number of services (1 by default)')
+    parser.add_argument('--servicePaths', type=int, default=1,
+                        help='number of service paths in each service (1 by default)')
+    parser.add_argument('--entities', type=int, default=10,
+                        help='number of entities in each service path (10 by default)')
+    parser.add_argument('--attributes', type=int, default=1,
+                        help='number of attributes in each notification (1 by default)')
+    parser.add_argument('--metadatas', type=int, default=0,
+                        help='number of metadatas in each attribute (0 by default)')
+    parser.add_argument('--service', default='my_service', help='service name prefix (my_service by default)')
+    parser.add_argument('--servicePath', default='/my_serv_path',
+                        help='service path prefix (/my_serv_path by default)')
+    parser.add_argument('--entityId', default='room', help='entity id prefix (room by default)')
+    parser.add_argument('--entityType', default='house', help='entity type (house by default)')
+    parser.add_argument('--attrName', default='temperature', help='attribute name prefix (temperature by default)')
+    parser.add_argument('--attrType', default='float', help='attribute type (float by default)')
+    parser.add_argument('--attrValue', default='random number=2',
+                        help="attribute value, as accepted by Notifications.create_attributes() ('random number=2' by "
+                             "default)")
+    parser.add_argument('--output', help='file to write the results in JSON format')
+    return parser.parse_args()
+
+
+def create_notifications(args):
+    """
+    Create the notifications to send, one per service, service path and entity
+    :param args: arguments namespace
+    :return: list of (headers, body) tuples, body already encoded
+    """
+    notifications = []
+    for s in range(args.services):
+        for p in range(args.servicePaths):
+            notification = Notifications(
+                'http://%s:%d%s' % (args.host, args.port, NOTIFY_PATH),
+                tenant='%s_%d' % (args.service, s),
+                service_path='%s_%d' % (args.servicePath, p),
+                content=notification_utils.JSON,
+            )
+            if args.metadatas > 0:
+                notification.create_metadatas_attribute(
+                    args.metadatas, notification_utils.RANDOM, notification_utils.RANDOM, notification_utils.RANDOM
+                )
+            tenant, service_path = notification.get_services()
+            headers = {
+                notification_utils.HEADER_ACCEPT: notification_utils.HEADER_APPLICATION + notification_utils.JSON,
+                notification_utils.HEADER_CONTENT_TYPE: notification_utils.HEADER_APPLICATION + notification_utils.JSON,
+                notification_utils.HEADER_TENANT: tenant,
+                notification_utils.HEADER_SERVICE_PATH: service_path,
+                notification_utils.HEADER_USER_AGENT: notification.user_agent,
+            }
+            for e in range(args.entities):
+                # each entity gets its own (maybe random) attribute values
+                attrs = notification.create_attributes(args.attributes, args.attrName, args.attrType, args.attrValue)
+                body = {
+                    notification_utils.SUBSCRIPTION_ID: notification_utils.SUBSCRIPTION_ID_VALUE,
+                    notification_utils.ORIGINATOR: notification_utils.ORIGINATOR_VALUE,
+                    notification_utils.CONTEXT_RESPONSES: [
+                        {
+                            notification_utils.CONTEXT_ELEMENT: {
+                                notification_utils.ATTRIBUTES: attrs,
+                                notification_utils.ID: '%s_%d' % (args.entityId, e),
+                                notification_utils.TYPE: args.entityType,
+                                notification_utils.PATTERN_JSON: notification_utils.PATTERN_VALUE,
+                            },
+                            notification_utils.STATUS_CODE: {
+                                notification_utils.CODE: notification_utils.CODE_VALUE,
+                                notification_utils.REASON_PHRASE: notification_utils.REASON_PHRASE_VALUE,
+                            },
+                        }
+                    ],
+                }
+                notifications.append((headers, json.dumps(body).encode('utf-8')))
+    return notifications
+
+
+class Connection:
+    """
+    Minimal HTTP/1.1 keep-alive client connection, enough to POST notifications and read the responses
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def post(self, path, headers, body):
+        """
+        Send a POST request and read its response
+        :return: response status code
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        request = ['POST %s HTTP/1.1' % path, 'Host: %s:%d' % (self.host, self.port), 'Content-Length: %d' % len(body)]
+        request.extend('%s: %s' % (name, value) for name, value in headers.items())
+        self.writer.write(('\r\n'.join(request) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed by server')
+        status = int(status_line.split()[1])
+        length = 0
+        chunked = False
+        keep_alive = True
+        while True:
+            line = (await self.reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == 'content-length':
+                length = int(value)
+            elif name == 'transfer-encoding':
+                chunked = value == 'chunked'
+            elif name == 'connection':
+                keep_alive = value != 'close'
+        if chunked:
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif length > 0:
+            await self.reader.readexactly(length)
+        if not keep_alive:
+            await self.close()
+        return status
+
+
+class Results:
+    """
+    Accumulate the results of the sent notifications
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.service_times = []
+        self.statuses = {}
+        self.errors = {}
+
+    def add(self, status, latency, service_time):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == 200:
+            self.latencies.append(latency)
+            self.service_times.append(service_time)
+
+    def add_error(self, error):
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile
+    :param values: sorted values
+    :param p: percentile (0-100)
+    :return: percentile value, None if there are no values
+    """
+    if not values:
+        return None
+    return values[max(0, min(len(values) - 1, int(round(p / 100.0 * len(values))) - 1))]
+
+
+async def worker(queue, connection, results):
+    """
+    Send the notifications in the queue through one connection
+    """
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        scheduled, (headers, body) = item
+        sent = time.monotonic()
+        try:
+            status = await connection.post(NOTIFY_PATH, headers, body)
+            now = time.monotonic()
+            results.add(status, now - (scheduled if scheduled is not None else sent), now - sent)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            results.add_error(e)
+            await connection.close()
+    await connection.close()
+
+
+async def run(args, notifications):
+    """
+    Schedule the notifications at the target rate and send them through the workers
+    :return: (results, elapsed seconds)
+    """
+    results = Results()
+    queue = asyncio.Queue(maxsize=0 if args.rate > 0 else args.concurrency)
+    workers = [
+        asyncio.create_task(worker(queue, Connection(args.host, args.port), results)) for i in range(args.concurrency)
+    ]
+    start = time.monotonic()
+    i = 0
+    while True:
+        if args.rate > 0:
+            scheduled = start + i / args.rate
+            if scheduled - start >= args.duration:
+                break
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            queue.put_nowait((scheduled, notifications[i % len(notifications)]))
+        else:
+            if time.monotonic() - start >= args.duration:
+                break
+            # closed loop: the bounded queue makes the scheduler wait for the workers
+            await queue.put((None, notifications[i % len(notifications)]))
+        i += 1
+    for w in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    return results, time.monotonic() - start
+
+
+def report(args, results, elapsed):
+    """
+    Print the results summary and write them in JSON format if requested
+    """
+    latencies = sorted(results.latencies)
+    service_times = sorted(results.service_times)
+    ok = results.statuses.get(200, 0)
+    sent = sum(results.statuses.values()) + sum(results.errors.values())
+    summary = {
+        'target_rate': args.rate,
+        'duration': elapsed,
+        'sent': sent,
+        'ok': ok,
+        'statuses': dict((str(k), v) for k, v in results.statuses.items()),
+        'errors': results.errors,
+        'throughput': ok / elapsed if elapsed > 0 else 0,
+        'latency_ms': dict(
+            ('p%d' % p, percentile(latencies, p) * 1000 if latencies else None) for p in PERCENTILES
+        ),
+        'service_time_ms': dict(
+            ('p%d' % p, percentile(service_times, p) * 1000 if service_times else None) for p in PERCENTILES
+        ),
+    }
+    summary['latency_ms']['max'] = latencies[-1] * 1000 if latencies else None
+
+    print('* Notifications sent: %d in %.2f seconds (target rate: %s/s)' % (sent, elapsed, args.rate or 'max'))
+    print('  + OK: %d, status codes: %s, errors: %s' % (ok, summary['statuses'], results.errors or '{}'))
+    print('  + Throughput: %.2f notifications/s' % summary['throughput'])
+    for name in ['latency_ms', 'service_time_ms']:
+        values = summary[name]
+        print(
+            '  + %s: %s'
+            % (
+                name.replace('_ms', '').replace('_', ' ').capitalize(),
+                ', '.join(
+                    '%s=%s' % (k, '%.2fms' % v if v is not None else '-')
+                    for k, v in sorted(values.items(), key=lambda kv: (kv[0] == 'max', kv[0]))
+                ),
+            )
+        )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+    return summary
+
+
+def main():
+    args = parse_args()
+    for name in ['concurrency', 'services', 'servicePaths', 'entities', 'attributes']:
+        if getattr(args, name) <= 0:
+            sys.exit('ERROR: --%s must be greater than 0' % name)
+    notifications = create_notifications(args)
+    print(
+        '* Sending notifications to http://%s:%d%s: %d services, %d service paths per service, %d entities per '
+        'service path, %d attributes per notification'
+        % (args.host, args.port, NOTIFY_PATH, args.services, args.servicePaths, args.entities, args.attributes)
+    )
+    results, elapsed = asyncio.run(run(args, notifications))
+    report(args, results, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2026 Telefonica Investigación y Desarrollo, S.A.U
+#
+# This file is part of Short Term Historic (FI-WARE project).
+#
+# iot-sth is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General
+# Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+# iot-sth is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Affero General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Affero General Public License along with iot-sth. If not, see
+# http://www.gnu.org/licenses/.
+#
+# For those usages not covered by the GNU Affero General Public License please contact:
+# iot_support at tid.es
+#
+"""
+Query benchmark for STH.
+
+Optionally seeds a known dataset (one numeric and one textual attribute of one entity, with one sample per minute
+from a fixed date, timestamped with the TimeInstant metadata) through the /notify endpoint, and then runs a set of
+scenarios against the raw and aggregated GET endpoints of NGSIv1 and NGSIv2, covering each query param family
+(lastN, hLimit/hOffset, dateFrom/dateTo, aggrMethod/aggrPeriod, filetype=csv and count). For each scenario the
+latency distribution and the response size are reported and saved in JSON format (the baseline), which can be
+compared with a previous one to spot regressions.
+
+Requires Python 3 and the acceptance tools dependencies (see test/acceptance/requirements.txt).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'acceptance'))
+
+from tools import http_utils, notification_utils  # noqa: E402
+from tools.notification_utils import Notifications  # noqa: E402
+
+SEED_START = datetime(2020, 1, 1)
+SEED_ENTITY_ID = 'room_bench'
+SEED_ENTITY_TYPE = 'house'
+# Notifications.create_attributes() appends the attribute index to the name
+NUMBER_ATTR = 'temperature'
+TEXT_ATTR = 'status'
+TEXT_VALUES = ['on', 'off', 'idle']
+PERCENTILES = [50, 95, 99]
+
+
+def parse_args():
+    """
+    Parse the command line arguments
+    :return: arguments namespace
+    """
+    parser = argparse.ArgumentParser(description='STH queries benchmark')
+    parser.add_argument('--host', default='127.0.0.1', help='STH host (127.0.0.1 by default)')
+    parser.add_argument('--port', type=int, default=8666, help='STH port (8666 by default)')
+    parser.add_argument('--service', default='benchmark', help='service used (benchmark by default)')
+    parser.add_argument('--servicePath', default='/benchmark', help='service path used (/benchmark by default)')
+    parser.add_argument('--seed', action='store_true', help='seed the dataset before running the scenarios')
+    parser.add_argument('--samples', type=int, default=1440,
+                        help='number of samples per attribute to seed, one per minute (1440 by default)')
+    parser.add_argument('--iterations', type=int, default=50,
+                        help='number of measured requests per scenario (50 by default)')
+    parser.add_argument('--warmup', type=int, default=5,
+                        help='number of not measured requests per scenario (5 by default)')
+    parser.add_argument('--scenarios', help='comma-separated list of scenarios to run (all by default)')
+    parser.add_argument('--output', help='file to write the results (the new baseline) in JSON format')
+    parser.add_argument('--baseline', help='baseline file to compare the results with')
+    parser.add_argument('--threshold', type=float, default=20,
+                        help='p50/p95 increase (in %%) over the baseline reported as regression (20 by default)')
+    return parser.parse_args()
+
+
+def format_date(date):
+    """
+    :return: the date in ISO 8601 format, as used by STH
+    """
+    return date.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def seed(args):
+    """
+    Seed the dataset: one sample per minute of a numeric and a textual attribute
+    """
+    url = 'http://%s:%d/notify' % (args.host, args.port)
+    notification = Notifications(url, tenant=args.service, service_path=args.servicePath)
+    start = time.time()
+    for i in range(args.samples):
+        time_instant = format_date(SEED_START + timedelta(minutes=i))
+        for name, attr_type, value in [(NUMBER_ATTR, 'float', str(i % 50)), (TEXT_ATTR, 'string', TEXT_VALUES[i % 3])]:
+            notification.create_metadatas_attribute(1, 'TimeInstant', 'ISO8601', time_instant)
+            notification.create_attributes(1, name, attr_type, value)
+            resp = notification.send_notification(SEED_ENTITY_ID, SEED_ENTITY_TYPE)
+            http_utils.assert_status_code(http_utils.status_codes[http_utils.OK], resp, ' ERROR - seeding the dataset')
+    print('* Dataset seeded: %d samples per attribute in %.2f seconds' % (args.samples, time.time() - start))
+
+
+def get_scenarios(samples):
+    """
+    Get the scenarios to run over a dataset with the given number of samples
+    :return: list of (name, attribute, query params) tuples. Each one is run against NGSIv1 and NGSIv2
+    """
+    number = NUMBER_ATTR + '_0'
+    text = TEXT_ATTR + '_0'
+    date_from = format_date(SEED_START)
+    date_to = format_date(SEED_START + timedelta(minutes=samples - 1))
+    date_middle = format_date(SEED_START + timedelta(minutes=samples // 2))
+    return [
+        ('lastN_10', number, {'lastN': 10}),
+        ('lastN_100', number, {'lastN': 100}),
+        ('hLimit_100_hOffset_0', number, {'hLimit': 100, 'hOffset': 0}),
+        ('hLimit_100_hOffset_middle', number, {'hLimit': 100, 'hOffset': samples // 2}),
+        ('dateFrom_dateTo_hLimit_100', number, {'dateFrom': date_middle, 'dateTo': date_to, 'hLimit': 100, 'hOffset': 0}),
+        ('count_hLimit_100', number, {'hLimit': 100, 'hOffset': 0, 'count': 'true'}),
+        ('filetype_csv', number, {'filetype': 'csv'}),
+        ('filetype_csv_dateFrom_dateTo', number, {'filetype': 'csv', 'dateFrom': date_middle, 'dateTo': date_to}),
+        ('aggr_sum_hour', number, {'aggrMethod': 'sum', 'aggrPeriod': 'hour'}),
+        ('aggr_all_minute', number, {'aggrMethod': 'all', 'aggrPeriod': 'minute'}),
+        (
+            'aggr_min_max_minute_dateFrom_dateTo',
+            number,
+            {'aggrMethod': 'min,max', 'aggrPeriod': 'minute', 'dateFrom': date_from, 'dateTo': date_middle},
+        ),
+        ('aggr_occur_hour', text, {'aggrMethod': 'occur', 'aggrPeriod': 'hour'}),
+    ]
+
+
+def get_url(args, version, attr_name):
+    """
+    :return: the URL of the GET endpoint of the given NGSI version
+    """
+    if version == 1:
+        return 'http://%s:%d/STH/v1/contextEntities/type/%s/id/%s/attributes/%s' % (
+            args.host,
+            args.port,
+            SEED_ENTITY_TYPE,
+            SEED_ENTITY_ID,
+            attr_name,
+        )
+    return 'http://%s:%d/STH/v2/entities/%s/attrs/%s' % (args.host, args.port, SEED_ENTITY_ID, attr_name)
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile
+    :param values: sorted values
+    :param p: percentile (0-100)
+    :return: percentile value
+    """
+    return values[max(0, min(len(values) - 1, int(round(p / 100.0 * len(values))) - 1))]
+
+
+def run_scenario(args, version, attr_name, params):
+    """
+    Run a scenario
+    :return: results dictionary (latencies in milliseconds, sizes in bytes)
+    """
+    url = get_url(args, version, attr_name)
+    params = dict(params)
+    if version == 2:
+        params['type'] = SEED_ENTITY_TYPE
+    headers = {
+        notification_utils.HEADER_TENANT: args.service,
+        notification_utils.HEADER_SERVICE_PATH: args.servicePath,
+        notification_utils.HEADER_ACCEPT: notification_utils.HEADER_APPLICATION + notification_utils.JSON,
+    }
+    latencies = []
+    sizes = set()
+    statuses = set()
+    for i in range(args.warmup + args.iterations):
+        start = time.perf_counter()
+        resp = http_utils.request(http_utils.GET, url=url, headers=headers, param=params)
+        elapsed = time.perf_counter() - start
+        if i >= args.warmup:
+            latencies.append(elapsed * 1000)
+            sizes.add(len(resp.content))
+            statuses.add(resp.status_code)
+    latencies.sort()
+    result = {
+        'status': sorted(statuses),
+        'size': max(sizes),
+        'min': latencies[0],
+        'max': latencies[-1],
+        'mean': sum(latencies) / len(latencies),
+    }
+    for p in PERCENTILES:
+        result['p%d' % p] = percentile(latencies, p)
+    return dict((k, round(v, 2) if isinstance(v, float) else v) for k, v in result.items())
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare the results with a baseline
+    :return: number of regressions found
+    """
+    regressions = 0
+    print('* Comparison with the baseline (threshold: %.1f%%)' % threshold)
+    for name, result in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None:
+            print('  + %s: not in the baseline' % name)
+            continue
+        messages = []
+        for key in ['p50', 'p95']:
+            if previous[key] > 0:
+                delta = (result[key] - previous[key]) * 100.0 / previous[key]
+                if delta > threshold:
+                    messages.append('%s %.2fms -> %.2fms (+%.1f%%)' % (key, previous[key], result[key], delta))
+        if result['size'] != previous['size']:
+            messages.append('size %d -> %d bytes' % (previous['size'], result['size']))
+        if result['status'] != previous['status']:
+            messages.append('status %s -> %s' % (previous['status'], result['status']))
+        if messages:
+            regressions += 1
+            print('  + %s: REGRESSION %s' % (name, ', '.join(messages)))
+    if regressions == 0:
+        print('  + No regressions')
+    return regressions
+
+
+def main():
+    args = parse_args()
+    if args.iterations <= 0 or args.samples <= 0:
+        sys.exit('ERROR: --iterations and --samples must be greater than 0')
+    if args.seed:
+        seed(args)
+
+    selected = args.scenarios.split(',') if args.scenarios else None
+    results = {}
+    print('* Running scenarios (%d iterations, %d warmup)' % (args.iterations, args.warmup))
+    for name, attr_name, params in get_scenarios(args.samples):
+        if selected is not None and name not in selected:
+            continue
+        for version in [1, 2]:
+            key = 'v%d_%s' % (version, name)
+            result = run_scenario(args, version, attr_name, params)
+            results[key] = result
+            print(
+                '  + %s: status=%s size=%dB p50=%.2fms p95=%.2fms p99=%.2fms max=%.2fms'
+                % (key, result['status'], result['size'], result['p50'], result['p95'], result['p99'], result['max'])
+            )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(
+                {'samples': args.samples, 'iterations': args.iterations, 'scenarios': results},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write('\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline['scenarios'], args.threshold) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
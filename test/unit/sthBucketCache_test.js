@@ -0,0 +1,120 @@
+/*
+ * Copyright 2026 Telefónica Investigación y Desarrollo, S.A.U
+ *
+ * This file is part of the Short Time Historic (STH) component
+ *
+ * STH is free software: you can redistribute it and/or
+ * modify it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the License,
+ * or (at your option) any later version.
+ *
+ * STH is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+ * See the GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public
+ * License along with STH.
+ * If not, see http://www.gnu.org/licenses/.
+ *
+ * For those usages not covered by the GNU Affero General Public License
+ * please contact with: [german.torodelvalle@telefonica.com]
+ */
+
+const ROOT_PATH = require('app-root-path');
+const clearRequire = require('clear-require');
+const expect = require('expect.js');
+
+const STH_CONFIGURATION_PATH = ROOT_PATH + '/lib/configuration/sthConfiguration.js';
+const STH_BUCKET_CACHE_PATH = ROOT_PATH + '/lib/database/sthBucketCache.js';
+const BUCKET_A = 'sth_test.sth_a.aggr{"_id.origin":"2026-01-01T00:00:00.000Z","_id.resolution":"hour"}';
+const BUCKET_B = 'sth_test.sth_b.aggr{"_id.origin":"2026-01-01T00:00:00.000Z","_id.resolution":"hour"}';
+const BUCKET_C = 'sth_other.sth_a.aggr{"_id.origin":"2026-01-01T00:00:00.000Z","_id.resolution":"hour"}';
+
+let sthConfig;
+let sthBucketCache;
+let originalValues;
+
+describe('sthBucketCache tests', function() {
+    before(function() {
+        clearRequire(STH_CONFIGURATION_PATH);
+        clearRequire(STH_BUCKET_CACHE_PATH);
+        sthConfig = require(STH_CONFIGURATION_PATH);
+        sthBucketCache = require(STH_BUCKET_CACHE_PATH);
+        originalValues = {
+            BUCKET_CACHE_SIZE: sthConfig.BUCKET_CACHE_SIZE,
+            BUCKET_CACHE_TTL: sthConfig.BUCKET_CACHE_TTL
+        };
+    });
+
+    beforeEach(function() {
+        sthConfig.BUCKET_CACHE_SIZE = 2;
+        sthConfig.BUCKET_CACHE_TTL = 3600;
+        sthBucketCache.clear();
+    });
+
+    after(function() {
+        Object.assign(sthConfig, originalValues);
+        sthBucketCache.clear();
+    });
+
+    it('should not cache anything if the cache is disabled', function() {
+        sthConfig.BUCKET_CACHE_SIZE = 0;
+        sthBucketCache.set(BUCKET_A);
+        expect(sthBucketCache.size).to.equal(0);
+        expect(sthBucketCache.has(BUCKET_A)).to.be(false);
+    });
+
+    it('should return true for a cached bucket', function() {
+        sthBucketCache.set(BUCKET_A);
+        expect(sthBucketCache.has(BUCKET_A)).to.be(true);
+        expect(sthBucketCache.has(BUCKET_B)).to.be(false);
+    });
+
+    it('should not return expired entries', function() {
+        sthConfig.BUCKET_CACHE_TTL = 0;
+        sthBucketCache.set(BUCKET_A);
+        expect(sthBucketCache.has(BUCKET_A)).to.be(false);
+        expect(sthBucketCache.size).to.equal(0);
+    });
+
+    it('should not keep an entry beyond its maximum expiration time', function() {
+        sthBucketCache.set(BUCKET_A, Date.now() - 1);
+        expect(sthBucketCache.has(BUCKET_A)).to.be(false);
+    });
+
+    it('should evict the least recently used entry when full', function() {
+        sthBucketCache.set(BUCKET_A);
+        sthBucketCache.set(BUCKET_B);
+        sthBucketCache.has(BUCKET_A);
+        sthBucketCache.set(BUCKET_C);
+        expect(sthBucketCache.size).to.equal(2);
+        expect(sthBucketCache.has(BUCKET_A)).to.be(true);
+        expect(sthBucketCache.has(BUCKET_B)).to.be(false);
+        expect(sthBucketCache.has(BUCKET_C)).to.be(true);
+    });
+
+    it('should invalidate a bucket', function() {
+        sthBucketCache.set(BUCKET_A);
+        sthBucketCache.set(BUCKET_B);
+        sthBucketCache.invalidate(BUCKET_A);
+        expect(sthBucketCache.has(BUCKET_A)).to.be(false);
+        expect(sthBucketCache.has(BUCKET_B)).to.be(true);
+    });
+
+    it('should invalidate all the buckets of a collection', function() {
+        sthBucketCache.set(BUCKET_A);
+        sthBucketCache.set(BUCKET_B);
+        sthBucketCache.invalidatePrefix('sth_test.sth_a.aggr{');
+        expect(sthBucketCache.has(BUCKET_A)).to.be(false);
+        expect(sthBucketCache.has(BUCKET_B)).to.be(true);
+    });
+
+    it('should invalidate all the buckets of a database', function() {
+        sthBucketCache.set(BUCKET_A);
+        sthBucketCache.set(BUCKET_C);
+        sthBucketCache.invalidatePrefix('sth_test.');
+        expect(sthBucketCache.has(BUCKET_A)).to.be(false);
+        expect(sthBucketCache.has(BUCKET_C)).to.be(true);
+    });
+});
@@ -0,0 +1,125 @@
+/*
+ * Copyright 2026 Telefónica Investigación y Desarrollo, S.A.U
+ *
+ * This file is part of the Short Time Historic (STH) component
+ *
+ * STH is free software: you can redistribute it and/or
+ * modify it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the License,
+ * or (at your option) any later version.
+ *
+ * STH is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+ * See the GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public
+ * License along with STH.
+ * If not, see http://www.gnu.org/licenses/.
+ *
+ * For those usages not covered by the GNU Affero General Public License
+ * please contact with: [german.torodelvalle@telefonica.com]
+ */
+
+const ROOT_PATH = require('app-root-path');
+const clearRequire = require('clear-require');
+const expect = require('expect.js');
+
+const STH_CONFIGURATION_PATH = ROOT_PATH + '/lib/configuration/sthConfiguration.js';
+const STH_COLLECTION_CACHE_PATH = ROOT_PATH + '/lib/database/sthCollectionCache.js';
+const DATABASE_NAME = 'sth_test';
+const OTHER_DATABASE_NAME = 'sth_other';
+const NOT_EXISTS_ERROR = new Error('Collection sth_missing does not exist. Currently in strict mode.');
+
+let sthConfig;
+let sthCollectionCache;
+let originalValues;
+
+describe('sthCollectionCache tests', function() {
+    before(function() {
+        clearRequire(STH_CONFIGURATION_PATH);
+        clearRequire(STH_COLLECTION_CACHE_PATH);
+        sthConfig = require(STH_CONFIGURATION_PATH);
+        sthCollectionCache = require(STH_COLLECTION_CACHE_PATH);
+        originalValues = {
+            COLLECTION_CACHE_SIZE: sthConfig.COLLECTION_CACHE_SIZE,
+            COLLECTION_CACHE_TTL: sthConfig.COLLECTION_CACHE_TTL,
+            COLLECTION_CACHE_NEGATIVE_TTL: sthConfig.COLLECTION_CACHE_NEGATIVE_TTL
+        };
+    });
+
+    beforeEach(function() {
+        sthConfig.COLLECTION_CACHE_SIZE = 2;
+        sthConfig.COLLECTION_CACHE_TTL = 60;
+        sthConfig.COLLECTION_CACHE_NEGATIVE_TTL = 5;
+        sthCollectionCache.clear();
+    });
+
+    after(function() {
+        Object.assign(sthConfig, originalValues);
+        sthCollectionCache.clear();
+    });
+
+    it('should not cache anything if the cache is disabled', function() {
+        sthConfig.COLLECTION_CACHE_SIZE = 0;
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_a', { name: 'sth_a' });
+        expect(sthCollectionCache.size).to.equal(0);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_a')).to.be(undefined);
+    });
+
+    it('should return the cached collection', function() {
+        const collection = { name: 'sth_a' };
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_a', collection);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_a').collection).to.be(collection);
+        expect(sthCollectionCache.get(OTHER_DATABASE_NAME, 'sth_a')).to.be(undefined);
+    });
+
+    it('should return the cached error of a non existent collection', function() {
+        sthCollectionCache.setMissing(DATABASE_NAME, 'sth_missing', NOT_EXISTS_ERROR);
+        const entry = sthCollectionCache.get(DATABASE_NAME, 'sth_missing');
+        expect(entry.collection).to.be(undefined);
+        expect(entry.error).to.be(NOT_EXISTS_ERROR);
+    });
+
+    it('should not return expired entries', function() {
+        sthConfig.COLLECTION_CACHE_NEGATIVE_TTL = 0;
+        sthCollectionCache.setMissing(DATABASE_NAME, 'sth_missing', NOT_EXISTS_ERROR);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_missing')).to.be(undefined);
+        expect(sthCollectionCache.size).to.equal(0);
+    });
+
+    it('should replace a non existent collection entry once the collection is created', function() {
+        const collection = { name: 'sth_missing' };
+        sthCollectionCache.setMissing(DATABASE_NAME, 'sth_missing', NOT_EXISTS_ERROR);
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_missing', collection);
+        expect(sthCollectionCache.size).to.equal(1);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_missing').collection).to.be(collection);
+    });
+
+    it('should evict the least recently used entry when full', function() {
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_a', { name: 'sth_a' });
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_b', { name: 'sth_b' });
+        sthCollectionCache.get(DATABASE_NAME, 'sth_a');
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_c', { name: 'sth_c' });
+        expect(sthCollectionCache.size).to.equal(2);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_a')).not.to.be(undefined);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_b')).to.be(undefined);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_c')).not.to.be(undefined);
+    });
+
+    it('should invalidate a collection', function() {
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_a', { name: 'sth_a' });
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_b', { name: 'sth_b' });
+        sthCollectionCache.invalidate(DATABASE_NAME, 'sth_a');
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_a')).to.be(undefined);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_b')).not.to.be(undefined);
+    });
+
+    it('should invalidate all the collections of a database', function() {
+        sthCollectionCache.setCollection(DATABASE_NAME, 'sth_a', { name: 'sth_a' });
+        sthCollectionCache.setCollection(OTHER_DATABASE_NAME, 'sth_a', { name: 'sth_a' });
+        sthCollectionCache.invalidateDatabase(DATABASE_NAME);
+        expect(sthCollectionCache.get(DATABASE_NAME, 'sth_a')).to.be(undefined);
+        expect(sthCollectionCache.get(OTHER_DATABASE_NAME, 'sth_a')).not.to.be(undefined);
+    });
+});
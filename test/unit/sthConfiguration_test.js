@@ -37,6 +37,7 @@ const DEFAULT_VALUES = {
     DEFAULT_SERVICE_PATH: '/testservicepath',
     AGGREGATION_BY: ['day', 'hour', 'minute'],
     TEMPORAL_DIR: 'temp',
+    STREAM_RAW_DATA: false,
     DATA_MODEL: 'collection-per-entity',
     DB_USERNAME: '',
     DB_PASSWORD: '',
@@ -51,6 +52,17 @@ const DEFAULT_VALUES = {
     TRUNCATION_SIZE: 0,
     TRUNCATION_MAX: 0,
     IGNORE_BLANK_SPACES: true,
+    COLLECTION_CACHE_SIZE: 0,
+    COLLECTION_CACHE_TTL: 60,
+    COLLECTION_CACHE_NEGATIVE_TTL: 5,
+    BULK_WRITE: false,
+    AGGREGATE_SINGLE_UPDATE: false,
+    AGGREGATION_BUFFER_INTERVAL: 0,
+    AGGREGATION_BUFFER_SIZE: 10000,
+    FAST_INSERT: false,
+    FAST_INSERT_RECENT_KEYS: 10000,
+    BUCKET_CACHE_SIZE: 0,
+    BUCKET_CACHE_TTL: 3600,
     NAME_ENCODING: false,
     PROOF_OF_LIFE_INTERVAL: 60,
     PROCESSED_REQUEST_LOG_STATISTICS_INTERVAL: 60
@@ -114,6 +126,12 @@ describe('sthConfiguration tests', function() {
             });
         }
 
+        if (Object.keys(process.env).indexOf('STREAM_RAW_DATA') === -1) {
+            it('should set the raw data streaming configuration parameter to its default value', function() {
+                expect(sthConfig.STREAM_RAW_DATA).to.equal(DEFAULT_VALUES.STREAM_RAW_DATA);
+            });
+        }
+
         if (Object.keys(process.env).indexOf('DATA_MODEL') === -1) {
             it('should set the data model configuration parameter to its default value', function() {
                 expect(sthConfig.DATA_MODEL).to.equal(DEFAULT_VALUES.DATA_MODEL);
@@ -200,6 +218,72 @@ describe('sthConfiguration tests', function() {
             });
         }
 
+        if (Object.keys(process.env).indexOf('COLLECTION_CACHE_SIZE') === -1) {
+            it('should set the database collection cache size configuration parameter to its default value', function() {
+                expect(sthConfig.COLLECTION_CACHE_SIZE).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_SIZE);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('COLLECTION_CACHE_TTL') === -1) {
+            it('should set the database collection cache time to live configuration parameter to its default value', function() {
+                expect(sthConfig.COLLECTION_CACHE_TTL).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_TTL);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('COLLECTION_CACHE_NEGATIVE_TTL') === -1) {
+            it('should set the database collection cache negative time to live configuration parameter to its default value', function() {
+                expect(sthConfig.COLLECTION_CACHE_NEGATIVE_TTL).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_NEGATIVE_TTL);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('BULK_WRITE') === -1) {
+            it('should set the database bulk write configuration parameter to its default value', function() {
+                expect(sthConfig.BULK_WRITE).to.equal(DEFAULT_VALUES.BULK_WRITE);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('AGGREGATE_SINGLE_UPDATE') === -1) {
+            it('should set the database aggregate single update configuration parameter to its default value', function() {
+                expect(sthConfig.AGGREGATE_SINGLE_UPDATE).to.equal(DEFAULT_VALUES.AGGREGATE_SINGLE_UPDATE);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('AGGREGATION_BUFFER_INTERVAL') === -1) {
+            it('should set the database aggregation buffer interval configuration parameter to its default value', function() {
+                expect(sthConfig.AGGREGATION_BUFFER_INTERVAL).to.equal(DEFAULT_VALUES.AGGREGATION_BUFFER_INTERVAL);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('AGGREGATION_BUFFER_SIZE') === -1) {
+            it('should set the database aggregation buffer size configuration parameter to its default value', function() {
+                expect(sthConfig.AGGREGATION_BUFFER_SIZE).to.equal(DEFAULT_VALUES.AGGREGATION_BUFFER_SIZE);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('FAST_INSERT') === -1) {
+            it('should set the database fast insert configuration parameter to its default value', function() {
+                expect(sthConfig.FAST_INSERT).to.equal(DEFAULT_VALUES.FAST_INSERT);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('FAST_INSERT_RECENT_KEYS') === -1) {
+            it('should set the database fast insert recent keys configuration parameter to its default value', function() {
+                expect(sthConfig.FAST_INSERT_RECENT_KEYS).to.equal(DEFAULT_VALUES.FAST_INSERT_RECENT_KEYS);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('BUCKET_CACHE_SIZE') === -1) {
+            it('should set the database bucket cache size configuration parameter to its default value', function() {
+                expect(sthConfig.BUCKET_CACHE_SIZE).to.equal(DEFAULT_VALUES.BUCKET_CACHE_SIZE);
+            });
+        }
+
+        if (Object.keys(process.env).indexOf('BUCKET_CACHE_TTL') === -1) {
+            it('should set the database bucket cache time to live configuration parameter to its default value', function() {
+                expect(sthConfig.BUCKET_CACHE_TTL).to.equal(DEFAULT_VALUES.BUCKET_CACHE_TTL);
+            });
+        }
+
         if (Object.keys(process.env).indexOf('NAME_ENCODING') === -1) {
             it('should set the database name encoding configuration parameter to its default value', function() {
                 expect(sthConfig.NAME_ENCODING).to.equal(DEFAULT_VALUES.NAME_ENCODING);
@@ -376,6 +460,22 @@ describe('sthConfiguration tests', function() {
             expect(sthConfig.TEMPORAL_DIR).to.equal(DEFAULT_VALUES.TEMPORAL_DIR);
         });
 
+        it("should set the raw data streaming configuration parameter to 'true'", function() {
+            process.env.STREAM_RAW_DATA = 'true';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.STREAM_RAW_DATA).to.equal(true);
+        });
+
+        it(
+            'should set the raw data streaming configuration parameter to the default value ' +
+                'if not set via STREAM_RAW_DATA',
+            function() {
+                delete process.env.STREAM_RAW_DATA;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.STREAM_RAW_DATA).to.equal(DEFAULT_VALUES.STREAM_RAW_DATA);
+            }
+        );
+
         it("should set the data model configuration parameter to 'collection-per-service-path'", function() {
             process.env.DATA_MODEL = 'collection-per-service-path';
             sthConfig = require(STH_CONFIGURATION_PATH);
@@ -658,6 +758,280 @@ describe('sthConfiguration tests', function() {
             }
         );
 
+        it("should set the database collection cache size configuration parameter to '500'", function() {
+            process.env.COLLECTION_CACHE_SIZE = '500';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.COLLECTION_CACHE_SIZE).to.equal(500);
+        });
+
+        it(
+            'should set the database collection cache size configuration parameter to the default value ' +
+                'if not set via COLLECTION_CACHE_SIZE',
+            function() {
+                delete process.env.COLLECTION_CACHE_SIZE;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.COLLECTION_CACHE_SIZE).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_SIZE);
+            }
+        );
+
+        it(
+            'should set the database collection cache size configuration parameter to the default value ' +
+                'if set to an invalid value',
+            function() {
+                process.env.COLLECTION_CACHE_SIZE = 'not-a-number';
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.COLLECTION_CACHE_SIZE).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_SIZE);
+            }
+        );
+
+        it("should set the database collection cache time to live configuration parameter to '30'", function() {
+            process.env.COLLECTION_CACHE_TTL = '30';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.COLLECTION_CACHE_TTL).to.equal(30);
+        });
+
+        it(
+            'should set the database collection cache time to live configuration parameter to the default value ' +
+                'if not set via COLLECTION_CACHE_TTL',
+            function() {
+                delete process.env.COLLECTION_CACHE_TTL;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.COLLECTION_CACHE_TTL).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_TTL);
+            }
+        );
+
+        it(
+            'should set the database collection cache time to live configuration parameter to the default value ' +
+                'if set to an invalid value',
+            function() {
+                process.env.COLLECTION_CACHE_TTL = 'not-a-number';
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.COLLECTION_CACHE_TTL).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_TTL);
+            }
+        );
+
+        it("should set the database collection cache negative time to live configuration parameter to '10'", function() {
+            process.env.COLLECTION_CACHE_NEGATIVE_TTL = '10';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.COLLECTION_CACHE_NEGATIVE_TTL).to.equal(10);
+        });
+
+        it(
+            'should set the database collection cache negative time to live configuration parameter to the default value ' +
+                'if not set via COLLECTION_CACHE_NEGATIVE_TTL',
+            function() {
+                delete process.env.COLLECTION_CACHE_NEGATIVE_TTL;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.COLLECTION_CACHE_NEGATIVE_TTL).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_NEGATIVE_TTL);
+            }
+        );
+
+        it(
+            'should set the database collection cache negative time to live configuration parameter to the default value ' +
+                'if set to an invalid value',
+            function() {
+                process.env.COLLECTION_CACHE_NEGATIVE_TTL = 'not-a-number';
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.COLLECTION_CACHE_NEGATIVE_TTL).to.equal(DEFAULT_VALUES.COLLECTION_CACHE_NEGATIVE_TTL);
+            }
+        );
+
+        it("should set the database bulk write configuration parameter to 'true'", function() {
+            process.env.BULK_WRITE = 'true';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.BULK_WRITE).to.equal(true);
+        });
+
+        it(
+            'should set the database bulk write configuration parameter to the default value ' +
+                'if not set via BULK_WRITE',
+            function() {
+                delete process.env.BULK_WRITE;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.BULK_WRITE).to.equal(DEFAULT_VALUES.BULK_WRITE);
+            }
+        );
+
+        it("should set the database aggregate single update configuration parameter to 'true'", function() {
+            process.env.AGGREGATE_SINGLE_UPDATE = 'true';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.AGGREGATE_SINGLE_UPDATE).to.equal(true);
+        });
+
+        it(
+            'should set the database aggregate single update configuration parameter to the default value ' +
+                'if not set via AGGREGATE_SINGLE_UPDATE',
+            function() {
+                delete process.env.AGGREGATE_SINGLE_UPDATE;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.AGGREGATE_SINGLE_UPDATE).to.equal(DEFAULT_VALUES.AGGREGATE_SINGLE_UPDATE);
+            }
+        );
+
+        it("should set the database aggregation buffer interval configuration parameter to '500'", function() {
+            process.env.AGGREGATION_BUFFER_INTERVAL = '500';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.AGGREGATION_BUFFER_INTERVAL).to.equal(500);
+        });
+
+        it(
+            'should set the database aggregation buffer interval configuration parameter to the default value ' +
+                'if not set via AGGREGATION_BUFFER_INTERVAL',
+            function() {
+                delete process.env.AGGREGATION_BUFFER_INTERVAL;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.AGGREGATION_BUFFER_INTERVAL).to.equal(DEFAULT_VALUES.AGGREGATION_BUFFER_INTERVAL);
+            }
+        );
+
+        it(
+            'should set the database aggregation buffer interval configuration parameter to the default value ' +
+                'if set to an invalid value',
+            function() {
+                process.env.AGGREGATION_BUFFER_INTERVAL = 'not-a-number';
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.AGGREGATION_BUFFER_INTERVAL).to.equal(DEFAULT_VALUES.AGGREGATION_BUFFER_INTERVAL);
+            }
+        );
+
+        it("should set the database aggregation buffer size configuration parameter to '500'", function() {
+            process.env.AGGREGATION_BUFFER_SIZE = '500';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.AGGREGATION_BUFFER_SIZE).to.equal(500);
+        });
+
+        it(
+            'should set the database aggregation buffer size configuration parameter to the default value ' +
+                'if not set via AGGREGATION_BUFFER_SIZE',
+            function() {
+                delete process.env.AGGREGATION_BUFFER_SIZE;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.AGGREGATION_BUFFER_SIZE).to.equal(DEFAULT_VALUES.AGGREGATION_BUFFER_SIZE);
+            }
+        );
+
+        it(
+            'should set the database aggregation buffer size configuration parameter to the default value ' +
+                'if set to an invalid value',
+            function() {
+                process.env.AGGREGATION_BUFFER_SIZE = 'not-a-number';
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.AGGREGATION_BUFFER_SIZE).to.equal(DEFAULT_VALUES.AGGREGATION_BUFFER_SIZE);
+            }
+        );
+
+        it("should set the database fast insert configuration parameter to 'true'", function() {
+            process.env.FAST_INSERT = 'true';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.FAST_INSERT).to.equal(true);
+        });
+
+        it(
+            'should set the database fast insert configuration parameter to the default value ' +
+                'if not set via FAST_INSERT',
+            function() {
+                delete process.env.FAST_INSERT;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.FAST_INSERT).to.equal(DEFAULT_VALUES.FAST_INSERT);
+            }
+        );
+
+        it("should set the database fast insert configuration parameter to 'false' if the write concern is '0'", function() {
+            process.env.FAST_INSERT = 'true';
+            process.env.WRITE_CONCERN = '0';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            delete process.env.FAST_INSERT;
+            delete process.env.WRITE_CONCERN;
+            expect(sthConfig.FAST_INSERT).to.equal(false);
+        });
+
+        it("should set the database fast insert recent keys configuration parameter to '0'", function() {
+            process.env.FAST_INSERT_RECENT_KEYS = '0';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.FAST_INSERT_RECENT_KEYS).to.equal(0);
+        });
+
+        it(
+            'should set the database fast insert recent keys configuration parameter to the default value ' +
+                'if not set via FAST_INSERT_RECENT_KEYS',
+            function() {
+                delete process.env.FAST_INSERT_RECENT_KEYS;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.FAST_INSERT_RECENT_KEYS).to.equal(DEFAULT_VALUES.FAST_INSERT_RECENT_KEYS);
+            }
+        );
+
+        it(
+            'should set the database fast insert recent keys configuration parameter to the default value ' +
+                'if set to an invalid value',
+            function() {
+                process.env.FAST_INSERT_RECENT_KEYS = 'not-a-number';
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.FAST_INSERT_RECENT_KEYS).to.equal(DEFAULT_VALUES.FAST_INSERT_RECENT_KEYS);
+            }
+        );
+
+        it("should set the database bucket cache size configuration parameter to '500'", function() {
+            process.env.BUCKET_CACHE_SIZE = '500';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.BUCKET_CACHE_SIZE).to.equal(500);
+        });
+
+        it(
+            'should set the database bucket cache size configuration parameter to the default value ' +
+                'if not set via BUCKET_CACHE_SIZE',
+            function() {
+                delete process.env.BUCKET_CACHE_SIZE;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.BUCKET_CACHE_SIZE).to.equal(DEFAULT_VALUES.BUCKET_CACHE_SIZE);
+            }
+        );
+
+        it(
+            'should set the database bucket cache size configuration parameter to the default value ' +
+                'if set to an invalid value',
+            function() {
+                process.env.BUCKET_CACHE_SIZE = 'not-a-number';
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.BUCKET_CACHE_SIZE).to.equal(DEFAULT_VALUES.BUCKET_CACHE_SIZE);
+            }
+        );
+
+        it("should set the database bucket cache size configuration parameter to '0' if the write concern is '0'", function() {
+            process.env.BUCKET_CACHE_SIZE = '500';
+            process.env.WRITE_CONCERN = '0';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            delete process.env.BUCKET_CACHE_SIZE;
+            delete process.env.WRITE_CONCERN;
+            expect(sthConfig.BUCKET_CACHE_SIZE).to.equal(0);
+        });
+
+        it("should set the database bucket cache time to live configuration parameter to '500'", function() {
+            process.env.BUCKET_CACHE_TTL = '500';
+            sthConfig = require(STH_CONFIGURATION_PATH);
+            expect(sthConfig.BUCKET_CACHE_TTL).to.equal(500);
+        });
+
+        it(
+            'should set the database bucket cache time to live configuration parameter to the default value ' +
+                'if not set via BUCKET_CACHE_TTL',
+            function() {
+                delete process.env.BUCKET_CACHE_TTL;
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.BUCKET_CACHE_TTL).to.equal(DEFAULT_VALUES.BUCKET_CACHE_TTL);
+            }
+        );
+
+        it(
+            'should set the database bucket cache time to live configuration parameter to the default value ' +
+                'if set to an invalid value',
+            function() {
+                process.env.BUCKET_CACHE_TTL = 'not-a-number';
+                sthConfig = require(STH_CONFIGURATION_PATH);
+                expect(sthConfig.BUCKET_CACHE_TTL).to.equal(DEFAULT_VALUES.BUCKET_CACHE_TTL);
+            }
+        );
+
         it("should set the database name encoding configuration parameter to 'false'", function() {
             process.env.NAME_ENCODING = 'false';
             sthConfig = require(STH_CONFIGURATION_PATH);
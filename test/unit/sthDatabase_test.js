@@ -32,6 +32,7 @@ const sthUtils = require(ROOT_PATH + '/lib/utils/sthUtils');
 const sthTestConfig = require(ROOT_PATH + '/test/unit/sthTestConfiguration');
 const expect = require('expect.js');
 const _ = require('lodash');
+const stream = require('stream');
 
 const DATABASE_NAME = sthDatabaseNaming.getDatabaseName(sthConfig.DEFAULT_SERVICE);
 const DATABASE_CONNECTION_PARAMS = {
@@ -83,6 +84,7 @@ const VERY_LONG_COLLECTION_NAME_PARAMS = {
 const DATE = new Date(Date.UTC(1970, 1, 3, 4, 5, 6, 777));
 const DELAY = 100;
 const LIMIT = 10;
+const LAST_N = 2;
 const PAGINATION = 0;
 const ATTRIBUTE = {
     VALUE: {
@@ -311,6 +313,8 @@ function getQuery4ExpectDataStored(dataType, aggregation) {
  *                               - {string} aggregation        The aggregation type
  *                               - {string} dataType           The data type
  *                               - {string} limit              The number of results limit
+ *                               - {number} lastN              The number of last results requested, if any
+ *                               - {string} filetype           The file type requested, if any
  *                               - {string} resolution         The resolution, if any
  *                               - {string} aggregatedFunction The resolution, if any
  * @param  {number} count      The number of stored data entries
@@ -318,9 +322,32 @@ function getQuery4ExpectDataStored(dataType, aggregation) {
  * @param  {Function} callback The callback
  */
 function expectResult(params, count, result, callback) {
-    if (!Array.isArray(result)) {
-        expect(typeof result).to.be('string');
-        return callback();
+    if (result instanceof stream && !params.filetype) {
+        // Raw data documents
+        const docs = [];
+        return result
+            .on('data', function(doc) {
+                docs.push(doc);
+            })
+            .on('error', callback)
+            .on('end', function() {
+                expectResult(params, count, docs, callback);
+            });
+    }
+    if (result instanceof stream) {
+        // CSV contents, including a header line
+        let csv = '';
+        return result
+            .on('data', function(chunk) {
+                csv += chunk;
+            })
+            .on('error', callback)
+            .on('end', function() {
+                expect(csv.trim().split(/\r?\n/).length).to.equal(
+                    (params.limit ? Math.min(params.limit, count) : count) + 1
+                );
+                callback();
+            });
     }
     if (count === 0) {
         expect(result.length).to.be(0);
@@ -328,7 +355,9 @@ function expectResult(params, count, result, callback) {
     }
     if (params.dataType === sthTestConfig.DATA_TYPES.RAW) {
         expect(result.length).to.equal(params.limit ? Math.min(params.limit, count) : count);
-        for (let i = 0; i < count; i++) {
+        // Only the last entries are returned when using lastN
+        const first = params.lastN ? count - result.length : 0;
+        for (let i = 0; i < result.length; i++) {
             switch (sthConfig.DATA_MODEL) {
                 case sthConfig.DATA_MODELS.COLLECTION_PER_SERVICE_PATH:
                     if (params.collection) {
@@ -343,7 +372,7 @@ function expectResult(params, count, result, callback) {
                     expect(result[i].attrType).to.equal(STORE_DATA_PARAMS.attribute.type);
                 /* falls through */
                 case sthConfig.DATA_MODELS.COLLECTION_PER_ATTRIBUTE:
-                    expect(result[i].recvTime.getTime()).to.equal(DATE.getTime() + i * DELAY);
+                    expect(result[i].recvTime.getTime()).to.equal(DATE.getTime() + (first + i) * DELAY);
                     expect(result[i].attrValue).to.equal(
                         params.aggregation === sthConfig.AGGREGATIONS.NUMERIC
                             ? ATTRIBUTE.VALUE.NUMERIC
@@ -381,6 +410,10 @@ function expectResult(params, count, result, callback) {
                     sthUtils.getOffset(result[j]._id.resolution, STORE_DATA_PARAMS.recvTime)
                 );
                 expect(point.samples).to.equal(count);
+                if (params.shouldFilter) {
+                    // All the entries were stored with the same date
+                    expect(result[j].points.length).to.equal(1);
+                }
                 switch (params.aggregatedFunction) {
                     case 'sum':
                         expect(point.sum).to.equal(ATTRIBUTE.VALUE.NUMERIC * count);
@@ -757,10 +790,14 @@ function retrievalTest(params, options, count, done) {
                     retrievalDataParams.lastN = options.lastN;
                     retrievalDataParams.hLimit = options.hLimit;
                     retrievalDataParams.hOffset = options.hOffset;
+                    retrievalDataParams.hToken = options.hToken;
                     retrievalDataParams.from = options.dateFrom;
                     retrievalDataParams.to = options.dateTo;
                     retrievalDataParams.filetype = options.filetype;
+                    retrievalDataParams.shouldStream = options.shouldStream;
                     params.limit = options.lastN || options.hLimit;
+                    params.lastN = options.lastN;
+                    params.filetype = options.filetype;
                 }
                 sthDatabase.getRawData(retrievalDataParams, function(err, results) {
                     if (err) {
@@ -774,6 +811,8 @@ function retrievalTest(params, options, count, done) {
                     retrievalDataParams.resolution = options.aggrPeriod;
                     retrievalDataParams.from = options.dateFrom;
                     retrievalDataParams.to = options.dateTo;
+                    retrievalDataParams.shouldFilter = options.shouldFilter;
+                    params.shouldFilter = options.shouldFilter;
                     params.aggregatedFunction = options.aggrMethod;
                     params.resolution = options.aggrPeriod;
                 }
@@ -826,6 +865,56 @@ function shouldRetrieveTests(count, aggregation, dataType) {
             )
         );
 
+        //prettier-ignore
+        it('should retrieve the last ' + LAST_N + ' ' + aggregation + ' ' + dataType + ' data with lastN if ' + count +
+            ' data is inserted',
+            retrievalTest.bind(
+                null,
+                {
+                    aggregation,
+                    dataType
+                },
+                {
+                    lastN: LAST_N
+                },
+                count
+            )
+        );
+
+        //prettier-ignore
+        it('should retrieve the last ' + LAST_N + ' ' + aggregation + ' ' + dataType + ' data with lastN and ' +
+            'streaming enabled if ' + count + ' data is inserted',
+            retrievalTest.bind(
+                null,
+                {
+                    aggregation,
+                    dataType
+                },
+                {
+                    lastN: LAST_N,
+                    shouldStream: true
+                },
+                count
+            )
+        );
+
+        //prettier-ignore
+        it('should stream ' + count + ' ' + aggregation + ' ' + dataType + ' data with lastN set to 0 if ' + count +
+            ' data is inserted',
+            retrievalTest.bind(
+                null,
+                {
+                    aggregation,
+                    dataType
+                },
+                {
+                    lastN: 0,
+                    shouldStream: true
+                },
+                count
+            )
+        );
+
         //prettier-ignore
         it('should retrieve ' + count + ' ' + aggregation + ' ' + dataType + ' data with hLimit and hOffset if ' + 
             count + ' data is inserted',
@@ -843,6 +932,23 @@ function shouldRetrieveTests(count, aggregation, dataType) {
             )
         );
 
+        //prettier-ignore
+        it('should retrieve ' + count + ' ' + aggregation + ' ' + dataType + ' data with hLimit and hToken if ' + 
+            count + ' data is inserted',
+            retrievalTest.bind(
+                null,
+                {
+                    aggregation,
+                    dataType
+                },
+                {
+                    hLimit: LIMIT,
+                    hToken: { recvTime: new Date(0), id: '000000000000000000000000' }
+                },
+                count
+            )
+        );
+
         //prettier-ignore
         it('should retrieve ' + count + ' ' + aggregation + ' ' + dataType + ' data with dateFrom if ' + count + 
             ' data is inserted',
@@ -922,6 +1028,23 @@ function shouldRetrieveTests(count, aggregation, dataType) {
                 count
             )
         );
+
+        //prettier-ignore
+        it('should retrieve the last ' + LAST_N + ' ' + aggregation + ' ' + dataType + ' data with csv and lastN if ' +
+            count + ' data is inserted',
+            retrievalTest.bind(
+                null,
+                {
+                    aggregation,
+                    dataType
+                },
+                {
+                    filetype: 'csv',
+                    lastN: LAST_N
+                },
+                count
+            )
+        );
     } else {
         sthConfig.AGGREGATION_BY.forEach(function(aggregationBy) {
             if (aggregation === sthConfig.AGGREGATIONS.NUMERIC) {
@@ -942,6 +1065,25 @@ function shouldRetrieveTests(count, aggregation, dataType) {
                     )
                 );
 
+                //prettier-ignore
+                it('should retrieve ' + count + ' ' + aggregation + ' ' + dataType + ' data for a resolution of ' + 
+                    aggregationBy + ' and an aggregation method of sum filtering out the empty points if ' + count + 
+                    ' data is inserted',
+                    retrievalTest.bind(
+                        null,
+                        {
+                            aggregation,
+                            dataType
+                        },
+                        {
+                            aggrMethod: 'sum',
+                            aggrPeriod: aggregationBy,
+                            shouldFilter: true
+                        },
+                        count
+                    )
+                );
+
                 //prettier-ignore
                 it('should retrieve ' + count + ' ' + aggregation + ' ' + dataType + ' data for a resolution of ' + 
                     aggregationBy + ' and an aggregation method of sum with dataFrom set if ' + count + 
@@ -1114,6 +1256,120 @@ function retrievalTests() {
     });
 }
 
+/**
+ * Set of tests to paginate raw data with the same recvTime
+ */
+function paginationTests() {
+    const PAGINATION_COLLECTION_NAME_PARAMS = _.assign({}, COLLECTION_NAME_PARAMS, {
+        attrName: sthTestConfig.ATTRIBUTE_NAME + 'Pagination'
+    });
+    const PAGINATION_ENTRIES = 5;
+    const PAGE_SIZE = 2;
+    let collection;
+
+    /**
+     * Retrieves the pages of raw data from certain offset on, following the tokens of the next pages
+     * @param  {number}   hOffset  The offset of the first page
+     * @param  {Function} callback The callback, called with the error and the attribute values of all the pages
+     */
+    function getPages(hOffset, callback) {
+        const values = [];
+
+        function getPage(params) {
+            sthDatabase.getRawData(
+                _.assign(
+                    {
+                        collection,
+                        entityId: sthTestConfig.ENTITY_ID,
+                        entityType: sthTestConfig.ENTITY_TYPE,
+                        attrName: PAGINATION_COLLECTION_NAME_PARAMS.attrName,
+                        hLimit: PAGE_SIZE
+                    },
+                    params
+                ),
+                function(err, results, totalCount, nextPage) {
+                    if (err) {
+                        return callback(err);
+                    }
+                    results.forEach(function(result) {
+                        expect(result).not.to.have.key('_id');
+                        values.push(result.attrValue);
+                    });
+                    if (!nextPage) {
+                        return callback(null, values);
+                    }
+                    getPage({ hToken: nextPage });
+                }
+            );
+        }
+
+        getPage({ hOffset });
+    }
+
+    before(function(done) {
+        sthDatabase.getCollection(
+            PAGINATION_COLLECTION_NAME_PARAMS,
+            {
+                shouldCreate: true,
+                isAggregated: false,
+                shouldTruncate: false
+            },
+            function(err, result) {
+                if (err) {
+                    return done(err);
+                }
+                collection = result;
+                let stored = 0;
+                // All the entries share the same recvTime, so the pages are sorted by _id (the storing order)
+                (function storeEntry() {
+                    if (stored === PAGINATION_ENTRIES) {
+                        return done();
+                    }
+                    sthDatabase.storeRawData(
+                        {
+                            collection,
+                            recvTime: DATE,
+                            entityId: sthTestConfig.ENTITY_ID,
+                            entityType: sthTestConfig.ENTITY_TYPE,
+                            attribute: {
+                                name: PAGINATION_COLLECTION_NAME_PARAMS.attrName,
+                                type: sthTestConfig.ATTRIBUTE_TYPE,
+                                value: String(stored++)
+                            }
+                        },
+                        function(err) {
+                            if (err) {
+                                return done(err);
+                            }
+                            storeEntry();
+                        }
+                    );
+                })();
+            }
+        );
+    });
+
+    after(function(done) {
+        dropCollection(PAGINATION_COLLECTION_NAME_PARAMS, sthTestConfig.DATA_TYPES.RAW, sthConfig.DATA_MODEL, done);
+    });
+
+    it('should retrieve all the entries with the same recvTime once following the page tokens', function(done) {
+        getPages(0, function(err, values) {
+            expect(err).to.equal(null);
+            expect(values).to.eql(['0', '1', '2', '3', '4']);
+            done();
+        });
+    });
+
+    it('should retrieve the entries with the same recvTime once following the page tokens from an offset', function(done) {
+        getPages(1, function(err, values) {
+            expect(err).to.equal(null);
+            expect(values).to.eql(['1', '2', '3', '4']);
+            done();
+        });
+    });
+}
+
 describe('sthDatabase tests', function() {
     this.timeout(5000);
     describe('database connection', function() {
@@ -1185,6 +1441,306 @@ describe('sthDatabase tests', function() {
             );
         });
 
+        it('should return the aggregated data upsert condition without the point offset', function() {
+            const condition = sthDatabase.getAggregateUpsertCondition({
+                entityId: sthTestConfig.ENTITY_ID,
+                entityType: sthTestConfig.ENTITY_TYPE,
+                attrName: sthTestConfig.ATTRIBUTE_NAME,
+                resolution: sthConfig.RESOLUTION.MINUTE,
+                timestamp: new Date(Date.UTC(2020, 0, 1, 10, 20, 30))
+            });
+            expect(condition).not.to.have.key('points.offset');
+            expect(condition['_id.resolution']).to.equal(sthConfig.RESOLUTION.MINUTE);
+            expect(condition['_id.origin']).to.eql(new Date(Date.UTC(2020, 0, 1, 10)));
+        });
+
+        it('should return the numeric aggregated data single update pipeline', function() {
+            const pipeline = sthDatabase.getAggregateUpdate4Upsert(
+                'float',
+                '2.5',
+                sthConfig.RESOLUTION.MINUTE,
+                new Date(Date.UTC(2020, 0, 1, 10, 20, 30))
+            );
+            expect(pipeline.length).to.equal(1);
+            const points = pipeline[0].$set.points.$map;
+            expect(points.input.$ifNull[1].$literal.length).to.equal(60);
+            expect(points.in.$cond[0]).to.eql({ $eq: ['$$point.offset', 20] });
+            expect(points.in.$cond[1].$mergeObjects[1]).to.eql({
+                samples: { $add: ['$$point.samples', 1] },
+                sum: { $add: [{ $ifNull: ['$$point.sum', 0] }, 2.5] },
+                sum2: { $add: [{ $ifNull: ['$$point.sum2', 0] }, 6.25] },
+                min: { $min: ['$$point.min', 2.5] },
+                max: { $max: ['$$point.max', 2.5] }
+            });
+        });
+
+        it('should return the aggregated data single update pipeline for a buffered point delta', function() {
+            const pipeline = sthDatabase.getAggregateUpdate4Upsert(
+                'float',
+                '2.5',
+                sthConfig.RESOLUTION.MINUTE,
+                new Date(Date.UTC(2020, 0, 1, 10, 20, 30)),
+                { samples: 3, sum: 6, sum2: 14, min: 1, max: 3 }
+            );
+            expect(pipeline[0].$set.points.$map.in.$cond[1].$mergeObjects[1]).to.eql({
+                samples: { $add: ['$$point.samples', 3] },
+                sum: { $add: [{ $ifNull: ['$$point.sum', 0] }, 6] },
+                sum2: { $add: [{ $ifNull: ['$$point.sum2', 0] }, 14] },
+                min: { $min: ['$$point.min', 1] },
+                max: { $max: ['$$point.max', 3] }
+            });
+        });
+
+        it('should return the textual aggregated data single update pipeline', function() {
+            const pipeline = sthDatabase.getAggregateUpdate4Upsert(
+                'string',
+                'on.off',
+                sthConfig.RESOLUTION.DAY,
+                new Date(Date.UTC(2020, 0, 15, 10, 20, 30))
+            );
+            const points = pipeline[0].$set.points.$map;
+            expect(points.input.$ifNull[1].$literal[0].offset).to.equal(1);
+            expect(points.in.$cond[0]).to.eql({ $eq: ['$$point.offset', 15] });
+            expect(points.in.$cond[1].$mergeObjects[1].occur).to.eql({
+                $mergeObjects: [
+                    '$$point.occur',
+                    { 'on\uFF0Eoff': { $add: [{ $ifNull: ['$$point.occur.on\uFF0Eoff', 0] }, 1] } }
+                ]
+            });
+        });
+
+        describe('aggregation buffer', function() {
+            const originalAggregationBufferInterval = sthConfig.AGGREGATION_BUFFER_INTERVAL;
+            const originalAggregationBufferSize = sthConfig.AGGREGATION_BUFFER_SIZE;
+            const originalAggregateSingleUpdate = sthConfig.AGGREGATE_SINGLE_UPDATE;
+
+            before(function() {
+                sthConfig.AGGREGATION_BUFFER_INTERVAL = 60000;
+                sthConfig.AGGREGATION_BUFFER_SIZE = 1000;
+                sthConfig.AGGREGATE_SINGLE_UPDATE = true;
+            });
+
+            after(function() {
+                sthConfig.AGGREGATION_BUFFER_INTERVAL = originalAggregationBufferInterval;
+                sthConfig.AGGREGATION_BUFFER_SIZE = originalAggregationBufferSize;
+                sthConfig.AGGREGATE_SINGLE_UPDATE = originalAggregateSingleUpdate;
+            });
+
+            it('should keep the buffered aggregated data whose bulk write is not executed', function(done) {
+                const bulkWrites = [];
+                const collection = {
+                    namespace: 'sth_test.sth_buffer_test.aggr',
+                    bulkWrite(operations, options, callback) {
+                        bulkWrites.push(operations);
+                        // The first bulk write fails without being executed, as it happens with connection errors
+                        callback(bulkWrites.length === 1 ? new Error('connection lost') : null);
+                    }
+                };
+                const bufferValue = function(value) {
+                    return sthDatabase.bufferAggregatedData({
+                        collection,
+                        recvTime: new Date(Date.UTC(2020, 0, 1, 10, 20, 30)),
+                        entityId: sthTestConfig.ENTITY_ID,
+                        entityType: sthTestConfig.ENTITY_TYPE,
+                        attribute: { name: sthTestConfig.ATTRIBUTE_NAME, type: 'float', value }
+                    });
+                };
+
+                expect(bufferValue('2')).to.equal(true);
+                sthDatabase.flushAggregatedData(function(err) {
+                    expect(err.message).to.equal('connection lost');
+                    expect(bufferValue('8')).to.equal(true);
+                    sthDatabase.flushAggregatedData(function(err) {
+                        expect(err).to.equal(undefined);
+                        expect(bulkWrites.length).to.equal(2);
+                        expect(bulkWrites[1].length).to.equal(sthConfig.AGGREGATION_BY.length);
+                        bulkWrites[1].forEach(function(operation) {
+                            const pipeline = operation.updateOne.update;
+                            expect(pipeline[0].$set.points.$map.in.$cond[1].$mergeObjects[1]).to.eql({
+                                samples: { $add: ['$$point.samples', 2] },
+                                sum: { $add: [{ $ifNull: ['$$point.sum', 0] }, 10] },
+                                sum2: { $add: [{ $ifNull: ['$$point.sum2', 0] }, 68] },
+                                min: { $min: ['$$point.min', 2] },
+                                max: { $max: ['$$point.max', 8] }
+                            });
+                        });
+                        done();
+                    });
+                });
+            });
+
+            /**
+             * Returns a bulk write error including the passed write errors
+             * @param {Array} writeErrors The write errors
+             * @return {Error} The bulk write error
+             */
+            function getBulkWriteError(writeErrors) {
+                const err = new Error('write error');
+                err.result = {
+                    getWriteErrors() {
+                        return writeErrors;
+                    }
+                };
+                return err;
+            }
+
+            /**
+             * Buffers the aggregated data of an attribute value
+             * @param {object} collection The collection to buffer the aggregated data for
+             * @param {string} value The attribute value
+             * @param {number} day The day of the attribute value timestamp
+             * @return {boolean} True if the data has been buffered, false otherwise
+             */
+            function bufferValue(collection, value, day) {
+                return sthDatabase.bufferAggregatedData({
+                    collection,
+                    recvTime: new Date(Date.UTC(2020, 0, day || 1, 10, 20, 30)),
+                    entityId: sthTestConfig.ENTITY_ID,
+                    entityType: sthTestConfig.ENTITY_TYPE,
+                    attribute: { name: sthTestConfig.ATTRIBUTE_NAME, type: 'float', value }
+                });
+            }
+
+            it('should not keep the buffered aggregated data whose bulk write is executed with errors', function(done) {
+                const bulkWrites = [];
+                const collection = {
+                    namespace: 'sth_test.sth_buffer_test.aggr',
+                    bulkWrite(operations, options, callback) {
+                        bulkWrites.push(operations);
+                        callback(
+                            getBulkWriteError(
+                                operations.map(function(operation, index) {
+                                    return { index, code: 121 };
+                                })
+                            )
+                        );
+                    }
+                };
+                bufferValue(collection, '2');
+                sthDatabase.flushAggregatedData(function(err) {
+                    expect(err.message).to.equal('write error');
+                    sthDatabase.flushAggregatedData(function(err) {
+                        expect(err).to.equal(undefined);
+                        expect(bulkWrites.length).to.equal(1);
+                        done();
+                    });
+                });
+            });
+
+            it('should retry the buffered aggregated data failing due to concurrent upserts', function(done) {
+                const bulkWrites = [];
+                const collection = {
+                    namespace: 'sth_test.sth_buffer_test.aggr',
+                    bulkWrite(operations, options, callback) {
+                        bulkWrites.push(operations);
+                        callback(bulkWrites.length === 1 ? getBulkWriteError([{ index: 1, code: 11000 }]) : null);
+                    }
+                };
+                bufferValue(collection, '2');
+                sthDatabase.flushAggregatedData(function(err) {
+                    expect(err).to.equal(undefined);
+                    expect(bulkWrites.length).to.equal(2);
+                    expect(bulkWrites[1].length).to.equal(1);
+                    expect(bulkWrites[1][0]).to.eql(bulkWrites[0][1]);
+                    done();
+                });
+            });
+
+            it('should retry the buffered aggregated data not written by an ordered bulk write', function(done) {
+                sthConfig.AGGREGATE_SINGLE_UPDATE = false;
+                const bulkWrites = [];
+                const collection = {
+                    namespace: 'sth_test.sth_buffer_test.aggr',
+                    bulkWrite(operations, options, callback) {
+                        bulkWrites.push(operations);
+                        // The update of the delta of the second point fails
+                        callback(bulkWrites.length === 1 ? getBulkWriteError([{ index: 3, code: 121 }]) : null);
+                    }
+                };
+                bufferValue(collection, '2');
+                sthDatabase.flushAggregatedData(function(err) {
+                    sthConfig.AGGREGATE_SINGLE_UPDATE = true;
+                    expect(err.message).to.equal('write error');
+                    expect(bulkWrites.length).to.equal(2);
+                    expect(bulkWrites[0].length).to.equal(2 * sthConfig.AGGREGATION_BY.length);
+                    expect(bulkWrites[1]).to.eql(bulkWrites[0].slice(4));
+                    done();
+                });
+            });
+
+            it('should not flush the buffered aggregated data while another flush is in progress', function(done) {
+                const bulkWrites = [];
+                const callbacks = [];
+                const collection = {
+                    namespace: 'sth_test.sth_buffer_test.aggr',
+                    bulkWrite(operations, options, callback) {
+                        bulkWrites.push(operations);
+                        callbacks.push(callback);
+                    }
+                };
+                let flushed = 0;
+                bufferValue(collection, '2');
+                sthDatabase.flushAggregatedData(function(err) {
+                    expect(err).to.equal(undefined);
+                    flushed++;
+                });
+                bufferValue(collection, '8');
+                sthDatabase.flushAggregatedData(function(err) {
+                    expect(err).to.equal(undefined);
+                    expect(flushed).to.equal(1);
+                    expect(bulkWrites.length).to.equal(2);
+                    bulkWrites[1].forEach(function(operation) {
+                        const pipeline = operation.updateOne.update;
+                        expect(pipeline[0].$set.points.$map.in.$cond[1].$mergeObjects[1].samples).to.eql({
+                            $add: ['$$point.samples', 1]
+                        });
+                    });
+                    done();
+                });
+                expect(bulkWrites.length).to.equal(1);
+                callbacks[0](null);
+                setTimeout(function() {
+                    expect(bulkWrites.length).to.equal(2);
+                    callbacks[1](null);
+                }, 10);
+            });
+
+            it('should not buffer aggregated data of new points once the buffer is full', function(done) {
+                let connected = false;
+                const bulkWrites = [];
+                const collection = {
+                    namespace: 'sth_test.sth_buffer_test.aggr',
+                    bulkWrite(operations, options, callback) {
+                        bulkWrites.push(operations);
+                        callback(connected ? null : new Error('connection lost'));
+                    }
+                };
+                sthConfig.AGGREGATION_BUFFER_SIZE = 2 * sthConfig.AGGREGATION_BY.length;
+                expect(bufferValue(collection, '2', 1)).to.equal(true);
+                sthDatabase.flushAggregatedData(function(err) {
+                    expect(err.message).to.equal('connection lost');
+                    // The buffer gets full and its flush fails, so its data is kept
+                    expect(bufferValue(collection, '4', 2)).to.equal(true);
+                    sthDatabase.flushAggregatedData(function(err) {
+                        expect(err.message).to.equal('connection lost');
+                        const flushes = bulkWrites.length;
+                        expect(bufferValue(collection, '6', 3)).to.equal(false);
+                        expect(bufferValue(collection, '8', 1)).to.equal(true);
+                        expect(bulkWrites.length).to.equal(flushes);
+                        connected = true;
+                        sthConfig.AGGREGATION_BUFFER_SIZE = 1000;
+                        sthDatabase.flushAggregatedData(function(err) {
+                            expect(err).to.equal(undefined);
+                            expect(bulkWrites[bulkWrites.length - 1].length).to.equal(
+                                2 * sthConfig.AGGREGATION_BY.length
+                            );
+                            done();
+                        });
+                    });
+                });
+            });
+        });
+
         describe('collection access', function() {
             before(function(done) {
                 connectToDatabase(done);
@@ -1203,6 +1759,8 @@ describe('sthDatabase tests', function() {
 
         describe('retrieval', retrievalTests);
 
+        describe('pagination', paginationTests);
+
         describe('final clean up', cleanDatabaseTests);
     });
 });
@@ -0,0 +1,97 @@
+/*
+ * Copyright 2026 Telefónica Investigación y Desarrollo, S.A.U
+ *
+ * This file is part of the Short Time Historic (STH) component
+ *
+ * STH is free software: you can redistribute it and/or
+ * modify it under the terms of the GNU Affero General Public License as
+ * published by the Free Software Foundation, either version 3 of the License,
+ * or (at your option) any later version.
+ *
+ * STH is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+ * See the GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public
+ * License along with STH.
+ * If not, see http://www.gnu.org/licenses/.
+ *
+ * For those usages not covered by the GNU Affero General Public License
+ * please contact with: [german.torodelvalle@telefonica.com]
+ */
+
+const ROOT_PATH = require('app-root-path');
+const expect = require('expect.js');
+const stream = require('stream');
+const sthServerUtils = require(ROOT_PATH + '/lib/server/utils/sthServerUtils');
+
+const ENTITY_ID = 'entityId';
+const ENTITY_TYPE = 'entityType';
+const ATTR_NAME = 'attrName';
+const DOCS = [
+    { attrType: 'Number', attrValue: 1, recvTime: new Date(Date.UTC(2026, 0, 1)) },
+    { attrType: 'Number', attrValue: 2, recvTime: new Date(Date.UTC(2026, 0, 2)) }
+];
+
+/**
+ * Reads a NGSI payload stream returning the payload through the callback
+ * @param {Number}   ngsiVersion The NGSI version
+ * @param {Array}    docs        The documents to stream
+ * @param {Function} callback    The callback
+ */
+function readPayloadStream(ngsiVersion, docs, callback) {
+    let payload = '';
+    sthServerUtils
+        .getNGSIPayloadStream(ngsiVersion, ENTITY_ID, ENTITY_TYPE, ATTR_NAME, stream.Readable.from(docs), function() {})
+        .on('data', function(chunk) {
+            payload += chunk;
+        })
+        .on('end', function() {
+            callback(payload);
+        });
+}
+
+describe('sthServerUtils tests', function() {
+    [1, 2].forEach(function(ngsiVersion) {
+        it('should stream the same NGSIv' + ngsiVersion + ' payload as getNGSIPayload', function(done) {
+            readPayloadStream(ngsiVersion, DOCS, function(payload) {
+                expect(payload).to.equal(
+                    JSON.stringify(sthServerUtils.getNGSIPayload(ngsiVersion, ENTITY_ID, ENTITY_TYPE, ATTR_NAME, DOCS))
+                );
+                done();
+            });
+        });
+
+        it('should stream the same empty NGSIv' + ngsiVersion + ' payload as getNGSIPayload', function(done) {
+            readPayloadStream(ngsiVersion, [], function(payload) {
+                expect(payload).to.equal(
+                    JSON.stringify(
+                        sthServerUtils.getNGSIPayload(
+                            ngsiVersion,
+                            ENTITY_ID,
+                            ENTITY_TYPE,
+                            ATTR_NAME,
+                            sthServerUtils.getEmptyResponse()
+                        )
+                    )
+                );
+                done();
+            });
+        });
+    });
+
+    it('should return the page position of a page token', function() {
+        const page = { recvTime: DOCS[1].recvTime, id: '5e0a1b2c3d4e5f6a7b8c9d0e' };
+        const token = sthServerUtils.getPageToken(page);
+        expect(token).to.match(/^[A-Za-z0-9_-]+$/);
+        expect(sthServerUtils.parsePageToken(token)).to.eql(page);
+    });
+
+    it('should not return the page position of an invalid page token', function() {
+        expect(sthServerUtils.parsePageToken('foo')).to.be(undefined);
+        expect(sthServerUtils.parsePageToken(Buffer.from('[1,1]').toString('base64'))).to.be(undefined);
+        expect(sthServerUtils.parsePageToken(Buffer.from('[1,"foo"]').toString('base64'))).to.be(undefined);
+        expect(sthServerUtils.parsePageToken(Buffer.from('{"recvTime":1}').toString('base64'))).to.be(undefined);
+    });
+});
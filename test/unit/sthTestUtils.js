@@ -477,6 +477,9 @@ function getURL(type, options, attrName) {
         if (options && (options.hOffset || options.hOffset === 0)) {
             url += getQuerySeparator() + 'hOffset=' + options.hOffset;
         }
+        if (options && options.hToken) {
+            url += getQuerySeparator() + 'hToken=' + options.hToken;
+        }
         if (options && options.aggrMethod) {
             url += getQuerySeparator() + 'aggrMethod=' + options.aggrMethod;
         }
@@ -2608,6 +2611,166 @@ function validLogLevelChangeTest(level, done) {
     );
 }
 
+/**
+ * Sends a notification by the Orion Context Broker including certain attributes of the testing entity
+ * @param {Array} attributes The attributes to notify. Each one is an object including the name, type, value and
+ *  timeInstant (the value of its TimeInstant metadata) properties. The same attribute can be included several times
+ * @param {Function} callback The callback to notify once the response is received, with the error and the response
+ */
+function notifyAttributes(attributes, callback) {
+    request(
+        {
+            uri: getURL(sthTestConfig.API_OPERATION.NOTIFY),
+            method: 'POST',
+            headers: {
+                Accept: 'application/json',
+                'Content-Type': 'application/json',
+                'Fiware-Service': sthConfig.DEFAULT_SERVICE,
+                'Fiware-ServicePath': sthConfig.DEFAULT_SERVICE_PATH
+            },
+            json: true,
+            body: {
+                subscriptionId: '1234567890ABCDF123456789',
+                originator: 'orion.contextBroker.instance',
+                contextResponses: [
+                    {
+                        contextElement: {
+                            attributes: attributes.map(function(attribute) {
+                                return {
+                                    name: attribute.name,
+                                    type: attribute.type,
+                                    value: attribute.value,
+                                    metadatas: [
+                                        {
+                                            name: 'TimeInstant',
+                                            type: 'ISO8601',
+                                            value: attribute.timeInstant
+                                        }
+                                    ]
+                                };
+                            }),
+                            type: sthTestConfig.ENTITY_TYPE,
+                            isPattern: 'false',
+                            id: sthTestConfig.ENTITY_ID
+                        },
+                        statusCode: {
+                            code: '200',
+                            reasonPhrase: 'OK'
+                        }
+                    }
+                ]
+            }
+        },
+        callback
+    );
+}
+
+/**
+ * A mocha test sending a notification by the Orion Context Broker and checking its response status code
+ * @param {Array} attributes The attributes to notify (see notifyAttributes())
+ * @param {number} statusCode The expected status code
+ * @param {Function} done The mocha done() callback function
+ */
+function notifyAttributesTest(attributes, statusCode, done) {
+    notifyAttributes(attributes, function(err, response) {
+        expect(err).to.equal(null);
+        expect(response.statusCode).to.equal(statusCode);
+        done();
+    });
+}
+
+/**
+ * A mocha test checking the raw and aggregated data stored for certain attribute of the testing entity at certain
+ *  date, in all the resolutions
+ * @param {object} params It is an object including the following properties:
+ *  - {string} attrName The attribute name
+ *  - {string} timeInstant The date
+ *  - {Array} values The expected raw data attribute values
+ *  - {object} point The expected properties of the aggregated data point (samples, sum, occur, etc.), or null if no
+ *      aggregated data is expected
+ * @param {Function} done The mocha done() callback function
+ */
+function storedDataTest(params, done) {
+    const headers = {
+        Accept: 'application/json',
+        'Content-Type': 'application/json',
+        'Fiware-Service': sthConfig.DEFAULT_SERVICE,
+        'Fiware-ServicePath': sthConfig.DEFAULT_SERVICE_PATH
+    };
+
+    function checkAggregatedData(index) {
+        if (index === sthConfig.AGGREGATION_BY.length) {
+            return done();
+        }
+        request(
+            {
+                uri: getURL(
+                    sthTestConfig.API_OPERATION.READ_V2,
+                    {
+                        aggrMethod: 'all',
+                        aggrPeriod: sthConfig.AGGREGATION_BY[index],
+                        dateFrom: params.timeInstant,
+                        dateTo: params.timeInstant
+                    },
+                    params.attrName
+                ),
+                method: 'GET',
+                headers
+            },
+            function(err, response, body) {
+                expect(err).to.equal(null);
+                expect(response.statusCode).to.equal(200);
+                const points = [];
+                JSON.parse(body).value.forEach(function(result) {
+                    result.points.forEach(function(point) {
+                        if (point.samples > 0) {
+                            points.push(point);
+                        }
+                    });
+                });
+                if (!params.point) {
+                    expect(points.length).to.equal(0);
+                } else {
+                    expect(points.length).to.equal(1);
+                    expect(parseInt(points[0].offset, 10)).to.equal(
+                        sthUtils.getOffset(sthConfig.AGGREGATION_BY[index], new Date(params.timeInstant))
+                    );
+                    Object.keys(params.point).forEach(function(key) {
+                        expect(points[0][key]).to.eql(params.point[key]);
+                    });
+                }
+                checkAggregatedData(index + 1);
+            }
+        );
+    }
+
+    request(
+        {
+            uri: getURL(
+                sthTestConfig.API_OPERATION.READ_V2,
+                {
+                    lastN: 0,
+                    dateFrom: params.timeInstant,
+                    dateTo: params.timeInstant
+                },
+                params.attrName
+            ),
+            method: 'GET',
+            headers
+        },
+        function(err, response, body) {
+            expect(err).to.equal(null);
+            expect(response.statusCode).to.equal(200);
+            expect(
+                JSON.parse(body).value.map(function(entry) {
+                    return entry.attrValue;
+                })
+            ).to.eql(params.values);
+            checkAggregatedData(0);
+        }
+    );
+}
+
 module.exports = {
     getDayOfYear,
     addEventTest,
@@ -2625,5 +2788,8 @@ module.exports = {
     textualAggregatedDataUpdatedTest,
     aggregatedDataNonExistentTest,
     dataRemovalSuite,
-    validLogLevelChangeTest
+    validLogLevelChangeTest,
+    notifyAttributes,
+    notifyAttributesTest,
+    storedDataTest
 };
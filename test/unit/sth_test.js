@@ -27,6 +27,7 @@ const sthTestConfig = require(ROOT_PATH + '/test/unit/sthTestConfiguration');
 const sthConfig = require(ROOT_PATH + '/lib/configuration/sthConfiguration');
 const sthTestUtils = require(ROOT_PATH + '/test/unit/sthTestUtils.js');
 const sthDatabaseNaming = require(ROOT_PATH + '/lib/database/model/sthDatabaseNaming');
+const sthServerUtils = require(ROOT_PATH + '/lib/server/utils/sthServerUtils');
 const hapi = require('hapi');
 const request = require('request');
 const expect = require('expect.js');
@@ -300,6 +301,16 @@ describe('sth tests', function() {
             sthTestUtils.status200Test.bind(null, 1, { lastN: 1, count: true })
         );
 
+        it(
+            'should respond with 200 - OK if lastN and estimated count query params',
+            sthTestUtils.status200Test.bind(null, 2, { lastN: 1, count: 'estimated' })
+        );
+
+        it(
+            'should respond with 200 - OK if lastN and estimated count query params - NGSIv1',
+            sthTestUtils.status200Test.bind(null, 1, { lastN: 1, count: 'estimated' })
+        );
+
         it(
             'should respond with 200 - OK if hLimit and hOffset query params',
             sthTestUtils.status200Test.bind(null, 2, {
@@ -316,6 +327,38 @@ describe('sth tests', function() {
             })
         );
 
+        it(
+            'should respond with 200 - OK if hLimit and hToken query params',
+            sthTestUtils.status200Test.bind(null, 2, {
+                hLimit: 1,
+                hToken: sthServerUtils.getPageToken({ recvTime: new Date(), id: '5e0a1b2c3d4e5f6a7b8c9d0e' })
+            })
+        );
+
+        it(
+            'should respond with 200 - OK if hLimit and hToken query params - NGSIv1',
+            sthTestUtils.status200Test.bind(null, 1, {
+                hLimit: 1,
+                hToken: sthServerUtils.getPageToken({ recvTime: new Date(), id: '5e0a1b2c3d4e5f6a7b8c9d0e' })
+            })
+        );
+
+        it(
+            'should respond with 400 - Bad Request if hToken is not valid',
+            sthTestUtils.status400Test.bind(null, 2, {
+                hLimit: 1,
+                hToken: 'foo'
+            })
+        );
+
+        it(
+            'should respond with 400 - Bad Request if hToken is not valid - NGSIv1',
+            sthTestUtils.status400Test.bind(null, 1, {
+                hLimit: 1,
+                hToken: 'foo'
+            })
+        );
+
         it(
             'should respond with 200 - OK if aggrMethod and aggrPeriod query params',
             sthTestUtils.status200Test.bind(null, 2, {
@@ -1699,6 +1742,650 @@ describe('sth tests', function() {
     const contextResponseNumericWithFixedTimeInstantUpdate = require('./contextResponses/V1contextResponseNumericWithFixedTimeInstantUpdate');
     const contextResponseTextualWithFixedTimeInstantUpdate = require('./contextResponses/V1contextResponseTextualWithFixedTimeInstantUpdate');
 
+    describe('notification with bulk writes', function() {
+        const NUMERIC_ATTRIBUTE = {
+            name: 'attrNameBulkNumeric',
+            type: 'Number',
+            value: '11',
+            timeInstant: '1981-01-01T00:00:00.000Z'
+        };
+        const TEXTUAL_ATTRIBUTE = {
+            name: 'attrNameBulkTextual',
+            type: 'Text',
+            value: 'on',
+            timeInstant: '1981-01-01T00:00:00.000Z'
+        };
+        const DUPLICATED_ATTRIBUTE = {
+            name: 'attrNameBulkDuplicated',
+            type: 'Number',
+            value: '5',
+            timeInstant: '1982-01-01T00:00:00.000Z'
+        };
+        const UPDATED_ATTRIBUTE = {
+            name: 'attrNameBulkUpdated',
+            type: 'Number',
+            value: '111',
+            timeInstant: '1983-01-01T00:00:00.000Z'
+        };
+        const FAILED_ATTRIBUTE = {
+            name: 'attrNameBulkFailed',
+            type: 'Number',
+            value: '7',
+            timeInstant: '1984-01-01T00:00:00.000Z'
+        };
+        const bulkWrite = sth.sthDatabase.bulkWrite;
+        let bulkWriteConfig;
+
+        before(function() {
+            bulkWriteConfig = sthConfig.BULK_WRITE;
+            sthConfig.BULK_WRITE = true;
+        });
+
+        after(function() {
+            sthConfig.BULK_WRITE = bulkWriteConfig;
+            sth.sthDatabase.bulkWrite = bulkWrite;
+        });
+
+        it(
+            'should store the raw and aggregated data of several attributes',
+            sthTestUtils.notifyAttributesTest.bind(null, [NUMERIC_ATTRIBUTE, TEXTUAL_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should have stored the numeric raw and aggregated data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: NUMERIC_ATTRIBUTE.name,
+                timeInstant: NUMERIC_ATTRIBUTE.timeInstant,
+                values: ['11'],
+                point: { samples: 1, sum: 11, sum2: 121, min: 11, max: 11 }
+            })
+        );
+
+        it(
+            'should have stored the textual raw and aggregated data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: TEXTUAL_ATTRIBUTE.name,
+                timeInstant: TEXTUAL_ATTRIBUTE.timeInstant,
+                values: ['on'],
+                point: { samples: 1, occur: { on: 1 } }
+            })
+        );
+
+        it(
+            'should ignore the already registered data',
+            sthTestUtils.notifyAttributesTest.bind(null, [NUMERIC_ATTRIBUTE, TEXTUAL_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should store the raw and aggregated data of the attribute to duplicate',
+            // The unique index of the raw data collection is created asynchronously, so its collection is created first
+            sthTestUtils.notifyAttributesTest.bind(
+                null,
+                [Object.assign({}, DUPLICATED_ATTRIBUTE, { timeInstant: '1985-01-01T00:00:00.000Z' })],
+                200
+            )
+        );
+
+        it(
+            'should ignore the data duplicated in the same notification',
+            // Both copies are not registered yet when the notification is received, so the second raw data insertion
+            //  fails with a duplicate key error
+            sthTestUtils.notifyAttributesTest.bind(null, [DUPLICATED_ATTRIBUTE, DUPLICATED_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should have stored the numeric raw and aggregated data only once',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: NUMERIC_ATTRIBUTE.name,
+                timeInstant: NUMERIC_ATTRIBUTE.timeInstant,
+                values: ['11'],
+                point: { samples: 1, sum: 11, sum2: 121, min: 11, max: 11 }
+            })
+        );
+
+        it(
+            'should have stored the textual raw and aggregated data only once',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: TEXTUAL_ATTRIBUTE.name,
+                timeInstant: TEXTUAL_ATTRIBUTE.timeInstant,
+                values: ['on'],
+                point: { samples: 1, occur: { on: 1 } }
+            })
+        );
+
+        it(
+            'should have stored the duplicated raw and aggregated data only once',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: DUPLICATED_ATTRIBUTE.name,
+                timeInstant: DUPLICATED_ATTRIBUTE.timeInstant,
+                values: ['5'],
+                point: { samples: 1, sum: 5, sum2: 25, min: 5, max: 5 }
+            })
+        );
+
+        it(
+            'should store the raw and aggregated data to update',
+            sthTestUtils.notifyAttributesTest.bind(null, [UPDATED_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should update the raw data undoing the previously aggregated data',
+            sthTestUtils.notifyAttributesTest.bind(null, [Object.assign({}, UPDATED_ATTRIBUTE, { value: '222' })], 200)
+        );
+
+        it(
+            'should have stored the updated raw and aggregated data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: UPDATED_ATTRIBUTE.name,
+                timeInstant: UPDATED_ATTRIBUTE.timeInstant,
+                values: ['222'],
+                point: { samples: 1, sum: 222, sum2: 49284, min: 222, max: 222 }
+            })
+        );
+
+        it('should respond with 500 - Internal Error if the raw data cannot be written', function(done) {
+            sth.sthDatabase.bulkWrite = function(collection, operations, ordered, callback) {
+                sth.sthDatabase.bulkWrite = bulkWrite;
+                const err = new Error('Document failed validation');
+                err.result = {
+                    getWriteErrors: function() {
+                        return [{ index: 0, code: 121, errmsg: 'Document failed validation' }];
+                    }
+                };
+                process.nextTick(callback.bind(null, err));
+            };
+            sthTestUtils.notifyAttributesTest([FAILED_ATTRIBUTE], 500, done);
+        });
+
+        it(
+            'should not have stored the raw or aggregated data which could not be written',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: FAILED_ATTRIBUTE.name,
+                timeInstant: FAILED_ATTRIBUTE.timeInstant,
+                values: [],
+                point: null
+            })
+        );
+    });
+
+    describe('notification with single update aggregation', function() {
+        const NUMERIC_ATTRIBUTE = {
+            name: 'attrNameSingleUpdateNumeric',
+            type: 'Number',
+            value: '3',
+            timeInstant: '1986-01-01T00:00:00.000Z'
+        };
+        const MIXED_ATTRIBUTE = {
+            name: 'attrNameSingleUpdateMixed',
+            type: 'Text',
+            value: 'on',
+            timeInstant: '1987-01-01T00:00:00.000Z'
+        };
+        let aggregateSingleUpdateConfig;
+
+        before(function() {
+            aggregateSingleUpdateConfig = sthConfig.AGGREGATE_SINGLE_UPDATE;
+            sthConfig.AGGREGATE_SINGLE_UPDATE = true;
+        });
+
+        after(function() {
+            sthConfig.AGGREGATE_SINGLE_UPDATE = aggregateSingleUpdateConfig;
+        });
+
+        it(
+            'should store the raw and aggregated numeric data',
+            sthTestUtils.notifyAttributesTest.bind(null, [NUMERIC_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should accumulate the aggregated numeric data in the same point',
+            sthTestUtils.notifyAttributesTest.bind(
+                null,
+                [Object.assign({}, NUMERIC_ATTRIBUTE, { value: '4', timeInstant: '1986-01-01T00:00:00.500Z' })],
+                200
+            )
+        );
+
+        it(
+            'should have stored the raw and accumulated aggregated numeric data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: NUMERIC_ATTRIBUTE.name,
+                timeInstant: '1986-01-01T00:00:00.500Z',
+                values: ['4'],
+                point: { samples: 2, sum: 7, sum2: 25, min: 3, max: 4 }
+            })
+        );
+
+        it(
+            'should store the raw and aggregated textual data',
+            sthTestUtils.notifyAttributesTest.bind(null, [MIXED_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should accumulate numeric data in the point prepopulated for textual data',
+            sthTestUtils.notifyAttributesTest.bind(
+                null,
+                [
+                    Object.assign({}, MIXED_ATTRIBUTE, {
+                        type: 'Number',
+                        value: '5',
+                        timeInstant: '1987-01-01T00:00:00.500Z'
+                    })
+                ],
+                200
+            )
+        );
+
+        it(
+            'should have stored the raw and accumulated aggregated textual and numeric data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: MIXED_ATTRIBUTE.name,
+                timeInstant: '1987-01-01T00:00:00.500Z',
+                values: ['5'],
+                point: { samples: 2, sum: 5, sum2: 25, min: 5, max: 5, occur: { on: 1 } }
+            })
+        );
+    });
+
+    describe('notification with fast insert', function() {
+        const ATTRIBUTE = {
+            name: 'attrNameFastInsert',
+            type: 'Number',
+            value: '6',
+            timeInstant: '1992-01-01T00:00:00.000Z'
+        };
+        const UPDATED_ATTRIBUTE = {
+            name: 'attrNameFastInsertUpdated',
+            type: 'Number',
+            value: '7',
+            timeInstant: '1993-01-01T00:00:00.000Z'
+        };
+        let fastInsertConfig;
+
+        before(function() {
+            fastInsertConfig = sthConfig.FAST_INSERT;
+            sthConfig.FAST_INSERT = true;
+        });
+
+        after(function() {
+            sthConfig.FAST_INSERT = fastInsertConfig;
+        });
+
+        it(
+            'should insert the raw and aggregated data of a new value',
+            sthTestUtils.notifyAttributesTest.bind(null, [ATTRIBUTE], 200)
+        );
+
+        it(
+            'should have stored the raw and aggregated data of the new value',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: ATTRIBUTE.name,
+                timeInstant: ATTRIBUTE.timeInstant,
+                values: ['6'],
+                point: { samples: 1, sum: 6, sum2: 36, min: 6, max: 6 }
+            })
+        );
+
+        it(
+            'should ignore the replay of the same value using the recent keys',
+            sthTestUtils.notifyAttributesTest.bind(null, [ATTRIBUTE], 200)
+        );
+
+        it(
+            'should not have aggregated the replayed value',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: ATTRIBUTE.name,
+                timeInstant: ATTRIBUTE.timeInstant,
+                values: ['6'],
+                point: { samples: 1, sum: 6, sum2: 36, min: 6, max: 6 }
+            })
+        );
+
+        it(
+            'should insert the raw and aggregated data of a value to update',
+            sthTestUtils.notifyAttributesTest.bind(null, [UPDATED_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should update a value with the same timestamp falling back to the usual processing',
+            sthTestUtils.notifyAttributesTest.bind(null, [Object.assign({}, UPDATED_ATTRIBUTE, { value: '9' })], 200)
+        );
+
+        it(
+            'should have updated the raw and aggregated data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: UPDATED_ATTRIBUTE.name,
+                timeInstant: UPDATED_ATTRIBUTE.timeInstant,
+                values: ['9'],
+                point: { samples: 1, sum: 9, sum2: 81, min: 9, max: 9 }
+            })
+        );
+
+        it(
+            'should update back to the original value with the same timestamp',
+            sthTestUtils.notifyAttributesTest.bind(null, [UPDATED_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should have updated back the raw and aggregated data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: UPDATED_ATTRIBUTE.name,
+                timeInstant: UPDATED_ATTRIBUTE.timeInstant,
+                values: ['7'],
+                point: { samples: 1, sum: 7, sum2: 49, min: 7, max: 7 }
+            })
+        );
+    });
+
+    describe('notification with aggregation buffer', function() {
+        const NUMERIC_ATTRIBUTE = {
+            name: 'attrNameBufferNumeric',
+            type: 'Number',
+            value: '2',
+            timeInstant: '1988-01-01T00:00:00.000Z'
+        };
+        const TEXTUAL_ATTRIBUTE = {
+            name: 'attrNameBufferTextual',
+            type: 'Text',
+            value: 'on',
+            timeInstant: '1989-01-01T00:00:00.000Z'
+        };
+        const INTERVAL_ATTRIBUTE = {
+            name: 'attrNameBufferInterval',
+            type: 'Number',
+            value: '3',
+            timeInstant: '1990-01-01T00:00:00.000Z'
+        };
+        const SIZE_ATTRIBUTE = {
+            name: 'attrNameBufferSize',
+            type: 'Number',
+            value: '4',
+            timeInstant: '1991-01-01T00:00:00.000Z'
+        };
+        let aggregationBufferIntervalConfig, aggregationBufferSizeConfig;
+
+        /**
+         * Waits for the buffered aggregated data to be flushed in the background
+         * @param {Function} done The mocha done() callback function
+         */
+        function waitForFlush(done) {
+            setTimeout(done, 500);
+        }
+
+        before(function() {
+            aggregationBufferIntervalConfig = sthConfig.AGGREGATION_BUFFER_INTERVAL;
+            aggregationBufferSizeConfig = sthConfig.AGGREGATION_BUFFER_SIZE;
+            sthConfig.AGGREGATION_BUFFER_INTERVAL = 60000;
+            sthConfig.AGGREGATION_BUFFER_SIZE = 1000;
+        });
+
+        after(function(done) {
+            sthConfig.AGGREGATION_BUFFER_INTERVAL = aggregationBufferIntervalConfig;
+            sthConfig.AGGREGATION_BUFFER_SIZE = aggregationBufferSizeConfig;
+            sth.sthDatabase.flushAggregatedData(done);
+        });
+
+        it(
+            'should store the raw numeric data buffering the aggregated one',
+            sthTestUtils.notifyAttributesTest.bind(null, [NUMERIC_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should store more raw numeric data buffering the aggregated one',
+            sthTestUtils.notifyAttributesTest.bind(
+                null,
+                [Object.assign({}, NUMERIC_ATTRIBUTE, { value: '8', timeInstant: '1988-01-01T00:00:00.500Z' })],
+                200
+            )
+        );
+
+        it(
+            'should store the raw textual data buffering the aggregated one',
+            sthTestUtils.notifyAttributesTest.bind(null, [TEXTUAL_ATTRIBUTE], 200)
+        );
+
+        it(
+            'should store more raw textual data buffering the aggregated one',
+            sthTestUtils.notifyAttributesTest.bind(
+                null,
+                [Object.assign({}, TEXTUAL_ATTRIBUTE, { value: 'off', timeInstant: '1989-01-01T00:00:00.200Z' })],
+                200
+            )
+        );
+
+        it(
+            'should store repeated raw textual data buffering the aggregated one',
+            sthTestUtils.notifyAttributesTest.bind(
+                null,
+                [Object.assign({}, TEXTUAL_ATTRIBUTE, { timeInstant: '1989-01-01T00:00:00.400Z' })],
+                200
+            )
+        );
+
+        it(
+            'should not have stored the buffered aggregated numeric data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: NUMERIC_ATTRIBUTE.name,
+                timeInstant: '1988-01-01T00:00:00.500Z',
+                values: ['8'],
+                point: null
+            })
+        );
+
+        it('should flush the buffered aggregated data', function(done) {
+            sth.sthDatabase.flushAggregatedData(function(err) {
+                expect(err).to.equal(undefined);
+                done();
+            });
+        });
+
+        it(
+            'should have stored the merged aggregated numeric data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: NUMERIC_ATTRIBUTE.name,
+                timeInstant: '1988-01-01T00:00:00.500Z',
+                values: ['8'],
+                point: { samples: 2, sum: 10, sum2: 68, min: 2, max: 8 }
+            })
+        );
+
+        it(
+            'should have stored the merged aggregated textual data',
+            sthTestUtils.storedDataTest.bind(null, {
+                attrName: TEXTUAL_ATTRIBUTE.name,
+                timeInstant: '1989-01-01T00:00:00.400Z',
+                values: ['on'],
+                point: { samples: 3, occur: { on: 2, off: 1 } }
+            })
+        );
+
+        describe('flushed once the interval expires', function() {
+            before(function() {
+                sthConfig.AGGREGATION_BUFFER_INTERVAL = 100;
+            });
+
+            after(function() {
+                sthConfig.AGGREGATION_BUFFER_INTERVAL = 60000;
+            });
+
+            it(
+                'should store the raw data buffering the aggregated one',
+                sthTestUtils.notifyAttributesTest.bind(null, [INTERVAL_ATTRIBUTE], 200)
+            );
+
+            it('should wait for the interval to expire', waitForFlush);
+
+            it(
+                'should have stored the aggregated data',
+                sthTestUtils.storedDataTest.bind(null, {
+                    attrName: INTERVAL_ATTRIBUTE.name,
+                    timeInstant: INTERVAL_ATTRIBUTE.timeInstant,
+                    values: ['3'],
+                    point: { samples: 1, sum: 3, sum2: 9, min: 3, max: 3 }
+                })
+            );
+        });
+
+        describe('flushed once the size is reached', function() {
+            before(function() {
+                // Each attribute value is buffered once per resolution
+                sthConfig.AGGREGATION_BUFFER_SIZE = sthConfig.AGGREGATION_BY.length;
+            });
+
+            after(function() {
+                sthConfig.AGGREGATION_BUFFER_SIZE = 1000;
+            });
+
+            it(
+                'should store the raw data flushing the aggregated one',
+                sthTestUtils.notifyAttributesTest.bind(null, [SIZE_ATTRIBUTE], 200)
+            );
+
+            it('should wait for the flush to complete', waitForFlush);
+
+            it(
+                'should have stored the aggregated data',
+                sthTestUtils.storedDataTest.bind(null, {
+                    attrName: SIZE_ATTRIBUTE.name,
+                    timeInstant: SIZE_ATTRIBUTE.timeInstant,
+                    values: ['4'],
+                    point: { samples: 1, sum: 4, sum2: 16, min: 4, max: 4 }
+                })
+            );
+        });
+    });
+
+    describe('notification with bucket cache', function() {
+        let bucketCacheSizeConfig;
+
+        /**
+         * Defines the tests notifying values of an attribute whose aggregated data documents (buckets) are removed
+         *  behind the bucket cache
+         * @param {string} attrName The attribute name
+         * @param {number} year The year of the attribute values
+         * @param {Function} flush Function flushing the notified aggregated data, receiving a callback (optional)
+         */
+        function bucketCacheTests(attrName, year, flush) {
+            const attribute = {
+                name: attrName,
+                type: 'Number',
+                value: '2',
+                timeInstant: year + '-01-01T00:00:00.000Z'
+            };
+
+            /**
+             * Notifies a value of the attribute in the same aggregated points
+             * @param {string} value The attribute value
+             * @param {string} second The second of the attribute value timestamp
+             * @param {Function} done The mocha done() callback function
+             */
+            function notifyValue(value, second, done) {
+                sthTestUtils.notifyAttributesTest(
+                    [Object.assign({}, attribute, { value, timeInstant: year + '-01-01T00:00:' + second + '.000Z' })],
+                    200,
+                    function() {
+                        return flush ? flush(done) : done();
+                    }
+                );
+            }
+
+            it('should store the raw and aggregated data prepopulating the buckets', notifyValue.bind(null, '2', '00'));
+
+            it(
+                'should store the aggregated data of another value in the cached buckets',
+                notifyValue.bind(null, '3', '10')
+            );
+
+            it(
+                'should have aggregated both values',
+                sthTestUtils.storedDataTest.bind(null, {
+                    attrName,
+                    timeInstant: attribute.timeInstant,
+                    values: ['2'],
+                    point: { samples: 2, sum: 5, sum2: 13, min: 2, max: 3 }
+                })
+            );
+
+            it('should remove the cached buckets', function(done) {
+                const collectionName = sthDatabaseNaming.getAggregatedCollectionName({
+                    service: sthConfig.DEFAULT_SERVICE,
+                    servicePath: sthConfig.DEFAULT_SERVICE_PATH,
+                    entityId: sthTestConfig.ENTITY_ID,
+                    entityType: sthTestConfig.ENTITY_TYPE,
+                    attrName
+                });
+                sth.sthDatabase.connection.collection(collectionName).deleteMany(
+                    {
+                        '_id.origin': { $gte: new Date(Date.UTC(year, 0, 1)), $lt: new Date(Date.UTC(year + 1, 0, 1)) }
+                    },
+                    function(err, result) {
+                        expect(err).to.equal(null);
+                        expect(result.deletedCount).to.equal(sthConfig.AGGREGATION_BY.length);
+                        done();
+                    }
+                );
+            });
+
+            it(
+                'should store the aggregated data of another value prepopulating the removed buckets again',
+                notifyValue.bind(null, '4', '20')
+            );
+
+            it(
+                'should have aggregated only the last value',
+                sthTestUtils.storedDataTest.bind(null, {
+                    attrName,
+                    timeInstant: attribute.timeInstant,
+                    values: ['2'],
+                    point: { samples: 1, sum: 4, sum2: 16, min: 4, max: 4 }
+                })
+            );
+        }
+
+        before(function() {
+            bucketCacheSizeConfig = sthConfig.BUCKET_CACHE_SIZE;
+            sthConfig.BUCKET_CACHE_SIZE = 1000;
+        });
+
+        after(function() {
+            sthConfig.BUCKET_CACHE_SIZE = bucketCacheSizeConfig;
+        });
+
+        describe('per attribute', bucketCacheTests.bind(null, 'attrNameBucketCache', 1994));
+
+        describe('with bulk writes', function() {
+            let bulkWriteConfig;
+
+            before(function() {
+                bulkWriteConfig = sthConfig.BULK_WRITE;
+                sthConfig.BULK_WRITE = true;
+            });
+
+            after(function() {
+                sthConfig.BULK_WRITE = bulkWriteConfig;
+            });
+
+            bucketCacheTests('attrNameBucketCacheBulk', 1995);
+        });
+
+        describe('with aggregation buffer', function() {
+            let aggregationBufferIntervalConfig;
+
+            before(function() {
+                aggregationBufferIntervalConfig = sthConfig.AGGREGATION_BUFFER_INTERVAL;
+                sthConfig.AGGREGATION_BUFFER_INTERVAL = 60000;
+            });
+
+            after(function() {
+                sthConfig.AGGREGATION_BUFFER_INTERVAL = aggregationBufferIntervalConfig;
+            });
+
+            bucketCacheTests('attrNameBucketCacheBuffer', 1996, function(done) {
+                sth.sthDatabase.flushAggregatedData(done);
+            });
+        });
+    });
+
     describe('Data removal', function() {
         describe(
             'Removal of concrete attributes of entities including numeric data',